@@ -0,0 +1,11 @@
+"""
+benchmarks
+=================
+环境、智能体和学习器的性能基准。
+
+用法：
+    python -m benchmarks                      # 全部基准，结果写到 bench_results.json
+    python -m benchmarks --quick              # 迭代次数更少，适合 CI / 冒烟
+    python -m benchmarks --only env_step replay
+    python -m benchmarks --compare old.json   # 和旧结果对比，变慢超过阈值时退出码为 1
+"""
@@ -0,0 +1,419 @@
+"""
+suite.py
+=================
+基准测试的实现与命令行入口。
+
+每个基准返回若干指标：{"指标名": {"value": 数值, "unit": 单位, "higher_is_better": bool}}；
+测不出来的指标 value 为 None，原因（如果有）放在额外的 "error" 字段里。
+结果连同机器信息（平台、CPU、Python/numpy/torch/pygame 版本、git 提交）写成 JSON，
+方便不同提交/机器之间直接 diff，或用 --compare 自动找出性能回退。
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+Metrics = Dict[str, Dict[str, Any]]
+
+
+def _metric(value, unit: str, higher_is_better: bool, *, error: Optional[str] = None) -> Dict[str, Any]:
+    m = {"value": None if value is None else float(value), "unit": unit, "higher_is_better": bool(higher_is_better)}
+    if error is not None:
+        m["error"] = error
+    return m
+
+
+def _rate(fn: Callable[[], Any], n: int) -> float:
+    """连续调用 n 次，返回每秒调用次数。"""
+    t0 = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return n / max(time.perf_counter() - t0, 1e-12)
+
+
+def _latency_us(fn: Callable[[], Any], n: int, repeat: int = 3) -> float:
+    """重复 repeat 轮、每轮 n 次，取最快一轮的单次耗时（微秒），降低调度噪声。"""
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for _ in range(n):
+            fn()
+        best = min(best, (time.perf_counter() - t0) / n)
+    return best * 1e6
+
+
+def _have_torch() -> bool:
+    try:
+        import torch  # noqa: F401
+    except ModuleNotFoundError:
+        return False
+    return True
+
+
+# -----------------------------
+# 各项基准
+# -----------------------------
+def bench_env_construct(quick: bool) -> Metrics:
+    """FridgeGameEnv 构建耗时：无头模式，以及可视化模式的冷启动（空缓存）/热启动（素材缓存命中）。"""
+    from fridge_gym import FridgeGameEnv
+
+    out: Metrics = {"none_us": _metric(_latency_us(lambda: FridgeGameEnv(render_mode="none"), 50 if quick else 500), "us", False)}
+    try:
+        import pygame  # noqa: F401
+    except ModuleNotFoundError:
+        return out
+
+    if not os.environ.get("DISPLAY") and sys.platform.startswith("linux"):
+        # 没有显示器的机器上用 SDL 的 dummy 驱动，仍然测到完整的素材处理流程
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    old_cache = os.environ.get("FRIDGE_GYM_CACHE_DIR")
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["FRIDGE_GYM_CACHE_DIR"] = tmp
+        try:
+            t0 = time.perf_counter()
+            env = FridgeGameEnv(render_mode="human")
+            cold = time.perf_counter() - t0
+            env.close()
+            warm = []
+            for _ in range(2 if quick else 5):
+                t0 = time.perf_counter()
+                env = FridgeGameEnv(render_mode="human")
+                warm.append(time.perf_counter() - t0)
+                env.close()
+            out["human_cold_s"] = _metric(cold, "s", False)
+            out["human_warm_s"] = _metric(min(warm), "s", False)
+        except Exception as e:  # noqa: BLE001 - 没有可用的视频驱动时只记录原因
+            out["human_cold_s"] = _metric(None, "s", False, error=repr(e))
+            out["human_warm_s"] = _metric(None, "s", False, error=repr(e))
+        finally:
+            if old_cache is None:
+                os.environ.pop("FRIDGE_GYM_CACHE_DIR", None)
+            else:
+                os.environ["FRIDGE_GYM_CACHE_DIR"] = old_cache
+    return out
+
+
+def bench_env_step(quick: bool) -> Metrics:
+    """单环境 step()/reset() 吞吐，以及 FridgeVectorEnv 的批量 step 吞吐（transitions/s）。"""
+    from fridge_gym import FridgeGameEnv, FridgeVectorEnv
+
+    rng = np.random.default_rng(0)
+    env = FridgeGameEnv(render_mode="none")
+    env.reset()
+    actions = rng.integers(0, 6, size=100_000)
+    i = [0]
+
+    def one_step():
+        _o, _r, term, trunc, _info = env.step(int(actions[i[0] % actions.size]))
+        i[0] += 1
+        if term or trunc:
+            env.reset()
+
+    n = 5_000 if quick else 50_000
+    out: Metrics = {
+        "step_per_s": _metric(_rate(one_step, n), "steps/s", True),
+        "reset_per_s": _metric(_rate(env.reset, n // 5), "resets/s", True),
+    }
+
+    fast_env = FridgeGameEnv(render_mode="none", fast_step=True)
+    fast_env.reset()
+    k = [0]
+
+    def fast_step():
+        _o, _r, term, trunc, _info = fast_env.step(int(actions[k[0] % actions.size]))
+        k[0] += 1
+        if term or trunc:
+            fast_env.reset()
+
+    out["fast_step_per_s"] = _metric(_rate(fast_step, n), "steps/s", True)
+
+    try:
+        import pygame  # noqa: F401
+    except ModuleNotFoundError:
+        pygame = None
+    if pygame is not None:
+        # 离屏 rgb_array：step + render() 取帧（全分辨率视图 / 缩放到 84x84）
+        for name, kwargs in (("rgb_array", {}), ("rgb_array_84", {"render_size": (84, 84)})):
+            renv = FridgeGameEnv(render_mode="rgb_array", **kwargs)
+            renv.reset()
+            m = [0]
+
+            def render_step(renv=renv, m=m):
+                _o, _r, term, trunc, _info = renv.step(int(actions[m[0] % actions.size]))
+                m[0] += 1
+                if term or trunc:
+                    renv.reset()
+                renv.render()
+
+            out[f"{name}_frames_per_s"] = _metric(_rate(render_step, n // 50), "frames/s", True)
+            renv.close()
+
+    num_envs = 1024
+    venv = FridgeVectorEnv(num_envs)
+    venv.reset(options={"randomize_positions": True})
+    batch_actions = rng.integers(0, 6, size=(16, num_envs))
+    j = [0]
+
+    def vec_step():
+        venv.step(batch_actions[j[0] % 16])
+        j[0] += 1
+
+    out["vector_transitions_per_s"] = _metric(_rate(vec_step, 50 if quick else 500) * num_envs, "transitions/s", True)
+    return out
+
+
+def bench_agents(quick: bool) -> Metrics:
+    """RuleBasedAgent.act / act_batch 与 DQNAgent.act_index / act_batch 的单次延迟。"""
+    from fridge_gym.agents import RuleBasedAgent
+
+    obs = np.array([1.0, 4.0, 5.32, 8.96, 5.32], dtype=np.float32)
+    n = 2_000 if quick else 20_000
+    rule = RuleBasedAgent()
+    out: Metrics = {"rule_act_us": _metric(_latency_us(lambda: rule.act(obs), n), "us", False)}
+    rule_batch = np.tile(obs, (1024, 1))
+    out["rule_act_batch_1024_per_row_us"] = _metric(
+        _latency_us(lambda: rule.act_batch(rule_batch), 200 if quick else 2_000) / 1024, "us", False
+    )
+    if _have_torch():
+        from fridge_gym.agents import DQNAgent
+
+        agent = DQNAgent()
+        out["dqn_act_index_greedy_us"] = _metric(_latency_us(lambda: agent.act_index(obs, explore=False), n // 4), "us", False)
+        batch = np.tile(obs, (1024, 1))
+        out["dqn_act_batch_1024_per_row_us"] = _metric(
+            _latency_us(lambda: agent.act_batch(batch, explore=False), 20 if quick else 200) / 1024, "us", False
+        )
+    return out
+
+
+def bench_replay(quick: bool) -> Metrics:
+    """ReplayBuffer 的 push / push_batch / sample 吞吐（buffer_size=50k，batch=128），以及内存映射回放池的写入/重新打开。"""
+    from fridge_gym.agents.dqn_agent import ReplayBuffer
+
+    rng = np.random.default_rng(0)
+    buf = ReplayBuffer(50_000, obs_dim=5)
+    s = rng.random(5, dtype=np.float32)
+    n = 10_000 if quick else 100_000
+    out: Metrics = {"push_per_s": _metric(_rate(lambda: buf.push(s, 1, 0.5, s, False), n), "transitions/s", True)}
+    bs = rng.random((1024, 5), dtype=np.float32)
+    ba = rng.integers(0, 6, 1024)
+    br = rng.random(1024, dtype=np.float32)
+    bd = np.zeros(1024, dtype=np.float32)
+    out["push_batch_per_s"] = _metric(
+        _rate(lambda: buf.push_batch(bs, ba, br, bs, bd), 50 if quick else 500) * 1024, "transitions/s", True
+    )
+    out["sample_128_per_s"] = _metric(_rate(lambda: buf.sample(128), n // 10), "batches/s", True)
+    out.update(_bench_memmap_replay(bs, ba, br, bd, 50 if quick else 500))
+    return out
+
+
+def _bench_memmap_replay(bs, ba, br, bd, n_batches: int) -> Metrics:
+    """
+    内存映射回放池：push_batch 吞吐，以及“关闭 → 读写重新打开 → 另一个只读读者打开”的耗时。
+    顺带校验重新打开后写指针、条数和内容都没丢（不一致直接抛错，而不是报一个好看的数字）。
+    """
+    from fridge_gym.agents.dqn_agent import MemmapReplayBuffer
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "replay.bin")
+        buf = MemmapReplayBuffer(path, 1 << 20)
+        out: Metrics = {
+            "memmap_push_batch_per_s": _metric(
+                _rate(lambda: buf.push_batch(bs, ba, br, bs, bd), n_batches) * bs.shape[0], "transitions/s", True
+            )
+        }
+        buf.flush()
+        expect_pos, expect_size, expect_r = buf._pos, len(buf), np.array(buf._r[: len(buf)])
+        del buf
+
+        t0 = time.perf_counter()
+        writer = MemmapReplayBuffer.open(path, readonly=False)
+        reader = MemmapReplayBuffer.open(path)
+        reopen_s = time.perf_counter() - t0
+        for name, b in (("读写", writer), ("只读", reader)):
+            if b._pos != expect_pos or len(b) != expect_size or not np.array_equal(b._r[:expect_size], expect_r):
+                raise RuntimeError(f"内存映射回放池{name}重新打开后内容不一致：pos={b._pos} size={len(b)}，应为 {expect_pos}/{expect_size}")
+        out["memmap_reopen_ms"] = _metric(reopen_s * 1e3, "ms", False)
+        del writer, reader
+    return out
+
+
+def bench_learner(quick: bool) -> Metrics:
+    """train_one_step 每秒更新次数（numpy 回放池 / torch 回放池）。"""
+    if not _have_torch():
+        return {}
+    from fridge_gym.agents import DQNAgent, DQNConfig
+
+    rng = np.random.default_rng(0)
+    out: Metrics = {}
+    for storage in ("numpy", "torch"):
+        agent = DQNAgent(cfg=DQNConfig(replay_storage=storage, min_buffer_size=1_000))
+        n_fill = 5_000
+        agent.push_transitions(
+            rng.random((n_fill, 5), dtype=np.float32),
+            rng.integers(0, 6, n_fill),
+            rng.random(n_fill, dtype=np.float32),
+            rng.random((n_fill, 5), dtype=np.float32),
+            np.zeros(n_fill, dtype=np.float32),
+        )
+        for _ in range(10):
+            agent.train_one_step()
+        out[f"train_one_step_{storage}_per_s"] = _metric(_rate(agent.train_one_step, 100 if quick else 1_000), "updates/s", True)
+    return out
+
+
+def bench_train_to_success(quick: bool) -> Metrics:
+    """
+    端到端：用 train_dqn（与 demo 按 3 相同的训练路径：起点扰动、纯贪心评估、最佳权重快照）从随机权重开始训练，
+    直到第一次纯贪心评估有成功局，记录墙钟时间与 epsilon-greedy 阶段的环境步数。
+    - wall_s / env_steps：不热启动；
+    - warm_start_wall_s / warm_start_env_steps：先用 400 局规则基示范预训练（墙钟时间含生成示范与预训练）。
+    起点放近一些（elephant_init_distance_m=1.5），让基准在合理时间内结束；到预算仍未成功时 value 为 None。
+    """
+    if not _have_torch():
+        return {}
+    import contextlib
+    import io
+    import random
+
+    import torch
+
+    from fridge_gym.agents import train_dqn
+
+    out: Metrics = {}
+    for prefix, demo_episodes in (("", 0), ("warm_start_", 400)):
+        random.seed(0)
+        np.random.seed(0)
+        torch.manual_seed(0)
+        found: Dict[str, float] = {}
+        t0 = time.perf_counter()
+
+        def on_eval(_ep: int, ok: int, _n: int, env_steps: int, found=found, t0=t0) -> bool:
+            if ok > 0:
+                found["wall_s"] = time.perf_counter() - t0
+                found["env_steps"] = env_steps
+                return True
+            return False
+
+        # train_dqn 的训练日志对基准没有意义，丢掉
+        with contextlib.redirect_stdout(io.StringIO()):
+            train_dqn(
+                120 if quick else 300,
+                150,
+                elephant_init_distance_m=1.5,
+                demo_episodes=demo_episodes,
+                eval_callback=on_eval,
+            )
+        out[f"{prefix}wall_s"] = _metric(found.get("wall_s"), "s", False)
+        out[f"{prefix}env_steps"] = _metric(found.get("env_steps"), "steps", False)
+    return out
+
+
+BENCHMARKS: Dict[str, Callable[[bool], Metrics]] = {
+    "env_construct": bench_env_construct,
+    "env_step": bench_env_step,
+    "agents": bench_agents,
+    "replay": bench_replay,
+    "learner": bench_learner,
+    "train_to_success": bench_train_to_success,
+}
+
+
+# -----------------------------
+# 机器信息 / 对比 / 命令行
+# -----------------------------
+def machine_metadata() -> Dict[str, Any]:
+    meta: Dict[str, Any] = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "python": sys.version.split()[0],
+        "numpy": np.__version__,
+    }
+    for mod in ("torch", "pygame", "gymnasium"):
+        try:
+            meta[mod] = __import__(mod).__version__
+        except (ModuleNotFoundError, AttributeError):
+            meta[mod] = None
+    try:
+        meta["git_commit"] = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        meta["git_commit"] = None
+    return meta
+
+
+def compare(new: Dict[str, Any], old: Dict[str, Any], threshold: float) -> List[str]:
+    """
+    返回“比旧结果差超过 threshold 比例”的指标描述列表。
+    旧结果有数值、新结果变成 None（例如训练到预算仍未成功）也算回退。
+    """
+    regressions = []
+    for bench, metrics in new.get("benchmarks", {}).items():
+        for name, m in metrics.items():
+            o = old.get("benchmarks", {}).get(bench, {}).get(name)
+            if not o or o.get("value") is None:
+                continue
+            if m.get("value") is None:
+                regressions.append(f"{bench}.{name}: {o['value']:.4g} {m['unit']} -> n/a")
+                continue
+            if o["value"] == 0:
+                continue
+            ratio = float(m["value"]) / float(o["value"])
+            worse = ratio < 1.0 - threshold if m["higher_is_better"] else ratio > 1.0 + threshold
+            if worse:
+                regressions.append(f"{bench}.{name}: {o['value']:.4g} -> {m['value']:.4g} {m['unit']} (x{ratio:.2f})")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="fridge_gym 性能基准")
+    parser.add_argument("--quick", action="store_true", help="减少迭代次数（冒烟/CI 用）")
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), help="只跑指定的基准")
+    parser.add_argument("--out", default="bench_results.json", help="结果 JSON 路径")
+    parser.add_argument("--compare", help="与之对比的旧结果 JSON")
+    parser.add_argument("--threshold", type=float, default=0.2, help="判定回退的相对阈值（默认 0.2 = 20%%）")
+    args = parser.parse_args(argv)
+
+    results: Dict[str, Any] = {"meta": machine_metadata(), "quick": bool(args.quick), "benchmarks": {}}
+    for name in args.only or list(BENCHMARKS):
+        t0 = time.perf_counter()
+        metrics = BENCHMARKS[name](args.quick)
+        results["benchmarks"][name] = metrics
+        print(f"[{name}] ({time.perf_counter() - t0:.1f}s)")
+        for k, m in metrics.items():
+            v = "n/a" if m["value"] is None else f"{m['value']:.4g}"
+            print(f"    {k:<32} {v:>12} {m['unit']}" + (f"  ({m['error']})" if m.get("error") else ""))
+
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    print(f"结果已写入 {args.out}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            old = json.load(f)
+        regressions = compare(results, old, args.threshold)
+        if regressions:
+            print("性能回退：")
+            for line in regressions:
+                print("    " + line)
+            return 1
+        print("与基线相比没有超过阈值的回退。")
+    return 0
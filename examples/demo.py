@@ -14,196 +14,14 @@ demo.py
 
 import pygame
 import sys
-import numpy as np
 
 from fridge_gym import FridgeGameEnv
-from fridge_gym.agents import RuleBasedAgent, DQNAgent
+from fridge_gym.agents import RuleBasedAgent, train_dqn
 
 # 窗口标题保持简短；完整按键与模式说明见 README
 WIN_TITLE = "大象进冰箱"
 
 
-def _greedy_eval_success_rate(
-    agent: DQNAgent,
-    env: FridgeGameEnv,
-    start_options: dict | None,
-    max_steps: int,
-    *,
-    n_runs: int = 12,
-) -> tuple[int, int]:
-    """
-    纯贪心、不写入回放池；起点不扰动（与主窗口按 4 的 reset(options=学习起点) 一致）。
-    用于解释「训练日志里 10/10 成功」与「按 4 表现差」：前者含 epsilon 随机探索。
-    """
-    ok = 0
-    base = dict(start_options or {})
-    for _ in range(int(n_runs)):
-        obs, _info = env.reset(options=base)
-        for _t in range(int(max_steps)):
-            a_idx = agent.act_index(obs, explore=False)
-            obs, _r, term, trunc, info = env.step(agent.onehot(a_idx))
-            if term or trunc:
-                if info.get("task_complete"):
-                    ok += 1
-                break
-    return ok, int(n_runs)
-
-
-def _snapshot_dqn_weights(agent: DQNAgent) -> tuple[dict, dict]:
-    """CPU 克隆，避免末期学崩后无法回到贪心最优解。"""
-    q_sd = {k: v.detach().cpu().clone() for k, v in agent.q.state_dict().items()}
-    qt_sd = {k: v.detach().cpu().clone() for k, v in agent.q_target.state_dict().items()}
-    return q_sd, qt_sd
-
-
-def _load_dqn_weights(agent: DQNAgent, q_sd: dict, qt_sd: dict) -> None:
-    dev = agent.device
-    agent.q.load_state_dict({k: v.to(dev) for k, v in q_sd.items()})
-    agent.q_target.load_state_dict({k: v.to(dev) for k, v in qt_sd.items()})
-
-
-def train_dqn(
-    num_episodes: int = 50,
-    max_steps_per_ep: int = 500,
-    *,
-    elephant_init_distance_m: float | None = None,
-    move_step_m: float | None = None,
-    start_options: dict | None = None,
-    start_noise_m: float = 0.1,
-    agent: DQNAgent | None = None,
-):
-    """
-    学习模式（DQN）训练过程。
-
-    - 使用 epsilon-greedy：前期大量随机探索，后期逐步转为利用学到的Q值。
-    - 使用经验回放 + 目标网络，保证训练稳定。
-    - 控制台会打印每10个episode的平均回报和最近一次loss，方便你观察“从乱走到变聪明”的过程。
-    """
-    print("\n========== 启动 DQN 学习模式（训练） ==========")
-    print("说明：训练阶段不会使用规则基，也不会手动干预，完全靠试错+奖励学习。")
-    print(f"训练设置 | 起点扰动半径：±{start_noise_m:.2f}m | 每局最大步数：{max_steps_per_ep}")
-
-    # 训练时不需要渲染窗口，用 render_mode='none' 节省资源
-    env = FridgeGameEnv(render_mode="none", elephant_init_distance_m=elephant_init_distance_m, move_step_m=move_step_m)
-    obs_dim = env.observation_space.shape[0]
-    n_actions = 6
-    # 关键：如果传入了 agent，就在原模型上继续训练（经验/epsilon/网络参数都会累积）
-    if agent is None:
-        agent = DQNAgent(obs_dim=obs_dim, n_actions=n_actions)
-
-    reward_history = []
-    last_loss = None
-    success_history = []  # 记录每局是否真正完成（关门且大象在冰箱内）
-
-    # 如果你把起点放得很远（比如 dx=6m），固定200步有时不够“走完一局”，训练会变得很不稳定。
-    # 这里做个自适应：按“水平距离/步长”估算需要多少步，给一个上限更合理。
-    adaptive_max_steps = int(max_steps_per_ep)
-    if start_options and start_options.get("elephant_pos") is not None:
-        x0, y0 = start_options["elephant_pos"]
-        fridge_x = float(env.SCREEN_WIDTH * 0.7)
-        dx_m_est = abs((fridge_x - float(x0)) / env.PIXELS_PER_METER)
-        step_m = max(1e-6, float(env.move_step_m))
-        adaptive_max_steps = max(adaptive_max_steps, int(dx_m_est / step_m) + 120)
-
-    # DQN 末期仍会从回放池里抽到早期烂样本，可能把 Q 网「学崩」；按「纯贪心评估」保留最佳权重
-    best_greedy_ok: int | None = None
-    best_q_sd: dict | None = None
-    best_qt_sd: dict | None = None
-    best_snapshot_ep = 0
-
-    for ep in range(1, num_episodes + 1):
-        # 关键改动：训练起点做“随机扰动”（domain randomization）
-        # 原因：如果只在一个固定起点训练，DQN 很容易“记住这一个起点的最优动作序列”，
-        # 一旦你手动改了初始位置，就会出现“进不去冰箱”的现象（泛化失败）。
-        #
-        # 做法：围绕你保存的起点 (elephant_pos) 加一个小的随机偏移，让智能体学会“在一片区域内”都能完成任务。
-        # start_noise_m 越大，泛化越强，但学习难度也会变大；建议 0.3~1.0 之间。
-        ep_options = dict(start_options or {})
-        if "elephant_pos" in ep_options and ep_options["elephant_pos"] is not None and start_noise_m > 0:
-            x0, y0 = ep_options["elephant_pos"]
-            noise_px = float(start_noise_m * env.PIXELS_PER_METER)
-            # 均匀扰动：[-noise, +noise]
-            nx = float(x0) + float(np.random.uniform(-noise_px, noise_px))
-            ny = float(y0) + float(np.random.uniform(-noise_px, noise_px))
-            ep_options["elephant_pos"] = (nx, ny)
-
-        obs, info = env.reset(options=ep_options)
-        ep_reward = 0.0
-
-        success = False
-        for t in range(adaptive_max_steps):
-            # 1) epsilon-greedy 选择动作（有随机探索）
-            action_idx = agent.act_index(obs, explore=True)
-            action_onehot = agent.onehot(action_idx)
-
-            # 2) 与环境交互，获得“试错”结果
-            next_obs, reward, terminated, truncated, info = env.step(action_onehot)
-            done = bool(terminated or truncated)
-
-            # 3) 将这一步的经验存入回放池
-            # 训练稳定性：奖励截断（但不要把“关门成功”的关键大奖励截得太小）
-            # 之前用[-5,5]会把 close 的关键奖励压扁，DQN容易学到“对齐后不关门”。
-            clipped_reward = float(max(-20.0, min(20.0, float(reward))))
-            agent.push_transition(obs, action_idx, clipped_reward, next_obs, done)
-
-            # 4) 从回放池随机采样，执行一次参数更新（可能返回None，表示buffer还不够大，暂不更新）
-            loss = agent.train_one_step()
-            if loss is not None:
-                last_loss = loss
-
-            obs = next_obs
-            ep_reward += float(reward)
-
-            if done:
-                success = bool(info.get("task_complete", False))
-                break
-
-        reward_history.append(ep_reward)
-        success_history.append(1 if success else 0)
-
-        if ep % 10 == 0:
-            avg_r = sum(reward_history[-10:]) / min(10, len(reward_history))
-            succ10 = sum(success_history[-10:])
-            g_ok, g_n = _greedy_eval_success_rate(
-                agent, env, start_options, adaptive_max_steps, n_runs=12
-            )
-            print(
-                f"[DQN训练] Episode {ep}/{num_episodes} | 最近10局平均回报：{avg_r:.2f} | 最近10局成功：{succ10}/10"
-                + (f" | 最近一次loss：{last_loss:.4f}" if last_loss is not None else " | loss暂不可用（经验不足）")
-            )
-            print(
-                f"         └ 纯贪心评估（与按4一致、起点无扰动）：{g_ok}/{g_n} 局成功。"
-                " 若此处明显低于上行，说明策略仍依赖探索噪声，可多训练或降低 epsilon_end。"
-            )
-            if best_greedy_ok is None:
-                if g_ok > 0:
-                    best_greedy_ok = g_ok
-                    best_q_sd, best_qt_sd = _snapshot_dqn_weights(agent)
-                    best_snapshot_ep = ep
-            elif g_ok > best_greedy_ok:
-                best_greedy_ok = g_ok
-                best_q_sd, best_qt_sd = _snapshot_dqn_weights(agent)
-                best_snapshot_ep = ep
-            elif g_ok == best_greedy_ok and g_ok > 0:
-                best_q_sd, best_qt_sd = _snapshot_dqn_weights(agent)
-                best_snapshot_ep = ep
-
-    if best_q_sd is not None and best_qt_sd is not None and best_greedy_ok and best_greedy_ok > 0:
-        _load_dqn_weights(agent, best_q_sd, best_qt_sd)
-        g_chk, g_n2 = _greedy_eval_success_rate(
-            agent, env, start_options, adaptive_max_steps, n_runs=12
-        )
-        print(
-            f"训练收尾：已恢复「纯贪心评估」最佳 checkpoint（约第 {best_snapshot_ep} 轮附近，{best_greedy_ok}/{g_n2}），"
-            "避免最后几轮更新把策略弄崩。"
-        )
-        print(f"         └ 恢复后立刻复测贪心：{g_chk}/{g_n2} 局成功。")
-
-    env.close()
-    print("========== DQN 训练结束，按 4 键可在主窗口使用“学习后的自动执行”模式 ==========\n")
-    return agent
-
-
 def main():
     """游戏运行入口（支持手动 / 规则基自动 / DQN学习模式）"""
     # 初始化可视化环境
@@ -1,4 +1,5 @@
-
 from fridge_gym.envs.fridge_env import FridgeGameEnv
+from fridge_gym.envs.subproc_vector_env import FridgeSubprocVectorEnv
+from fridge_gym.envs.vector_env import FridgeVectorEnv
 
-__all__ = ["FridgeGameEnv"]
\ No newline at end of file
+__all__ = ["FridgeGameEnv", "FridgeVectorEnv", "FridgeSubprocVectorEnv"]
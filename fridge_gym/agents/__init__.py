@@ -1,6 +1,24 @@
 from fridge_gym.agents.base import BaseAgent
 from fridge_gym.agents.rule_agent import RuleBasedAgent
 from fridge_gym.agents.dqn_agent import DQNAgent, DQNConfig
+from fridge_gym.agents.apex import ApexConfig, train_apex
+from fridge_gym.agents.demonstrations import generate_demonstrations, load_demonstrations, pretrain_from_demonstrations
+from fridge_gym.agents.numpy_policy import NumpyPolicy
+from fridge_gym.agents.table_policy import TablePolicy, freeze_policy_table
+from fridge_gym.agents.training import train_dqn
 
-__all__ = ["BaseAgent", "RuleBasedAgent", "DQNAgent", "DQNConfig"]
-
+__all__ = [
+    "BaseAgent",
+    "RuleBasedAgent",
+    "DQNAgent",
+    "DQNConfig",
+    "ApexConfig",
+    "train_apex",
+    "generate_demonstrations",
+    "load_demonstrations",
+    "pretrain_from_demonstrations",
+    "NumpyPolicy",
+    "TablePolicy",
+    "freeze_policy_table",
+    "train_dqn",
+]
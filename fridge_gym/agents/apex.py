@@ -0,0 +1,375 @@
+"""
+apex.py
+=================
+Ape-X 风格的多进程“行动者 / 学习者”训练：把训练机的所有 CPU 核都用起来。
+
+- **行动者（actor）**：若干个子进程，各自持有一个无头 `FridgeGameEnv` 和一份 `NumpyPolicy`（不导入 torch），
+  用各自固定的 epsilon 做 epsilon-greedy 探索；经验攒够一小块就写进自己的共享内存环形队列。
+- **学习者（learner）**：调用 `train_apex` 的进程。不断把各队列里的新经验倒进 `DQNAgent` 的回放池，
+  连续调用 `train_one_step`，每隔 broadcast_interval 次更新把最新权重写进共享内存，行动者按版本号拉取。
+
+共享内存里走的是定长 numpy 数组，不经过 pickle / 管道：
+- 每个行动者一个单生产者单消费者的环形队列（s, a, r, s2, done）+ 写/读计数器；队列满了行动者会等学习者读走；
+- 一块扁平的权重缓冲区 + 版本号，读写都持同一把锁。
+
+默认用 "spawn" 启动子进程，调用方脚本需要放在 `if __name__ == "__main__":` 下。
+"""
+
+from __future__ import annotations
+
+import multiprocessing as mp
+import queue
+import time
+import traceback
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from fridge_gym.agents.dqn_agent import DQNAgent, DQNConfig
+from fridge_gym.utils.profiling import NULL_PROFILER
+
+# 环形队列每个槽位的字段：(字段名, dtype, 宽度)；按 dtype 大小从大到小排，保证对齐
+_QUEUE_FIELDS = (
+    ("a", np.int64, 1),
+    ("s", np.float32, 5),
+    ("s2", np.float32, 5),
+    ("r", np.float32, 1),
+    ("done", np.float32, 1),
+)
+
+# 每个行动者的统计：局数、成功局数、环境步数、回报累计
+_STAT_EPISODES, _STAT_SUCCESSES, _STAT_STEPS, _STAT_RETURN = range(4)
+
+
+@dataclass
+class ApexConfig:
+    """多进程训练参数（DQN 本身的超参数仍在 DQNConfig 里）。"""
+
+    num_actors: int = 4
+    total_train_steps: int = 20_000  # 学习者做多少次梯度更新后结束
+    queue_capacity: int = 16_384  # 每个行动者环形队列能放多少条经验
+    publish_chunk: int = 64  # 行动者攒多少条经验写一次队列
+    broadcast_interval: int = 200  # 学习者每多少次更新广播一次权重
+    weight_poll_steps: int = 100  # 行动者每走多少步检查一次新权重
+    eps_base: float = 0.4  # 行动者 i 的 epsilon = eps_base ** (1 + eps_alpha * i / (N-1))（Ape-X 论文的取法）
+    eps_alpha: float = 7.0
+    max_steps_per_ep: int = 500
+    start_noise_m: float = 0.1
+    log_interval_s: float = 10.0
+    start_method: str = "spawn"
+
+
+def actor_epsilons(num_actors: int, eps_base: float = 0.4, eps_alpha: float = 7.0) -> np.ndarray:
+    """每个行动者的探索率：从 eps_base 到 eps_base**(1+eps_alpha) 几何分布，有的多探索、有的多利用。"""
+    n = int(num_actors)
+    if n == 1:
+        return np.array([eps_base], dtype=np.float64)
+    return np.power(float(eps_base), 1.0 + float(eps_alpha) * np.arange(n) / (n - 1))
+
+
+def _queue_nbytes(capacity: int) -> int:
+    return sum(np.dtype(dt).itemsize * width * capacity for _, dt, width in _QUEUE_FIELDS)
+
+
+def _queue_views(buf, capacity: int) -> Dict[str, np.ndarray]:
+    views = {}
+    offset = 0
+    for name, dt, width in _QUEUE_FIELDS:
+        count = capacity * width
+        arr = np.frombuffer(buf, dtype=dt, count=count, offset=offset)
+        views[name] = arr.reshape(capacity, width) if width > 1 else arr
+        offset += np.dtype(dt).itemsize * count
+    return views
+
+
+def _weight_layout(weights: Dict[str, np.ndarray]) -> List[Tuple[str, Tuple[int, ...]]]:
+    n_layers = int(weights["n_layers"])
+    layout = []
+    for i in range(n_layers):
+        layout.append((f"w{i}", tuple(weights[f"w{i}"].shape)))
+        layout.append((f"b{i}", tuple(weights[f"b{i}"].shape)))
+    return layout
+
+
+def _unflatten(flat: np.ndarray, layout) -> Dict[str, np.ndarray]:
+    out: Dict[str, np.ndarray] = {"n_layers": np.asarray(len(layout) // 2, dtype=np.int64)}
+    offset = 0
+    for name, shape in layout:
+        size = int(np.prod(shape))
+        out[name] = flat[offset : offset + size].reshape(shape).copy()
+        offset += size
+    return out
+
+
+def _actor(
+    index: int,
+    epsilon: float,
+    seed: int,
+    queue_buf,
+    counters,
+    stats,
+    weight_buf,
+    weight_version,
+    weight_lock,
+    layout,
+    stop,
+    errors,
+    env_kwargs: Dict[str, Any],
+    start_options: Optional[Dict[str, Any]],
+    cfg: ApexConfig,
+):
+    """行动者主循环：epsilon-greedy 与环境交互，把经验成块写进自己的环形队列。"""
+    # 子进程里才导入环境/策略：不需要 torch，也不会继承父进程的 pygame 状态
+    from fridge_gym.agents.numpy_policy import NumpyPolicy
+    from fridge_gym.envs.fridge_env import FridgeGameEnv
+
+    env = None
+    try:
+        env = FridgeGameEnv(render_mode="none", **env_kwargs)
+        rng = np.random.default_rng(seed)
+        capacity = int(cfg.queue_capacity)
+        views = _queue_views(queue_buf, capacity)
+        cnt = np.frombuffer(counters, dtype=np.int64).reshape(-1, 2)
+        st = np.frombuffer(stats, dtype=np.float64).reshape(-1, 4)
+        flat = np.frombuffer(weight_buf, dtype=np.float32)
+
+        def pull_weights():
+            with weight_lock:
+                version = int(weight_version.value)
+                local = flat.copy()
+            return version, NumpyPolicy(_unflatten(local, layout))
+
+        version, policy = pull_weights()
+
+        chunk = int(cfg.publish_chunk)
+        stage = {name: np.zeros((chunk,) + ((width,) if width > 1 else ()), dtype=dt) for name, dt, width in _QUEUE_FIELDS}
+        n_staged = 0
+
+        def publish(n: int) -> bool:
+            # 队列满了就等学习者读走；返回 False 表示收到了停止信号
+            while cnt[index, 0] + n - cnt[index, 1] > capacity:
+                if stop.is_set():
+                    return False
+                time.sleep(0.001)
+            idx = (cnt[index, 0] + np.arange(n)) % capacity
+            for name in stage:
+                views[name][idx] = stage[name][:n]
+            # 先写数据、再推进写计数器（学习者只读计数器以内的槽位）
+            cnt[index, 0] += n
+            return True
+
+        noise_px = float(cfg.start_noise_m * env.PIXELS_PER_METER)
+        steps_since_poll = 0
+        while not stop.is_set():
+            ep_options = dict(start_options or {})
+            if ep_options.get("elephant_pos") is not None and noise_px > 0:
+                x0, y0 = ep_options["elephant_pos"]
+                ep_options["elephant_pos"] = (
+                    float(x0) + float(rng.uniform(-noise_px, noise_px)),
+                    float(y0) + float(rng.uniform(-noise_px, noise_px)),
+                )
+            obs, info = env.reset(seed=int(rng.integers(2**31)), options=ep_options)
+            ep_return = 0.0
+            success = False
+            for t in range(int(cfg.max_steps_per_ep)):
+                if rng.random() < epsilon:
+                    a = int(rng.integers(6))
+                else:
+                    a = policy.act_index(obs)
+                next_obs, reward, terminated, truncated, info = env.step(a)
+                # 与 train_dqn 一致：done 只看环境自己的 terminated/truncated；
+                # 走满 max_steps_per_ep 只是结束这一局，不当作终止状态（仍然 bootstrap）
+                done = bool(terminated or truncated)
+
+                stage["s"][n_staged] = obs
+                stage["a"][n_staged] = a
+                # 与 train_dqn 相同的奖励截断
+                stage["r"][n_staged] = max(-20.0, min(20.0, float(reward)))
+                stage["s2"][n_staged] = next_obs
+                stage["done"][n_staged] = float(done)
+                n_staged += 1
+                if n_staged == chunk:
+                    if not publish(n_staged):
+                        return
+                    n_staged = 0
+
+                ep_return += float(reward)
+                obs = next_obs
+                steps_since_poll += 1
+                if steps_since_poll >= int(cfg.weight_poll_steps):
+                    steps_since_poll = 0
+                    if int(weight_version.value) != version:
+                        version, policy = pull_weights()
+                if done:
+                    success = bool(info.get("task_complete", False))
+                    break
+            st[index, _STAT_EPISODES] += 1
+            st[index, _STAT_SUCCESSES] += float(success)
+            st[index, _STAT_STEPS] += t + 1
+            st[index, _STAT_RETURN] += ep_return
+    except (KeyboardInterrupt, EOFError):
+        pass
+    except Exception:  # noqa: BLE001 - 把子进程异常带回学习者
+        errors.put((index, traceback.format_exc()))
+    finally:
+        if env is not None:
+            env.close()
+
+
+def train_apex(
+    cfg: Optional[ApexConfig] = None,
+    *,
+    agent: Optional[DQNAgent] = None,
+    dqn_cfg: Optional[DQNConfig] = None,
+    start_options: Optional[Dict[str, Any]] = None,
+    elephant_init_distance_m: float | None = None,
+    move_step_m: float | None = None,
+    seed: int = 0,
+    profiler=None,
+) -> DQNAgent:
+    """
+    多进程训练 DQN：cfg.num_actors 个行动者并行采样，当前进程做学习者。
+
+    - 传入 agent 时在它上面继续训练（回放池、网络、优化器都沿用）；
+    - start_options / start_noise_m 与 train_dqn 的含义相同；
+    - profiler（PhaseProfiler）记录 drain / broadcast 阶段和 agent 内部的 train/* 子阶段。
+    返回训练后的 agent。
+    """
+    cfg = cfg or ApexConfig()
+    if agent is None:
+        agent = DQNAgent(obs_dim=5, n_actions=6, cfg=dqn_cfg)
+    prof = profiler if profiler is not None else NULL_PROFILER
+    agent.profiler = prof
+    ctx = mp.get_context(cfg.start_method)
+    n = int(cfg.num_actors)
+    capacity = int(cfg.queue_capacity)
+    if capacity < int(cfg.publish_chunk):
+        raise ValueError("queue_capacity 不能小于 publish_chunk")
+
+    env_kwargs = {"elephant_init_distance_m": elephant_init_distance_m, "move_step_m": move_step_m}
+    weights = agent.numpy_weights()
+    layout = _weight_layout(weights)
+    n_params = sum(int(np.prod(shape)) for _, shape in layout)
+    weight_buf = ctx.RawArray("f", n_params)
+    weight_version = ctx.RawValue("q", 0)
+    weight_lock = ctx.Lock()
+    flat = np.frombuffer(weight_buf, dtype=np.float32)
+
+    def broadcast():
+        w = agent.numpy_weights()
+        packed = np.concatenate([w[name].ravel() for name, _ in layout])
+        with weight_lock:
+            flat[:] = packed
+            weight_version.value += 1
+
+    broadcast()
+
+    queue_bufs = [ctx.RawArray("b", _queue_nbytes(capacity)) for _ in range(n)]
+    queues = [_queue_views(buf, capacity) for buf in queue_bufs]
+    counters = ctx.RawArray("q", 2 * n)
+    cnt = np.frombuffer(counters, dtype=np.int64).reshape(n, 2)
+    stats = ctx.RawArray("d", 4 * n)
+    st = np.frombuffer(stats, dtype=np.float64).reshape(n, 4)
+    stop = ctx.Event()
+    errors = ctx.Queue()
+
+    epsilons = actor_epsilons(n, cfg.eps_base, cfg.eps_alpha)
+    procs = []
+    for i in range(n):
+        proc = ctx.Process(
+            target=_actor,
+            args=(
+                i,
+                float(epsilons[i]),
+                int(seed) * 1000 + i,
+                queue_bufs[i],
+                counters,
+                stats,
+                weight_buf,
+                weight_version,
+                weight_lock,
+                layout,
+                stop,
+                errors,
+                env_kwargs,
+                start_options,
+                cfg,
+            ),
+            daemon=True,
+        )
+        proc.start()
+        procs.append(proc)
+
+    def drain() -> int:
+        """把各队列里学习者还没读过的经验倒进回放池，返回条数。"""
+        total = 0
+        for i, q in enumerate(queues):
+            written, read = int(cnt[i, 0]), int(cnt[i, 1])
+            k = written - read
+            if k <= 0:
+                continue
+            idx = (read + np.arange(k)) % capacity
+            agent.push_transitions(q["s"][idx], q["a"][idx], q["r"][idx], q["s2"][idx], q["done"][idx])
+            cnt[i, 1] = written
+            total += k
+        return total
+
+    def check_errors():
+        try:
+            index, tb = errors.get_nowait()
+        except queue.Empty:
+            return
+        raise RuntimeError(f"行动者 {index} 出错：\n{tb}")
+
+    print(f"\n========== 启动 Ape-X 多进程训练：{n} 个行动者 ==========")
+    print("行动者 epsilon：" + ", ".join(f"{e:.3f}" for e in epsilons))
+    target_steps = agent.train_steps + int(cfg.total_train_steps)
+    last_log = time.perf_counter()
+    last_loss = None
+    consumed = 0
+    try:
+        while agent.train_steps < target_steps:
+            with prof.phase("drain"):
+                got = drain()
+            consumed += got
+            prof.count("transitions", got)
+            loss = agent.train_one_step()
+            if loss is None:
+                # 回放池还不够 min_buffer_size：等行动者多产生一些经验
+                check_errors()
+                if got == 0:
+                    time.sleep(0.005)
+                continue
+            last_loss = loss
+            if agent.train_steps % int(cfg.broadcast_interval) == 0:
+                with prof.phase("broadcast"):
+                    broadcast()
+                check_errors()
+            prof.maybe_report()
+
+            now = time.perf_counter()
+            if now - last_log >= float(cfg.log_interval_s):
+                last_log = now
+                eps_done = st[:, _STAT_EPISODES].sum()
+                print(
+                    f"[Ape-X] 更新 {agent.train_steps}/{target_steps} | 已消费经验 {consumed} | "
+                    f"行动者局数 {int(eps_done)} | 成功率 {st[:, _STAT_SUCCESSES].sum() / max(1.0, eps_done):.2%} | "
+                    f"loss {last_loss:.4f}"
+                )
+    finally:
+        stop.set()
+        for proc in procs:
+            proc.join(timeout=5.0)
+            if proc.is_alive():
+                proc.terminate()
+        prof.gauge("replay_bytes", agent.buffer.nbytes)
+        prof.report()
+        agent.profiler = NULL_PROFILER
+
+    eps_done = st[:, _STAT_EPISODES].sum()
+    print(
+        f"========== Ape-X 训练结束：{agent.train_steps} 次更新，消费 {consumed} 条经验，"
+        f"行动者共 {int(eps_done)} 局、成功 {int(st[:, _STAT_SUCCESSES].sum())} 局 =========="
+    )
+    return agent
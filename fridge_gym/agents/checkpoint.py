@@ -0,0 +1,241 @@
+"""
+checkpoint.py
+=================
+`DQNAgent` 训练状态的完整存盘 / 续训，进程被抢占或中断后可以原样接着训练。
+
+一个 checkpoint 是一个目录：
+- meta.json：格式版本、DQNConfig、train_steps（决定 epsilon / PER beta 的进度）、各随机数发生器状态、回放池布局；
+- state.pt：两张网络、Adam 优化器状态、torch 的随机数状态（torch.save）；
+- replay/<字段>.bin：回放池每个字段的原始二进制（按槽位顺序，只写已填充的部分），
+  分块写出、分块直接读进预分配的数组，不经过 pickle，几百万条也能很快载入。
+
+写入时先写临时目录再改名，写到一半被打断不会破坏上一个 checkpoint。
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import json
+import os
+import random
+import shutil
+import tempfile
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from fridge_gym.agents.dqn_agent import (
+    DQNAgent,
+    DQNConfig,
+    MemmapReplayBuffer,
+    PrioritizedReplayBuffer,
+    ReplayBuffer,
+    TorchReplayBuffer,
+)
+
+CHECKPOINT_VERSION = 1
+# 每次读写多少条经验（控制临时内存，torch 版回放池需要经过 numpy 中转）
+CHUNK_ROWS = 65_536
+
+
+def _replay_fields(buffer) -> Dict[str, Any]:
+    """回放池里需要落盘的数组（numpy 数组或 torch 张量），首维是槽位。"""
+    return {"s": buffer._s, "a": buffer._a, "r": buffer._r, "s2": buffer._s2, "done": buffer._done}
+
+
+def _to_numpy(chunk) -> np.ndarray:
+    if isinstance(chunk, np.ndarray):
+        return chunk
+    return chunk.detach().cpu().numpy()
+
+
+def _write_chunked(path: str, arr, size: int) -> None:
+    with open(path, "wb") as f:
+        for start in range(0, size, CHUNK_ROWS):
+            f.write(np.ascontiguousarray(_to_numpy(arr[start : min(size, start + CHUNK_ROWS)])).data)
+
+
+def _read_chunked(path: str, arr, size: int, torch=None) -> None:
+    """按块把文件内容读进 arr[:size]；numpy 数组直接 readinto，张量经过一个复用的中转块。"""
+    with open(path, "rb") as f:
+        if isinstance(arr, np.ndarray) and arr.flags.c_contiguous:
+            for start in range(0, size, CHUNK_ROWS):
+                view = arr[start : min(size, start + CHUNK_ROWS)]
+                if f.readinto(memoryview(view).cast("B")) != view.nbytes:
+                    raise ValueError(f"回放池文件不完整：{path}")
+            return
+        # 张量 / 非连续视图（内存映射回放池的字段）：经过一个复用的中转块
+        stage = np.empty((min(size, CHUNK_ROWS),) + tuple(arr.shape[1:]), dtype=_numpy_dtype(arr))
+        for start in range(0, size, CHUNK_ROWS):
+            n = min(size, start + CHUNK_ROWS) - start
+            view = stage[:n]
+            if f.readinto(memoryview(view).cast("B")) != view.nbytes:
+                raise ValueError(f"回放池文件不完整：{path}")
+            if isinstance(arr, np.ndarray):
+                arr[start : start + n] = view
+            else:
+                arr[start : start + n].copy_(torch.from_numpy(view))
+
+
+def _numpy_dtype(arr) -> np.dtype:
+    if isinstance(arr, np.ndarray):
+        return arr.dtype
+    return np.dtype(str(arr.dtype).replace("torch.", ""))
+
+
+def _replay_kind(buffer) -> str:
+    if isinstance(buffer, TorchReplayBuffer):
+        return "torch"
+    if isinstance(buffer, PrioritizedReplayBuffer):
+        return "prioritized"
+    if isinstance(buffer, MemmapReplayBuffer):
+        return "memmap"
+    if isinstance(buffer, ReplayBuffer):
+        return "numpy"
+    raise TypeError(f"不支持保存的回放池类型：{type(buffer).__name__}")
+
+
+def _np_rng_state(rng: np.random.Generator) -> Dict[str, Any]:
+    return rng.bit_generator.state
+
+
+def _py_random_state() -> list:
+    version, internal, gauss = random.getstate()
+    return [version, list(internal), gauss]
+
+
+def _legacy_np_state() -> Dict[str, Any]:
+    name, key, pos, has_gauss, cached = np.random.get_state()
+    return {"name": name, "key": key.tolist(), "pos": int(pos), "has_gauss": int(has_gauss), "cached": float(cached)}
+
+
+def save_checkpoint(agent: DQNAgent, path: str, *, extra: Optional[Dict[str, Any]] = None) -> None:
+    """
+    把 agent 的完整训练状态写到目录 path（已存在则整体替换）。
+    extra：调用方想一起保存的少量 JSON 数据（例如训练到第几局），load 时原样返回在 agent.checkpoint_extra 上。
+    """
+    torch = agent.torch
+    buffer = agent.buffer
+    kind = _replay_kind(buffer)
+    if kind == "memmap":
+        buffer.flush()
+    size = len(buffer)
+    fields = _replay_fields(buffer)
+
+    path = os.path.abspath(path)
+    parent = os.path.dirname(path)
+    os.makedirs(parent, exist_ok=True)
+    tmp = tempfile.mkdtemp(prefix=f".{os.path.basename(path)}.", dir=parent)
+    try:
+        os.makedirs(os.path.join(tmp, "replay"))
+        layout = {}
+        for name, arr in fields.items():
+            _write_chunked(os.path.join(tmp, "replay", f"{name}.bin"), arr, size)
+            layout[name] = [str(_numpy_dtype(arr)), list(arr.shape[1:])]
+        replay_meta: Dict[str, Any] = {
+            "kind": kind,
+            "capacity": buffer.capacity,
+            "obs_dim": buffer.obs_dim,
+            "pos": int(buffer._pos),
+            "size": int(size),
+            "fields": layout,
+        }
+        if kind == "prioritized":
+            _write_chunked(os.path.join(tmp, "replay", "priority.bin"), buffer._tree.get(np.arange(size)), size)
+            replay_meta["max_priority"] = float(buffer._max_priority)
+            replay_meta["rng"] = _np_rng_state(buffer._rng)
+        elif kind in ("numpy", "memmap"):
+            replay_meta["rng"] = _np_rng_state(buffer._rng)
+
+        torch.save(
+            {
+                "q": agent.q.state_dict(),
+                "q_target": agent.q_target.state_dict(),
+                "optim": agent.optim.state_dict(),
+                "torch_rng": torch.get_rng_state(),
+                "replay_gen": buffer._gen.get_state() if kind == "torch" else None,
+            },
+            os.path.join(tmp, "state.pt"),
+        )
+        meta = {
+            "version": CHECKPOINT_VERSION,
+            "obs_dim": agent.obs_dim,
+            "n_actions": agent.n_actions,
+            "cfg": dataclasses.asdict(agent.cfg),
+            "train_steps": int(agent.train_steps),
+            "rng": {
+                "act": _np_rng_state(agent._act_rng),
+                "python": _py_random_state(),
+                "numpy_global": _legacy_np_state(),
+            },
+            "replay": replay_meta,
+            "extra": extra or {},
+        }
+        with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+
+        # 旧 checkpoint 先挪开、新的改名到位，再删除旧的
+        old = None
+        if os.path.exists(path):
+            old = tempfile.mkdtemp(prefix=f".{os.path.basename(path)}.old.", dir=parent)
+            os.rmdir(old)
+            os.replace(path, old)
+        os.replace(tmp, path)
+        tmp = None
+        if old is not None:
+            shutil.rmtree(old, ignore_errors=True)
+    finally:
+        if tmp is not None:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+def load_checkpoint(path: str, *, device: str = "cpu", restore_global_rng: bool = True) -> DQNAgent:
+    """
+    从 save_checkpoint 写的目录恢复一个 DQNAgent（网络、优化器、train_steps、回放池、随机数状态）。
+    restore_global_rng=True 时同时恢复 Python random / np.random 全局状态（train_dqn 的探索和起点扰动用它们）。
+    """
+    with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    if meta.get("version") != CHECKPOINT_VERSION:
+        raise ValueError(f"不支持的 checkpoint 版本：{meta.get('version')!r}")
+
+    agent = DQNAgent(obs_dim=meta["obs_dim"], n_actions=meta["n_actions"], cfg=DQNConfig(**meta["cfg"]), device=device)
+    torch = agent.torch
+    state = torch.load(os.path.join(path, "state.pt"), map_location=device)
+    agent.q.load_state_dict(state["q"])
+    agent.q_target.load_state_dict(state["q_target"])
+    agent.optim.load_state_dict(state["optim"])
+    agent.train_steps = int(meta["train_steps"])
+    agent._act_rng.bit_generator.state = meta["rng"]["act"]
+
+    replay = meta["replay"]
+    buffer = agent.buffer
+    if _replay_kind(buffer) != replay["kind"] or buffer.capacity != replay["capacity"]:
+        raise ValueError("checkpoint 的回放池类型/容量与 DQNConfig 重建出的不一致")
+    size = int(replay["size"])
+    for name, arr in _replay_fields(buffer).items():
+        _read_chunked(os.path.join(path, "replay", f"{name}.bin"), arr, size, torch)
+    buffer._pos = int(replay["pos"])
+    buffer._size = size
+    if replay["kind"] == "prioritized":
+        pr = np.empty((size,), dtype=np.float64)
+        _read_chunked(os.path.join(path, "replay", "priority.bin"), pr, size)
+        if size:
+            buffer._tree.update(np.arange(size), pr)
+        buffer._max_priority = float(replay["max_priority"])
+    if "rng" in replay:
+        buffer._rng.bit_generator.state = replay["rng"]
+    if state.get("replay_gen") is not None:
+        buffer._gen.set_state(state["replay_gen"])
+    if replay["kind"] == "memmap":
+        buffer.flush()
+
+    if restore_global_rng:
+        torch.set_rng_state(state["torch_rng"])
+        version, internal, gauss = meta["rng"]["python"]
+        random.setstate((version, tuple(internal), gauss))
+        g = meta["rng"]["numpy_global"]
+        np.random.set_state((g["name"], np.asarray(g["key"], dtype=np.uint32), g["pos"], g["has_gauss"], g["cached"]))
+
+    agent.checkpoint_extra = meta.get("extra", {})
+    return agent
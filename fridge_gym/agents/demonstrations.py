@@ -0,0 +1,158 @@
+"""
+demonstrations.py
+=================
+用规则基智能体的“示范”给 DQN 热启动（DQfD 的思路）：
+
+1. `generate_demonstrations`：在 `FridgeVectorEnv` 里并行跑 RuleBasedAgent，起点随机
+   （reset(options={"randomize_positions": True})），一次收集成千上万条转移；
+2. `load_demonstrations`：把示范转移写进 DQN 的回放池（与 train_dqn 相同的奖励截断）；
+3. `pretrain_from_demonstrations`：正式 epsilon-greedy 训练前，只用示范数据做若干次更新，
+   损失 = 1 步 TD 损失 + 大间隔（large-margin）监督损失：
+       max_a [Q(s,a) + l(a_E, a)] - Q(s, a_E)，l(a_E, a_E)=0，其余为 margin，
+   让示范动作的 Q 值至少比其它动作高出 margin，贪心策略一开始就接近规则基。
+
+返回的示范数据是列字典（obs / action / reward / next_obs / terminated / truncated / episode / step / task_complete），
+与 `fridge_gym.utils.trajectory.TrajectoryWriter.add_batch` 的列名一致，也可以直接存成离线数据集
+（episode 是示范内部的局编号，step 是局内步数，按 episode 列就能把并行环境交错写入的各局拼回来）。
+"""
+
+from __future__ import annotations
+
+from typing import Dict, Optional
+
+import numpy as np
+
+from fridge_gym.agents.rule_agent import RuleBasedAgent
+
+
+def generate_demonstrations(
+    num_episodes: int,
+    *,
+    num_envs: int = 256,
+    max_episode_steps: int = 500,
+    options: Optional[Dict] = None,
+    elephant_init_distance_m: float | None = None,
+    move_step_m: float | None = None,
+    agent: Optional[RuleBasedAgent] = None,
+    seed: int | None = 0,
+) -> Dict[str, np.ndarray]:
+    """
+    并行跑规则基智能体，直到完成至少 num_episodes 局；返回收集到的全部转移（列字典）。
+    options 默认 {"randomize_positions": True}。
+    """
+    from fridge_gym.envs.vector_env import FridgeVectorEnv
+
+    agent = agent or RuleBasedAgent()
+    n = int(min(num_envs, max(1, num_episodes)))
+    venv = FridgeVectorEnv(
+        n,
+        elephant_init_distance_m=elephant_init_distance_m,
+        move_step_m=move_step_m,
+        max_episode_steps=max_episode_steps,
+    )
+    obs, _info = venv.reset(seed=seed, options=options if options is not None else {"randomize_positions": True})
+
+    parts = {
+        k: [] for k in ("obs", "action", "reward", "next_obs", "terminated", "truncated", "episode", "step", "task_complete")
+    }
+    # 每个子环境当前这一局的编号与局内步数；一局结束（自动 reset）后换一个新编号
+    episode_id = np.arange(n, dtype=np.int64)
+    next_id = n
+    step = np.zeros(n, dtype=np.int32)
+    # 凑够 num_episodes 局就停；此时还没走完的局，已走的那几步也一并返回（同样是合法的示范转移）
+    episodes = 0
+    while episodes < num_episodes:
+        actions = agent.act_batch(obs)
+        next_obs, reward, terminated, truncated, info = venv.step(actions)
+        real_next = next_obs.copy()
+        finished = info.get("_final_observation")
+        if finished is not None and finished.any():
+            real_next[finished] = info["final_observation"][finished]
+            episodes += int(finished.sum())
+        parts["obs"].append(obs)
+        parts["action"].append(actions)
+        parts["reward"].append(reward.astype(np.float32))
+        parts["next_obs"].append(real_next)
+        parts["terminated"].append(terminated.copy())
+        parts["truncated"].append(truncated.copy())
+        parts["episode"].append(episode_id.copy())
+        parts["step"].append(step.copy())
+        parts["task_complete"].append(np.asarray(info["task_complete"]).copy())
+        step += 1
+        if finished is not None and finished.any():
+            k = int(finished.sum())
+            episode_id[finished] = np.arange(next_id, next_id + k)
+            next_id += k
+            step[finished] = 0
+        obs = next_obs
+    return {k: np.concatenate(v) for k, v in parts.items()}
+
+
+def load_demonstrations(dqn_agent, demos: Dict[str, np.ndarray], *, reward_clip: float = 20.0) -> int:
+    """把示范转移写进 dqn_agent 的回放池（done = terminated | truncated，奖励截断到 ±reward_clip）；返回条数。"""
+    done = np.logical_or(demos["terminated"], demos["truncated"])
+    reward = np.clip(demos["reward"], -reward_clip, reward_clip)
+    dqn_agent.push_transitions(demos["obs"], demos["action"], reward, demos["next_obs"], done)
+    return int(done.shape[0])
+
+
+def pretrain_from_demonstrations(
+    dqn_agent,
+    demos: Dict[str, np.ndarray],
+    *,
+    steps: int = 2_000,
+    batch_size: Optional[int] = None,
+    margin: float = 0.8,
+    margin_weight: float = 1.0,
+    reward_clip: float = 20.0,
+    seed: int | None = 0,
+) -> Optional[float]:
+    """
+    只用示范数据训练 Q 网络 steps 次（TD 损失 + 大间隔监督损失），结束时同步目标网络。
+    不推进 dqn_agent.train_steps：正式训练时 epsilon 仍从 epsilon_start 开始衰减。
+    返回最后一次的损失。
+    """
+    torch = dqn_agent.torch
+    dev = dqn_agent.device
+    cfg = dqn_agent.cfg
+    b = int(batch_size or cfg.batch_size)
+    rng = np.random.default_rng(seed)
+
+    s = torch.as_tensor(np.ascontiguousarray(demos["obs"], dtype=np.float32), device=dev)
+    a = torch.as_tensor(np.asarray(demos["action"], dtype=np.int64), device=dev).view(-1, 1)
+    r = torch.as_tensor(np.clip(demos["reward"], -reward_clip, reward_clip).astype(np.float32), device=dev).view(-1, 1)
+    s2 = torch.as_tensor(np.ascontiguousarray(demos["next_obs"], dtype=np.float32), device=dev)
+    done = torch.as_tensor(
+        np.logical_or(demos["terminated"], demos["truncated"]).astype(np.float32), device=dev
+    ).view(-1, 1)
+    n = int(s.shape[0])
+    if n == 0:
+        return None
+
+    margins = torch.full((b, dqn_agent.n_actions), float(margin), device=dev)
+    loss_val = None
+    for i in range(int(steps)):
+        idx = torch.as_tensor(rng.integers(0, n, size=b), device=dev)
+        s_b, a_b, r_b, s2_b, done_b = s[idx], a[idx], r[idx], s2[idx], done[idx]
+
+        q_all = dqn_agent.q(s_b)
+        q_sa = q_all.gather(1, a_b)
+        with torch.no_grad():
+            target = r_b + cfg.gamma * dqn_agent.q_target(s2_b).max(dim=1, keepdim=True).values * (1.0 - done_b)
+        td_loss = dqn_agent.loss_fn(q_sa, target)
+
+        # 大间隔监督损失：示范动作之外的动作都加上 margin，示范动作的 Q 要高出它们
+        l_margin = margins.scatter(1, a_b, 0.0)
+        sup_loss = ((q_all + l_margin).max(dim=1, keepdim=True).values - q_sa).mean()
+        loss = td_loss + float(margin_weight) * sup_loss
+
+        dqn_agent.optim.zero_grad()
+        loss.backward()
+        torch.nn.utils.clip_grad_norm_(dqn_agent.q.parameters(), max_norm=10.0)
+        dqn_agent.optim.step()
+        loss_val = float(loss.item())
+        if (i + 1) % cfg.target_update_interval == 0:
+            dqn_agent.q_target.load_state_dict(dqn_agent.q.state_dict())
+
+    dqn_agent.q_target.load_state_dict(dqn_agent.q.state_dict())
+    return loss_val
@@ -20,13 +20,15 @@ dqn_agent.py
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Deque, Dict, List, Optional, Tuple
-from collections import deque
+from typing import Dict, Optional
+import json
+import os
 import random
 
 import numpy as np
 
 from fridge_gym.agents.base import AgentOutput, BaseAgent
+from fridge_gym.utils.profiling import NULL_PROFILER
 
 
 @dataclass
@@ -44,6 +46,24 @@ class DQNConfig:
     epsilon_end: float = 0.05
     # 衰减放慢，让前期探索更充分，避免过早“陷入边界局部最优”
     epsilon_decay_steps: int = 20_000
+    # 优先经验回放（PER）：按TD误差大小采样，让稀有的“开门/进冰箱/关门成功”样本被更多地学习
+    prioritized_replay: bool = False
+    per_alpha: float = 0.6  # 优先级指数：0=均匀采样，1=完全按TD误差比例
+    per_beta_start: float = 0.4  # 重要性采样修正的起始强度，随训练线性升到1
+    per_beta_steps: int = 20_000
+    per_eps: float = 1e-3  # 防止优先级为0的样本永远抽不到
+    # 回放池存储位置："numpy"（默认）、"torch"（预分配张量，采样后直接喂给网络，省掉每批的拷贝）
+    # 或 "memmap"（磁盘上的内存映射文件，容量可以远超内存，需同时设置 replay_path）
+    replay_storage: str = "numpy"
+    replay_path: Optional[str] = None
+    # memmap：replay_path 上已有同规格的回放池时接着用；True 时清空重建
+    replay_overwrite: bool = False
+    # 每个环境步做几次梯度更新（train_updates 使用）。
+    # epsilon 按环境步衰减（train_steps / updates_per_step），改这个值不会让探索提前结束
+    updates_per_step: int = 1
+    # 回放池采样和 act_batch 探索的随机种子；None 时从 Python random 的全局状态派生，
+    # 所以和以前用 random.sample 采样时一样，random.seed(...) + torch.manual_seed(...) 就能完全复现训练
+    seed: Optional[int] = None
 
 
 class ReplayBuffer:
@@ -53,26 +73,448 @@ class ReplayBuffer:
     为什么要随机采样？
     - 如果按时间顺序训练，数据相关性很强，神经网络容易不稳定。
     - 随机采样能打散相关性，提高训练稳定性。
+
+    存储方式：预分配的环形数组（obs/next_obs 为 float32，action 为 int64，reward/done 为 float32）+ 写指针。
+    满了以后从头覆盖最旧的数据；采样就是一次随机下标 + 花式索引（gather），没有 Python 级循环。
+    """
+
+    def __init__(self, capacity: int, obs_dim: int = 5, seed: Optional[int] = None):
+        self.capacity = int(capacity)
+        self.obs_dim = int(obs_dim)
+        self._s = np.zeros((self.capacity, self.obs_dim), dtype=np.float32)
+        self._a = np.zeros((self.capacity,), dtype=np.int64)
+        self._r = np.zeros((self.capacity,), dtype=np.float32)
+        self._s2 = np.zeros((self.capacity, self.obs_dim), dtype=np.float32)
+        self._done = np.zeros((self.capacity,), dtype=np.float32)
+        self._pos = 0  # 下一条写入的位置
+        self._size = 0
+        self._rng = np.random.default_rng(seed)
+
+    def push(self, s: np.ndarray, a: int, r: float, s2: np.ndarray, done: bool):
+        i = self._pos
+        self._s[i] = s
+        self._a[i] = int(a)
+        self._r[i] = float(r)
+        self._s2[i] = s2
+        self._done[i] = float(bool(done))
+        self._pos = (i + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+        return i
+
+    def push_batch(self, s: np.ndarray, a: np.ndarray, r: np.ndarray, s2: np.ndarray, done: np.ndarray):
+        """
+        一次写入多条经验（例如向量环境一步产生的 N 条）；超过容量时只保留最新的 capacity 条。
+        返回写入位置的下标数组。
+        """
+        s = np.asarray(s, dtype=np.float32).reshape(-1, self.obs_dim)
+        n = s.shape[0]
+        if n == 0:
+            return np.zeros((0,), dtype=np.int64)
+        a = np.asarray(a, dtype=np.int64).reshape(n)
+        r = np.asarray(r, dtype=np.float32).reshape(n)
+        s2 = np.asarray(s2, dtype=np.float32).reshape(n, self.obs_dim)
+        done = np.asarray(done, dtype=np.float32).reshape(n)
+        if n > self.capacity:
+            s, a, r, s2, done = s[-self.capacity:], a[-self.capacity:], r[-self.capacity:], s2[-self.capacity:], done[-self.capacity:]
+            self._pos = (self._pos + n - self.capacity) % self.capacity
+            n = self.capacity
+        idx = (self._pos + np.arange(n)) % self.capacity
+        self._s[idx] = s
+        self._a[idx] = a
+        self._r[idx] = r
+        self._s2[idx] = s2
+        self._done[idx] = done
+        self._pos = int((self._pos + n) % self.capacity)
+        self._size = min(self._size + n, self.capacity)
+        return idx
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def nbytes(self) -> int:
+        """预分配存储占用的字节数（与已写入多少条无关）。"""
+        return int(self._s.nbytes + self._a.nbytes + self._r.nbytes + self._s2.nbytes + self._done.nbytes)
+
+    def sample_indices(self, batch_size: int) -> np.ndarray:
+        return self._rng.integers(0, self._size, size=int(batch_size))
+
+    def sample(self, batch_size: int):
+        idx = self.sample_indices(batch_size)
+        return (
+            self._s[idx],
+            self._a[idx],
+            self._r[idx],
+            self._s2[idx],
+            self._done[idx],
+        )
+
+
+class SumTree:
+    """
+    数组实现的求和树：叶子存每条经验的优先级，父节点存子节点之和。
+    - 批量更新：逐层向上重算受影响的父节点，O(B log n)
+    - 批量按比例采样：所有样本同时从根往下走，O(B log n)
+    全部是 numpy 向量运算，没有逐样本的 Python 循环。
     """
 
     def __init__(self, capacity: int):
-        self._buf: Deque[Tuple[np.ndarray, int, float, np.ndarray, bool]] = deque(maxlen=int(capacity))
+        self.capacity = int(capacity)
+        leaves = 1
+        while leaves < self.capacity:
+            leaves *= 2
+        self._leaves = leaves
+        self._depth = leaves.bit_length() - 1
+        self._tree = np.zeros((2 * leaves,), dtype=np.float64)
+
+    @property
+    def total(self) -> float:
+        return float(self._tree[1])
+
+    def get(self, idx: np.ndarray) -> np.ndarray:
+        return self._tree[np.asarray(idx, dtype=np.int64) + self._leaves]
+
+    def update(self, idx: np.ndarray, priorities: np.ndarray):
+        node = np.asarray(idx, dtype=np.int64).reshape(-1) + self._leaves
+        self._tree[node] = np.asarray(priorities, dtype=np.float64).reshape(-1)
+        for _ in range(self._depth):
+            node = np.unique(node // 2)
+            self._tree[node] = self._tree[2 * node] + self._tree[2 * node + 1]
+
+    def find(self, values: np.ndarray) -> np.ndarray:
+        """对每个 value∈[0,total) 找到前缀和落在它上的叶子下标。"""
+        values = np.array(values, dtype=np.float64)
+        node = np.ones(values.shape, dtype=np.int64)
+        for _ in range(self._depth):
+            left = 2 * node
+            left_sum = self._tree[left]
+            go_right = values >= left_sum
+            values = np.where(go_right, values - left_sum, values)
+            node = left + go_right
+        return node - self._leaves
+
+
+class PrioritizedReplayBuffer(ReplayBuffer):
+    """
+    优先经验回放：采样概率 P(i) ∝ p_i^alpha，p_i = |TD误差| + eps。
+    新经验先给“当前最大优先级”，保证至少被学到一次。
+    """
+
+    def __init__(self, capacity: int, obs_dim: int = 5, *, alpha: float = 0.6, eps: float = 1e-3, seed: Optional[int] = None):
+        super().__init__(capacity, obs_dim=obs_dim, seed=seed)
+        self.alpha = float(alpha)
+        self.eps = float(eps)
+        self._tree = SumTree(self.capacity)
+        self._max_priority = 1.0
+
+    def push(self, s: np.ndarray, a: int, r: float, s2: np.ndarray, done: bool):
+        i = super().push(s, a, r, s2, done)
+        self._tree.update(np.array([i]), np.array([self._max_priority]))
+        return i
+
+    def push_batch(self, s: np.ndarray, a: np.ndarray, r: np.ndarray, s2: np.ndarray, done: np.ndarray):
+        idx = super().push_batch(s, a, r, s2, done)
+        if idx.size:
+            self._tree.update(idx, np.full(idx.shape, self._max_priority))
+        return idx
+
+    @property
+    def nbytes(self) -> int:
+        return super().nbytes + int(self._tree._tree.nbytes)
+
+    def sample_indices(self, batch_size: int) -> np.ndarray:
+        # 分层采样：把 [0,total) 等分成 batch_size 段，每段抽一个，方差更小
+        b = int(batch_size)
+        total = self._tree.total
+        bounds = np.arange(b, dtype=np.float64) * (total / b)
+        values = bounds + self._rng.random(b) * (total / b)
+        idx = self._tree.find(values)
+        # 浮点误差可能落到尚未写入的叶子上，裁剪回有效范围
+        return np.minimum(idx, self._size - 1)
+
+    def sample_prioritized(self, batch_size: int, beta: float):
+        """返回 (s, a, r, s2, done, idx, weights)；weights 为按批内最大值归一化的重要性采样权重。"""
+        idx = self.sample_indices(batch_size)
+        probs = self._tree.get(idx) / max(self._tree.total, 1e-12)
+        weights = np.power(self._size * np.maximum(probs, 1e-12), -float(beta))
+        weights = (weights / weights.max()).astype(np.float32)
+        return self._s[idx], self._a[idx], self._r[idx], self._s2[idx], self._done[idx], idx, weights
+
+    def update_priorities(self, idx: np.ndarray, td_errors: np.ndarray):
+        """用新的 |TD误差| 批量更新优先级。"""
+        p = np.power(np.abs(np.asarray(td_errors, dtype=np.float64)) + self.eps, self.alpha)
+        self._tree.update(idx, p)
+        self._max_priority = max(self._max_priority, float(p.max()))
+
+
+def replay_record_dtype(obs_dim: int) -> np.dtype:
+    """内存映射回放池的定长记录：每条经验一行，字段紧挨着存（obs_dim=5 时 56 字节）。"""
+    return np.dtype([("a", "<i8"), ("s", "<f4", (obs_dim,)), ("s2", "<f4", (obs_dim,)), ("r", "<f4"), ("done", "<f4")])
+
+
+class MemmapReplayBuffer(ReplayBuffer):
+    """
+    磁盘上的回放池：np.memmap 映射一个定长记录文件（见 replay_record_dtype），容量可以到上千万条，
+    常驻内存的只有被访问到的页。
+
+    - 写入：单条 push 先攒在内存里的小暂存区，攒满（或采样前）一次性写进连续的一段记录，对页缓存友好；
+    - 采样：随机下标排序后一次 gather，只读到被抽中的那些行；
+    - 共享：writer 调用 flush() 后，其它进程可以用 `MemmapReplayBuffer.open(path)` 只读打开同一个文件，
+      用 refresh() 读取最新的写入位置 / 条数。
+    - 续用：path 上已有容量、obs_dim 都相同的回放池时直接接着用（读写打开，保留已有经验）；
+      不一致、或只有数据文件没有 meta 时报错，传 overwrite=True 才会清空重建。
+    元数据（容量、obs_dim、写指针、条数）存在旁边的 <path>.meta.json 里。
+    """
+
+    META_VERSION = 1
+
+    def __init__(
+        self,
+        path: str,
+        capacity: int,
+        obs_dim: int = 5,
+        seed: Optional[int] = None,
+        *,
+        stage_rows: int = 4096,
+        overwrite: bool = False,
+        _mode: Optional[str] = None,
+        _meta: Optional[Dict] = None,
+    ):
+        self.capacity = int(capacity)
+        self.obs_dim = int(obs_dim)
+        self.path = os.fspath(path)
+        meta = _meta
+        if _mode is None:
+            _mode, meta = self._existing_mode(overwrite)
+        self.readonly = _mode == "r"
+        self._rec = np.memmap(self.path, dtype=replay_record_dtype(self.obs_dim), mode=_mode, shape=(self.capacity,))
+        # 字段视图：与 ReplayBuffer 的 _s/_a/... 同名，sample 等继承来的代码和 checkpoint 都能直接用
+        self._s = self._rec["s"]
+        self._a = self._rec["a"]
+        self._r = self._rec["r"]
+        self._s2 = self._rec["s2"]
+        self._done = self._rec["done"]
+        self._pos = int(meta["pos"]) if meta is not None else 0
+        self._size = int(meta["size"]) if meta is not None else 0
+        self._rng = np.random.default_rng(seed)
+        self._stage = np.zeros((max(1, int(stage_rows)),), dtype=self._rec.dtype)
+        self._n_staged = 0
+        # 写指针 / 条数已经按已有的 meta 恢复，这里 flush 不会把磁盘上的 meta 改成空池
+        if not self.readonly:
+            self.flush()
+
+    def _existing_mode(self, overwrite: bool):
+        """决定怎么打开 path：新建（"w+"），或读写打开已有的同规格回放池（"r+"，连同其 meta 返回）。"""
+        if overwrite or not os.path.exists(self.path):
+            return "w+", None
+        if not os.path.exists(self.path + ".meta.json"):
+            raise ValueError(f"{self.path} 已存在但不是回放池文件（缺少 .meta.json）；确认可以覆盖时传 overwrite=True")
+        meta = self._read_meta(self.path)
+        if int(meta["capacity"]) != self.capacity or int(meta["obs_dim"]) != self.obs_dim:
+            raise ValueError(
+                f"{self.path} 上已有的回放池 capacity={meta['capacity']} obs_dim={meta['obs_dim']}，"
+                f"与要求的 capacity={self.capacity} obs_dim={self.obs_dim} 不一致；确认可以覆盖时传 overwrite=True"
+            )
+        return "r+", meta
+
+    @classmethod
+    def open(cls, path: str, *, readonly: bool = True, seed: Optional[int] = None) -> "MemmapReplayBuffer":
+        """打开已有的回放池文件（默认只读，用于多个学习者进程共享同一份经验）。"""
+        meta = cls._read_meta(path)
+        return cls(path, meta["capacity"], meta["obs_dim"], seed, _mode="r" if readonly else "r+", _meta=meta)
+
+    @staticmethod
+    def _read_meta(path: str) -> Dict:
+        with open(os.fspath(path) + ".meta.json", "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") != MemmapReplayBuffer.META_VERSION:
+            raise ValueError(f"不支持的回放池文件版本：{meta.get('version')!r}")
+        return meta
+
+    def refresh(self) -> None:
+        """只读打开时：重新读取 writer 最近一次 flush() 的写指针和条数。"""
+        meta = self._read_meta(self.path)
+        self._pos, self._size = int(meta["pos"]), int(meta["size"])
+
+    def flush(self) -> None:
+        """把暂存区写进文件、刷盘，并更新 meta（先数据后 meta，读者看到的条数总是已写好的）。"""
+        self._flush_stage()
+        self._rec.flush()
+        meta = {"version": self.META_VERSION, "capacity": self.capacity, "obs_dim": self.obs_dim, "pos": self._pos, "size": self._size}
+        tmp = self.path + ".meta.json.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp, self.path + ".meta.json")
+
+    def _check_writable(self):
+        if self.readonly:
+            raise ValueError("只读打开的回放池不能写入")
+
+    def _write_records(self, rec: np.ndarray) -> np.ndarray:
+        """把一批连续记录写到写指针处（最多拆成两段连续切片），返回写入的下标。"""
+        n = rec.shape[0]
+        if n > self.capacity:
+            rec = rec[-self.capacity:]
+            self._pos = (self._pos + n - self.capacity) % self.capacity
+            n = self.capacity
+        pos = self._pos
+        first = min(n, self.capacity - pos)
+        self._rec[pos : pos + first] = rec[:first]
+        if first < n:
+            self._rec[: n - first] = rec[first:]
+        self._pos = int((pos + n) % self.capacity)
+        self._size = min(self._size + n, self.capacity)
+        return (pos + np.arange(n)) % self.capacity
+
+    def _flush_stage(self) -> None:
+        if self._n_staged:
+            n, self._n_staged = self._n_staged, 0
+            self._write_records(self._stage[:n])
+
+    def push(self, s: np.ndarray, a: int, r: float, s2: np.ndarray, done: bool):
+        self._check_writable()
+        k = self._n_staged
+        row = self._stage[k]
+        row["s"] = s
+        row["a"] = int(a)
+        row["r"] = float(r)
+        row["s2"] = s2
+        row["done"] = float(bool(done))
+        self._n_staged = k + 1
+        i = (self._pos + k) % self.capacity
+        if self._n_staged == self._stage.shape[0]:
+            self._flush_stage()
+        return i
+
+    def push_batch(self, s: np.ndarray, a: np.ndarray, r: np.ndarray, s2: np.ndarray, done: np.ndarray):
+        self._check_writable()
+        self._flush_stage()
+        s = np.asarray(s, dtype=np.float32).reshape(-1, self.obs_dim)
+        n = s.shape[0]
+        if n == 0:
+            return np.zeros((0,), dtype=np.int64)
+        rec = np.empty((n,), dtype=self._rec.dtype)
+        rec["s"] = s
+        rec["a"] = np.asarray(a, dtype=np.int64).reshape(n)
+        rec["r"] = np.asarray(r, dtype=np.float32).reshape(n)
+        rec["s2"] = np.asarray(s2, dtype=np.float32).reshape(n, self.obs_dim)
+        rec["done"] = np.asarray(done, dtype=np.float32).reshape(n)
+        return self._write_records(rec)
+
+    def __len__(self) -> int:
+        return min(self._size + self._n_staged, self.capacity)
+
+    @property
+    def nbytes(self) -> int:
+        """文件大小（不是常驻内存）。"""
+        return int(self._rec.nbytes)
+
+    def sample_indices(self, batch_size: int) -> np.ndarray:
+        self._flush_stage()
+        # 排序后按文件顺序访问，同一页上的行只读一次
+        return np.sort(self._rng.integers(0, self._size, size=int(batch_size)))
+
+    def sample(self, batch_size: int):
+        rec = self._rec[self.sample_indices(batch_size)]
+        return rec["s"], rec["a"], rec["r"], rec["s2"], rec["done"]
+
+
+class TorchReplayBuffer:
+    """
+    张量版经验回放：经验直接存成预分配的 torch 张量（与网络在同一 device 上）。
+
+    采样用 torch.randint 生成下标，再用 index_select 把数据 gather 进复用的批次张量，
+    train_one_step 不再需要每批 `torch.tensor(numpy数组)` 新分配 + 拷贝。
+    注意：sample_tensors 返回的张量在下一次采样时会被覆盖，需在此之前用完。
+    """
+
+    def __init__(self, capacity: int, obs_dim: int, torch, device: str = "cpu", seed: Optional[int] = None):
+        self.capacity = int(capacity)
+        self.obs_dim = int(obs_dim)
+        self.torch = torch
+        self.device = device
+        self._s = torch.zeros((self.capacity, self.obs_dim), dtype=torch.float32, device=device)
+        self._a = torch.zeros((self.capacity,), dtype=torch.int64, device=device)
+        self._r = torch.zeros((self.capacity,), dtype=torch.float32, device=device)
+        self._s2 = torch.zeros((self.capacity, self.obs_dim), dtype=torch.float32, device=device)
+        self._done = torch.zeros((self.capacity,), dtype=torch.float32, device=device)
+        self._pos = 0
+        self._size = 0
+        self._gen = torch.Generator(device=device)
+        if seed is not None:
+            self._gen.manual_seed(int(seed))
+        else:
+            self._gen.seed()
+        self._batch = None  # (idx, s, a, r, s2, done) 复用的批次张量
 
     def push(self, s: np.ndarray, a: int, r: float, s2: np.ndarray, done: bool):
-        self._buf.append((s.astype(np.float32), int(a), float(r), s2.astype(np.float32), bool(done)))
+        return int(self.push_batch(np.asarray(s)[None], [a], [r], np.asarray(s2)[None], [done])[0])
+
+    def push_batch(self, s: np.ndarray, a: np.ndarray, r: np.ndarray, s2: np.ndarray, done: np.ndarray):
+        """一次写入多条经验；超过容量时只保留最新的 capacity 条。返回写入位置的下标数组。"""
+        torch = self.torch
+        s = np.asarray(s, dtype=np.float32).reshape(-1, self.obs_dim)
+        n = s.shape[0]
+        if n == 0:
+            return np.zeros((0,), dtype=np.int64)
+        a = np.asarray(a, dtype=np.int64).reshape(n)
+        r = np.asarray(r, dtype=np.float32).reshape(n)
+        s2 = np.asarray(s2, dtype=np.float32).reshape(n, self.obs_dim)
+        done = np.asarray(done, dtype=np.float32).reshape(n)
+        if n > self.capacity:
+            s, a, r, s2, done = s[-self.capacity:], a[-self.capacity:], r[-self.capacity:], s2[-self.capacity:], done[-self.capacity:]
+            self._pos = (self._pos + n - self.capacity) % self.capacity
+            n = self.capacity
+        idx = (self._pos + np.arange(n)) % self.capacity
+        idx_t = torch.from_numpy(idx).to(self.device)
+        self._s.index_copy_(0, idx_t, torch.from_numpy(np.ascontiguousarray(s)).to(self.device))
+        self._a.index_copy_(0, idx_t, torch.from_numpy(a).to(self.device))
+        self._r.index_copy_(0, idx_t, torch.from_numpy(r).to(self.device))
+        self._s2.index_copy_(0, idx_t, torch.from_numpy(np.ascontiguousarray(s2)).to(self.device))
+        self._done.index_copy_(0, idx_t, torch.from_numpy(done).to(self.device))
+        self._pos = int((self._pos + n) % self.capacity)
+        self._size = min(self._size + n, self.capacity)
+        return idx
 
     def __len__(self) -> int:
-        return len(self._buf)
+        return self._size
+
+    @property
+    def nbytes(self) -> int:
+        return int(sum(t.element_size() * t.nelement() for t in (self._s, self._a, self._r, self._s2, self._done)))
+
+    def sample_tensors(self, batch_size: int):
+        """返回 (s, a, r, s2, done) 张量，a/r/done 为 shape=(B,1)，直接用于计算目标值。"""
+        torch = self.torch
+        b = int(batch_size)
+        if self._batch is None or self._batch[0].shape[0] != b:
+            dev = self.device
+            self._batch = (
+                torch.empty((b,), dtype=torch.int64, device=dev),
+                torch.empty((b, self.obs_dim), dtype=torch.float32, device=dev),
+                torch.empty((b,), dtype=torch.int64, device=dev),
+                torch.empty((b,), dtype=torch.float32, device=dev),
+                torch.empty((b, self.obs_dim), dtype=torch.float32, device=dev),
+                torch.empty((b,), dtype=torch.float32, device=dev),
+            )
+        idx, s, a, r, s2, done = self._batch
+        torch.randint(0, self._size, (b,), generator=self._gen, out=idx)
+        torch.index_select(self._s, 0, idx, out=s)
+        torch.index_select(self._a, 0, idx, out=a)
+        torch.index_select(self._r, 0, idx, out=r)
+        torch.index_select(self._s2, 0, idx, out=s2)
+        torch.index_select(self._done, 0, idx, out=done)
+        return s, a.view(-1, 1), r.view(-1, 1), s2, done.view(-1, 1)
 
     def sample(self, batch_size: int):
-        batch = random.sample(self._buf, int(batch_size))
-        s, a, r, s2, done = zip(*batch)
+        """与 ReplayBuffer.sample 相同的 numpy 返回格式（调试/兼容用）。"""
+        s, a, r, s2, done = self.sample_tensors(batch_size)
         return (
-            np.stack(s, axis=0),
-            np.asarray(a, dtype=np.int64),
-            np.asarray(r, dtype=np.float32),
-            np.stack(s2, axis=0),
-            np.asarray(done, dtype=np.float32),
+            s.cpu().numpy().copy(),
+            a.view(-1).cpu().numpy().copy(),
+            r.view(-1).cpu().numpy().copy(),
+            s2.cpu().numpy().copy(),
+            done.view(-1).cpu().numpy().copy(),
         )
 
 
@@ -124,12 +566,48 @@ class DQNAgent(BaseAgent):
         self.optim = torch.optim.Adam(self.q.parameters(), lr=self.cfg.lr)
         self.loss_fn = nn.SmoothL1Loss()
 
-        self.buffer = ReplayBuffer(self.cfg.buffer_size)
+        if self.cfg.replay_storage not in ("numpy", "torch", "memmap"):
+            raise ValueError(f"replay_storage 只能是 'numpy'、'torch' 或 'memmap'，实际为 {self.cfg.replay_storage!r}")
+        if self.cfg.replay_storage != "numpy" and self.cfg.prioritized_replay:
+            raise ValueError("prioritized_replay 目前只支持 replay_storage='numpy'")
+        self.seed = int(self.cfg.seed) if self.cfg.seed is not None else random.getrandbits(63)
+        if self.cfg.replay_storage == "torch":
+            self.buffer = TorchReplayBuffer(self.cfg.buffer_size, self.obs_dim, torch, device=self.device, seed=self.seed)
+        elif self.cfg.replay_storage == "memmap":
+            if not self.cfg.replay_path:
+                raise ValueError("replay_storage='memmap' 需要设置 replay_path")
+            self.buffer = MemmapReplayBuffer(
+                self.cfg.replay_path,
+                self.cfg.buffer_size,
+                obs_dim=self.obs_dim,
+                seed=self.seed,
+                overwrite=self.cfg.replay_overwrite,
+            )
+        elif self.cfg.prioritized_replay:
+            self.buffer = PrioritizedReplayBuffer(
+                self.cfg.buffer_size, obs_dim=self.obs_dim, alpha=self.cfg.per_alpha, eps=self.cfg.per_eps, seed=self.seed
+            )
+        else:
+            self.buffer = ReplayBuffer(self.cfg.buffer_size, obs_dim=self.obs_dim, seed=self.seed)
         self.train_steps = 0
 
+        # act_batch 复用的输入张量（按批大小懒分配）和 epsilon-greedy 用的随机数发生器
+        self._act_in = None
+        self._act_rng = np.random.default_rng([self.seed, 1])
+
+        # 分阶段计时（fridge_gym.utils.profiling.PhaseProfiler）；默认是空操作的 NULL_PROFILER
+        self.profiler = NULL_PROFILER
+        # load_checkpoint 时恢复的调用方附加信息（例如训练到第几局）
+        self.checkpoint_extra: Dict = {}
+
+    def _per_beta(self) -> float:
+        # 重要性采样修正强度：从 per_beta_start 线性升到 1（训练后期完全修正采样偏差）
+        frac = min(1.0, self.train_steps / float(max(1, self.cfg.per_beta_steps)))
+        return float(self.cfg.per_beta_start + frac * (1.0 - self.cfg.per_beta_start))
+
     def _epsilon(self) -> float:
-        # 线性衰减：从start逐步降到end
-        t = min(self.train_steps, self.cfg.epsilon_decay_steps)
+        # 线性衰减：从start逐步降到end；按环境步计（每个环境步做 updates_per_step 次更新）
+        t = min(self.train_steps / float(max(1, self.cfg.updates_per_step)), self.cfg.epsilon_decay_steps)
         frac = t / float(self.cfg.epsilon_decay_steps)
         return float(self.cfg.epsilon_start + frac * (self.cfg.epsilon_end - self.cfg.epsilon_start))
 
@@ -143,6 +621,33 @@ class DQNAgent(BaseAgent):
             q_values = self.q(x)
             return int(self.torch.argmax(q_values, dim=1).item())
 
+    def act_batch(self, obs: np.ndarray, explore: bool = True) -> np.ndarray:
+        """
+        一次为 N 个环境选动作：obs shape=(N, obs_dim) → 动作索引 shape=(N,)。
+
+        只做一次前向传播 + 一次向量化的 epsilon-greedy 抽样；输入写进复用的预分配张量，
+        把 torch 的调度开销摊到整个批次上（配合 FridgeVectorEnv 使用）。
+        """
+        torch = self.torch
+        obs = np.ascontiguousarray(obs, dtype=np.float32).reshape(-1, self.obs_dim)
+        n = obs.shape[0]
+        eps = self._epsilon() if explore else 0.0
+        explore_mask = self._act_rng.random(n) < eps if explore else None
+        if explore_mask is not None and explore_mask.all():
+            # 这一批全部随机探索：不需要跑网络
+            return self._act_rng.integers(0, self.n_actions, size=n, dtype=np.int64)
+
+        if self._act_in is None or self._act_in.shape[0] != n:
+            self._act_in = torch.empty((n, self.obs_dim), dtype=torch.float32, device=self.device)
+        self._act_in.copy_(torch.from_numpy(obs))
+        with torch.no_grad():
+            actions = torch.argmax(self.q(self._act_in), dim=1).cpu().numpy().astype(np.int64)
+
+        if explore_mask is not None and explore_mask.any():
+            random_actions = self._act_rng.integers(0, self.n_actions, size=n, dtype=np.int64)
+            actions = np.where(explore_mask, random_actions, actions)
+        return actions
+
     def act(self, obs: np.ndarray, info: Optional[Dict] = None) -> AgentOutput:
         a = self.act_index(obs, explore=False)
         return AgentOutput(action_onehot=self.onehot(a), debug={"policy": "greedy"})
@@ -150,6 +655,10 @@ class DQNAgent(BaseAgent):
     def push_transition(self, s: np.ndarray, a_idx: int, r: float, s2: np.ndarray, done: bool):
         self.buffer.push(s, a_idx, r, s2, done)
 
+    def push_transitions(self, s: np.ndarray, a_idx: np.ndarray, r: np.ndarray, s2: np.ndarray, done: np.ndarray):
+        """批量写入经验（配合 FridgeVectorEnv 一步产生的 N 条数据）。"""
+        self.buffer.push_batch(s, a_idx, r, s2, done)
+
     def train_one_step(self) -> Optional[float]:
         """
         执行一次梯度更新。
@@ -158,34 +667,104 @@ class DQNAgent(BaseAgent):
         if len(self.buffer) < self.cfg.min_buffer_size:
             return None
 
-        s, a, r, s2, done = self.buffer.sample(self.cfg.batch_size)
         torch = self.torch
-
-        s_t = torch.tensor(s, dtype=torch.float32, device=self.device)
-        a_t = torch.tensor(a, dtype=torch.int64, device=self.device).view(-1, 1)
-        r_t = torch.tensor(r, dtype=torch.float32, device=self.device).view(-1, 1)
-        s2_t = torch.tensor(s2, dtype=torch.float32, device=self.device)
-        done_t = torch.tensor(done, dtype=torch.float32, device=self.device).view(-1, 1)
-
-        # 当前Q(s,a)
-        q_sa = self.q(s_t).gather(1, a_t)
-
-        with torch.no_grad():
-            # 目标：r + gamma * max_a' Q_target(s', a') * (1-done)
-            max_next_q = self.q_target(s2_t).max(dim=1, keepdim=True).values
-            target = r_t + self.cfg.gamma * max_next_q * (1.0 - done_t)
-
-        loss = self.loss_fn(q_sa, target)
-
-        self.optim.zero_grad()
-        loss.backward()
-        # 梯度裁剪：避免梯度爆炸导致loss突然飙升、策略崩坏
-        torch.nn.utils.clip_grad_norm_(self.q.parameters(), max_norm=10.0)
-        self.optim.step()
+        prof = self.profiler
+        prioritized = isinstance(self.buffer, PrioritizedReplayBuffer)
+        with prof.phase("train/sample"):
+            s_t, a_t, r_t, s2_t, done_t, idx, weights = self._sample_batch(prioritized)
+
+        with prof.phase("train/forward"):
+            # 当前Q(s,a)
+            q_sa = self.q(s_t).gather(1, a_t)
+
+            with torch.no_grad():
+                # 目标：r + gamma * max_a' Q_target(s', a') * (1-done)
+                max_next_q = self.q_target(s2_t).max(dim=1, keepdim=True).values
+                target = r_t + self.cfg.gamma * max_next_q * (1.0 - done_t)
+
+            if prioritized:
+                # 每个样本的损失乘以重要性采样权重，抵消“按优先级采样”带来的分布偏差
+                w_t = torch.tensor(weights, dtype=torch.float32, device=self.device).view(-1, 1)
+                per_sample = torch.nn.functional.smooth_l1_loss(q_sa, target, reduction="none")
+                loss = (w_t * per_sample).mean()
+                td_errors = (q_sa - target).detach().abs().view(-1).cpu().numpy()
+                self.buffer.update_priorities(idx, td_errors)
+            else:
+                loss = self.loss_fn(q_sa, target)
+
+        with prof.phase("train/backward"):
+            self.optim.zero_grad()
+            loss.backward()
+            # 梯度裁剪：避免梯度爆炸导致loss突然飙升、策略崩坏
+            torch.nn.utils.clip_grad_norm_(self.q.parameters(), max_norm=10.0)
+            self.optim.step()
 
         self.train_steps += 1
         if self.train_steps % self.cfg.target_update_interval == 0:
-            self.q_target.load_state_dict(self.q.state_dict())
+            with prof.phase("train/target_sync"):
+                self.q_target.load_state_dict(self.q.state_dict())
 
         return float(loss.item())
 
+    def _sample_batch(self, prioritized: bool):
+        """采样一批并转成张量：(s, a, r, s2, done, idx, weights)，a/r/done 为 shape=(B,1)；非 PER 时 idx/weights 为 None。"""
+        torch = self.torch
+        idx = weights = None
+        if isinstance(self.buffer, TorchReplayBuffer):
+            # 张量版回放池：直接拿到 device 上的批次张量，没有 numpy→tensor 拷贝
+            s_t, a_t, r_t, s2_t, done_t = self.buffer.sample_tensors(self.cfg.batch_size)
+        else:
+            if prioritized:
+                s, a, r, s2, done, idx, weights = self.buffer.sample_prioritized(self.cfg.batch_size, self._per_beta())
+            else:
+                s, a, r, s2, done = self.buffer.sample(self.cfg.batch_size)
+
+            s_t = torch.tensor(s, dtype=torch.float32, device=self.device)
+            a_t = torch.tensor(a, dtype=torch.int64, device=self.device).view(-1, 1)
+            r_t = torch.tensor(r, dtype=torch.float32, device=self.device).view(-1, 1)
+            s2_t = torch.tensor(s2, dtype=torch.float32, device=self.device)
+            done_t = torch.tensor(done, dtype=torch.float32, device=self.device).view(-1, 1)
+        return s_t, a_t, r_t, s2_t, done_t, idx, weights
+
+    def train_updates(self, n_updates: Optional[int] = None) -> Optional[float]:
+        """
+        每个环境步调用一次：连续做 n_updates 次梯度更新（默认 cfg.updates_per_step）。
+        返回最后一次的 loss（buffer 不够大时返回 None）。
+        """
+        n = int(self.cfg.updates_per_step if n_updates is None else n_updates)
+        loss = None
+        for _ in range(n):
+            step_loss = self.train_one_step()
+            if step_loss is None:
+                break
+            loss = step_loss
+        return loss
+
+    def save_checkpoint(self, path: str, *, extra: Optional[Dict] = None) -> None:
+        """完整训练状态存盘（网络、优化器、train_steps、随机数状态、回放池），见 `fridge_gym.agents.checkpoint`。"""
+        from fridge_gym.agents.checkpoint import save_checkpoint
+
+        save_checkpoint(self, path, extra=extra)
+
+    @classmethod
+    def load_checkpoint(cls, path: str, *, device: str = "cpu", restore_global_rng: bool = True) -> "DQNAgent":
+        """从 save_checkpoint 的目录恢复，可以直接接着 train_one_step。"""
+        from fridge_gym.agents.checkpoint import load_checkpoint
+
+        return load_checkpoint(path, device=device, restore_global_rng=restore_global_rng)
+
+    def numpy_weights(self) -> Dict[str, np.ndarray]:
+        """在线Q网络权重的 numpy 拷贝，格式与 `NumpyPolicy` 一致：n_layers、w{i}（(in, out) 布局）、b{i}。"""
+        linears = [m for m in self.q.net if isinstance(m, self.torch.nn.Linear)]
+        arrays = {"n_layers": np.asarray(len(linears), dtype=np.int64)}
+        for i, layer in enumerate(linears):
+            arrays[f"w{i}"] = layer.weight.detach().cpu().numpy().T.astype(np.float32)
+            arrays[f"b{i}"] = layer.bias.detach().cpu().numpy().astype(np.float32)
+        return arrays
+
+    def export_numpy(self, path: str) -> None:
+        """
+        把在线Q网络的权重导出为紧凑的 .npz，供 `NumpyPolicy` 在不安装/不导入 torch 的进程里做贪心推理。
+        w{i} 以 (in, out) 布局保存，推理时直接 x @ w。
+        """
+        np.savez(path, **self.numpy_weights())
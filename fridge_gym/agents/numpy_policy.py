@@ -0,0 +1,74 @@
+"""
+numpy_policy.py
+=================
+只用 numpy 的贪心策略运行时：加载 `DQNAgent.export_numpy()` 导出的 `.npz` 权重，
+做 “Linear → ReLU → … → Linear → argmax” 的前向计算。
+
+适用场景：只需要“执行学到的策略”（演示按 4、纯贪心评估），不需要训练。
+这样既不用 import torch，也不用构建两张网络和优化器，启动快、单步延迟低。
+"""
+
+from __future__ import annotations
+
+from typing import Dict, Optional
+
+import numpy as np
+
+from fridge_gym.agents.base import AgentOutput, BaseAgent
+
+
+class NumpyPolicy(BaseAgent):
+    """
+    多层感知机的纯 numpy 贪心策略。
+
+    权重约定（与 export_numpy 一致）：w{i} shape=(in, out)，b{i} shape=(out,)，
+    除最后一层外每层后接 ReLU。
+    """
+
+    def __init__(self, weights: Dict[str, np.ndarray]):
+        n_layers = int(weights["n_layers"])
+        self.weights = [np.ascontiguousarray(weights[f"w{i}"], dtype=np.float32) for i in range(n_layers)]
+        self.biases = [np.ascontiguousarray(weights[f"b{i}"], dtype=np.float32) for i in range(n_layers)]
+        self.obs_dim = int(self.weights[0].shape[0])
+        self.n_actions = int(self.weights[-1].shape[1])
+        # 单步推理复用的中间结果缓冲区（batch=1 时零分配）
+        self._x1 = np.zeros((1, self.obs_dim), dtype=np.float32)
+        self._bufs1 = [np.zeros((1, w.shape[1]), dtype=np.float32) for w in self.weights]
+
+    @classmethod
+    def load(cls, path: str) -> "NumpyPolicy":
+        with np.load(path) as data:
+            return cls({k: data[k] for k in data.files})
+
+    def _forward(self, x: np.ndarray, bufs) -> np.ndarray:
+        h = x
+        last = len(self.weights) - 1
+        for i, (w, b, out) in enumerate(zip(self.weights, self.biases, bufs)):
+            np.matmul(h, w, out=out)
+            out += b
+            if i != last:
+                np.maximum(out, 0.0, out=out)
+            h = out
+        return h
+
+    def q_values(self, obs: np.ndarray) -> np.ndarray:
+        """返回 Q 值：obs shape=(obs_dim,) → (n_actions,)；obs shape=(N, obs_dim) → (N, n_actions)。"""
+        obs = np.asarray(obs, dtype=np.float32)
+        if obs.ndim == 1:
+            self._x1[0] = obs
+            return self._forward(self._x1, self._bufs1)[0].copy()
+        bufs = [np.empty((obs.shape[0], w.shape[1]), dtype=np.float32) for w in self.weights]
+        return self._forward(obs, bufs)
+
+    def act_index(self, obs: np.ndarray, explore: bool = False) -> int:
+        """返回动作索引（0..5）。explore 参数只为与 DQNAgent 接口一致，这里始终是贪心。"""
+        self._x1[0] = obs
+        return int(np.argmax(self._forward(self._x1, self._bufs1)[0]))
+
+    def act_batch(self, obs: np.ndarray, explore: bool = False) -> np.ndarray:
+        """obs shape=(N, obs_dim) → 贪心动作索引 shape=(N,)。"""
+        return np.argmax(self.q_values(np.asarray(obs, dtype=np.float32).reshape(-1, self.obs_dim)), axis=1)
+
+    def act(self, obs: np.ndarray, info: Optional[Dict] = None) -> AgentOutput:
+        a = self.act_index(obs)
+        return AgentOutput(action_onehot=self.onehot(a), debug={"policy": "greedy-numpy"})
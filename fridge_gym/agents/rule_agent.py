@@ -70,3 +70,36 @@ class RuleBasedAgent(BaseAgent):
 
         return AgentOutput(action_onehot=self.onehot(action), debug={"why": why})
 
+    def act_batch(
+        self, obs: np.ndarray, explore: bool = False, *, onehot: bool = False, out: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """
+        向量化版本：obs shape=(N,5) → 动作索引 shape=(N,)（onehot=True 时返回 shape=(N,6) 的 int8 独热矩阵）。
+
+        决策与 act() 逐行一致（同样先转成 float64 再算 dx/dy），只是用 numpy 掩码代替 if-else，
+        不生成逐行的 one-hot 和 debug 字典。out 可传入复用的输出数组（动作索引为 int64）。
+        explore 只是为了与 DQNAgent / NumpyPolicy 的 act_batch 签名一致：规则基没有探索，忽略。
+        """
+        obs = np.asarray(obs).reshape(-1, 5)
+        o = obs.astype(np.float64, copy=False)
+        dx = o[:, 3] - o[:, 1]
+        dy = o[:, 4] - o[:, 2]
+        big_dx = np.abs(dx) > self.align_dx_threshold
+        big_dy = np.abs(dy) > self.align_dy_threshold
+
+        # 优先级从低到高依次覆盖：左右移动 → 上下移动 → 已在冰箱区域关门 → 门关先开门
+        action = np.where(dx > 0, 5, 4)
+        np.copyto(action, np.where(dy > 0, 3, 2), where=big_dy)
+        action[~(big_dx | big_dy)] = 1
+        action[obs[:, 0] <= 0.5] = 0
+
+        if onehot:
+            mat = out if out is not None else np.zeros((action.shape[0], 6), dtype=np.int8)
+            mat.fill(0)
+            mat[np.arange(action.shape[0]), action] = 1
+            return mat
+        if out is not None:
+            out[...] = action
+            return out
+        return action
+
@@ -0,0 +1,147 @@
+"""
+table_policy.py
+=================
+把训练好的贪心策略“冻结”成查表策略。
+
+冰箱位置固定时，大象能到达的位置落在以 move_step_m 为间隔的网格上，
+所以贪心策略本质上就是一张表：(门开/关, 网格x, 网格y) → 动作。
+`freeze_policy_table` 对全部网格状态只做一次批量前向传播，把 argmax Q 存进 int8 数组；
+`TablePolicy.act()` 之后只需一次数组下标访问，不再需要神经网络。
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from fridge_gym.agents.base import AgentOutput, BaseAgent
+
+
+class TablePolicy(BaseAgent):
+    """
+    查表策略：table[door, ix, iy] = 动作索引（int8）。
+
+    - xs / ys：网格上大象的像素坐标；
+    - fridge_pos：这张表对应的冰箱像素坐标（冰箱位置不同就不能用这张表）；
+    - step_px：网格间隔（环境的 move_step_px）；不传时由 xs / ys 的间距推出（两个轴都只有一个点时必须传）；
+    - fallback：遇到网格外的观测（或冰箱位置不同）时交给它处理；没有 fallback 就抛 ValueError。
+    """
+
+    def __init__(
+        self,
+        table: np.ndarray,
+        xs: np.ndarray,
+        ys: np.ndarray,
+        fridge_pos,
+        *,
+        pixels_per_meter: float = 100.0,
+        step_px: Optional[float] = None,
+        fallback: Optional[BaseAgent] = None,
+    ):
+        self.table = np.ascontiguousarray(table, dtype=np.int8)
+        self.xs = np.asarray(xs, dtype=np.float64)
+        self.ys = np.asarray(ys, dtype=np.float64)
+        self.fridge_pos = (float(fridge_pos[0]), float(fridge_pos[1]))
+        self.pixels_per_meter = float(pixels_per_meter)
+        self.fallback = fallback
+        self._x0, self._y0 = float(self.xs[0]), float(self.ys[0])
+        if step_px is not None:
+            self._step = float(step_px)
+        elif len(self.xs) > 1:
+            self._step = float(self.xs[1] - self.xs[0])
+        elif len(self.ys) > 1:
+            self._step = float(self.ys[1] - self.ys[0])
+        else:
+            raise ValueError("网格只有一个点，无法推出步长，请传 step_px")
+        # 观测是 float32 的“米”，换回像素后允许的误差（远小于半个步长）
+        self._tol_px = 0.25 * self._step
+
+    def lookup(self, obs: np.ndarray) -> Optional[int]:
+        """观测 → 动作索引；不在表内时返回 None。"""
+        ppm = self.pixels_per_meter
+        if abs(float(obs[3]) * ppm - self.fridge_pos[0]) > self._tol_px or abs(float(obs[4]) * ppm - self.fridge_pos[1]) > self._tol_px:
+            return None
+        ex = float(obs[1]) * ppm
+        ey = float(obs[2]) * ppm
+        ix = int(round((ex - self._x0) / self._step))
+        iy = int(round((ey - self._y0) / self._step))
+        if not (0 <= ix < len(self.xs) and 0 <= iy < len(self.ys)):
+            return None
+        if abs(self.xs[ix] - ex) > self._tol_px or abs(self.ys[iy] - ey) > self._tol_px:
+            return None
+        return int(self.table[1 if obs[0] > 0.5 else 0, ix, iy])
+
+    def act_index(self, obs: np.ndarray, explore: bool = False) -> int:
+        a = self.lookup(obs)
+        if a is not None:
+            return a
+        if self.fallback is None:
+            raise ValueError("观测不在策略表的网格内（起点/冰箱位置与冻结时不同？），且没有设置 fallback")
+        return int(self.fallback.act(obs).action_onehot.argmax())
+
+    def act(self, obs: np.ndarray, info: Optional[Dict] = None) -> AgentOutput:
+        return AgentOutput(action_onehot=self.onehot(self.act_index(obs)), debug={"policy": "table"})
+
+    def save(self, path: str) -> None:
+        np.savez(
+            path,
+            table=self.table,
+            xs=self.xs,
+            ys=self.ys,
+            fridge_pos=np.asarray(self.fridge_pos),
+            pixels_per_meter=np.asarray(self.pixels_per_meter),
+            step_px=np.asarray(self._step),
+        )
+
+    @classmethod
+    def load(cls, path: str, *, fallback: Optional[BaseAgent] = None) -> "TablePolicy":
+        with np.load(path) as data:
+            return cls(
+                data["table"],
+                data["xs"],
+                data["ys"],
+                tuple(data["fridge_pos"]),
+                pixels_per_meter=float(data["pixels_per_meter"]),
+                step_px=float(data["step_px"]) if "step_px" in data.files else None,
+                fallback=fallback,
+            )
+
+
+def freeze_policy_table(
+    agent,
+    start_options: Optional[Dict[str, Any]] = None,
+    *,
+    elephant_init_distance_m: float | None = None,
+    move_step_m: float | None = None,
+    fallback: Optional[BaseAgent] = None,
+) -> TablePolicy:
+    """
+    对给定起点（reset 的 options）能到达的所有 (door, x, y) 状态做一次批量前向传播，
+    得到贪心动作表。agent 需要提供 `act_batch(obs, explore=False)`（DQNAgent / NumpyPolicy 均可）。
+    """
+    from fridge_gym.envs.fridge_env import FridgeGameEnv
+    from fridge_gym.planning.oracle import elephant_grid
+
+    env = FridgeGameEnv(render_mode="none", elephant_init_distance_m=elephant_init_distance_m, move_step_m=move_step_m)
+    env.reset(options=start_options)
+    xs, ys = elephant_grid(env)
+    ppm = float(env.PIXELS_PER_METER)
+
+    door, ix, iy = np.meshgrid(np.arange(2), np.arange(len(xs)), np.arange(len(ys)), indexing="ij")
+    obs = np.empty(door.shape + (5,), dtype=np.float32)
+    obs[..., 0] = door
+    obs[..., 1] = xs[ix] / ppm
+    obs[..., 2] = ys[iy] / ppm
+    obs[..., 3] = float(env.fridge.x) / ppm
+    obs[..., 4] = float(env.fridge.y) / ppm
+    actions = np.asarray(agent.act_batch(obs.reshape(-1, 5), explore=False)).reshape(door.shape)
+    return TablePolicy(
+        actions.astype(np.int8),
+        xs,
+        ys,
+        (float(env.fridge.x), float(env.fridge.y)),
+        pixels_per_meter=ppm,
+        step_px=float(env.move_step_px),
+        fallback=fallback,
+    )
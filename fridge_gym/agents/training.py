@@ -0,0 +1,377 @@
+"""
+training.py
+=================
+DQN 的单进程训练循环 `train_dqn`（demo 的 3 键、基准 train_to_success 都走这里）：
+epsilon-greedy 采样 → 经验回放 → 定期纯贪心评估并保留最佳权重；可选示范热启动、checkpoint 续训和分阶段计时。
+
+不依赖 pygame：训练用的是无头环境，贪心评估用 FridgeVectorEnv 批量跑。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+from typing import Callable
+
+import numpy as np
+
+from fridge_gym.envs.fridge_env import FridgeGameEnv
+from fridge_gym.envs.vector_env import FridgeVectorEnv
+from fridge_gym.agents.demonstrations import generate_demonstrations, load_demonstrations, pretrain_from_demonstrations
+from fridge_gym.agents.dqn_agent import DQNAgent
+from fridge_gym.agents.numpy_policy import NumpyPolicy
+from fridge_gym.utils.profiling import NULL_PROFILER, PhaseProfiler
+
+
+def _policy_fingerprint(agent) -> str | None:
+    """贪心策略权重的指纹（权重不变 → 指纹不变），用于评估结果的记忆化。"""
+    if hasattr(agent, "q"):
+        arrays = [v.detach().cpu().numpy() for v in agent.q.state_dict().values()]
+    elif hasattr(agent, "weights") and hasattr(agent, "biases"):
+        arrays = list(agent.weights) + list(agent.biases)
+    else:
+        return None
+    h = hashlib.sha1()
+    for arr in arrays:
+        h.update(np.ascontiguousarray(arr).tobytes())
+    return h.hexdigest()
+
+
+def _make_eval_starts(
+    env: FridgeGameEnv,
+    start_options: dict | None,
+    n_runs: int,
+    start_noise_m: float,
+    *,
+    seed: int = 0,
+) -> list[dict]:
+    """
+    生成一组固定的评估起点：第 1 个是无扰动起点（与按 4 一致），其余在 ±start_noise_m 内扰动。
+    用固定随机种子，保证每次评估（包括恢复 checkpoint 后的复测）用的是同一批起点，结果可比、可缓存。
+    没有 elephant_pos 或 start_noise_m<=0 时，所有起点都相同。
+    """
+    base = dict(start_options or {})
+    starts = [dict(base)]
+    rng = np.random.default_rng(seed)
+    noise_px = float(start_noise_m * env.PIXELS_PER_METER)
+    for _ in range(int(n_runs) - 1):
+        o = dict(base)
+        if base.get("elephant_pos") is not None and noise_px > 0:
+            x0, y0 = base["elephant_pos"]
+            o["elephant_pos"] = (float(x0) + float(rng.uniform(-noise_px, noise_px)), float(y0) + float(rng.uniform(-noise_px, noise_px)))
+        starts.append(o)
+    return starts
+
+
+def _greedy_eval_success_rate(
+    agent: DQNAgent | NumpyPolicy,
+    env: FridgeGameEnv,
+    start_options: dict | None,
+    max_steps: int,
+    *,
+    n_runs: int = 12,
+    eval_starts: list[dict] | None = None,
+    cache: dict | None = None,
+) -> tuple[int, int]:
+    """
+    纯贪心、不写入回放池。用于解释「训练日志里 10/10 成功」与「按 4 表现差」：前者含 epsilon 随机探索。
+
+    贪心策略和环境都是确定性的：同一起点跑多少次结果都一样。所以这里
+    - 相同起点只跑一次（按次数计入成功数）；
+    - 结果按 (权重指纹, 起点, 步数上限) 记忆化，权重没变时（如恢复 checkpoint 后复测）直接复用；
+    - 需要评估的起点放进一个 FridgeVectorEnv 里批量跑，每步一次 act_batch。
+    eval_starts 缺省时全部使用无扰动起点；只有 randomize_positions 这种随机起点才逐局真实 rollout。
+    """
+    starts = eval_starts if eval_starts is not None else [dict(start_options or {}) for _ in range(int(n_runs))]
+    if any(o.get("randomize_positions") for o in starts):
+        # 随机起点：不是确定性的，只能逐局跑
+        ok = 0
+        for o in starts:
+            obs, _info = env.reset(options=o)
+            for _t in range(int(max_steps)):
+                a_idx = agent.act_index(obs, explore=False)
+                obs, _r, term, trunc, info = env.step(agent.onehot(a_idx))
+                if term or trunc:
+                    if info.get("task_complete"):
+                        ok += 1
+                    break
+        return ok, len(starts)
+
+    fp = _policy_fingerprint(agent)
+
+    def start_key(o: dict):
+        return tuple(sorted((k, tuple(v) if isinstance(v, (list, tuple)) else v) for k, v in o.items()))
+
+    def rest_key(o: dict):
+        # 除 elephant_pos 外的选项，同样把列表转成元组，才能当分组的键
+        return tuple(kv for kv in start_key(o) if kv[0] != "elephant_pos")
+
+    keys = [start_key(o) for o in starts]
+    results: dict = {}
+    todo: dict = {}
+    for k, o in zip(keys, starts):
+        if k in results or k in todo:
+            continue
+        memo_key = (fp, k, int(max_steps))
+        if fp is not None and cache is not None and memo_key in cache:
+            results[k] = cache[memo_key]
+        else:
+            todo[k] = o
+
+    if todo:
+        # 批量评估：把需要跑的起点按“除 elephant_pos 外的选项”分组，每组一个向量环境
+        groups: dict = {}
+        for k, o in todo.items():
+            groups.setdefault((rest_key(o), o.get("elephant_pos") is None), []).append((k, o))
+        for (rest, default_pos), items in groups.items():
+            venv = FridgeVectorEnv(
+                len(items), elephant_init_distance_m=env.elephant_init_distance_m, move_step_m=env.move_step_m
+            )
+            opts = dict(rest)
+            if not default_pos:
+                opts["elephant_pos"] = np.array([o["elephant_pos"] for _k, o in items], dtype=np.float64)
+            obs, _info = venv.reset(options=opts)
+            finished = np.zeros(len(items), dtype=bool)
+            success = np.zeros(len(items), dtype=bool)
+            for _t in range(int(max_steps)):
+                obs, _r, term, trunc, info = venv.step(agent.act_batch(obs, explore=False))
+                newly = (term | trunc) & ~finished
+                success |= newly & info["task_complete"]
+                finished |= newly
+                if finished.all():
+                    break
+            for (k, _o), ok_i in zip(items, success):
+                results[k] = bool(ok_i)
+                if fp is not None and cache is not None:
+                    cache[(fp, k, int(max_steps))] = bool(ok_i)
+
+    ok = sum(1 for k in keys if results[k])
+    return ok, len(starts)
+
+
+def _snapshot_dqn_weights(agent: DQNAgent) -> tuple[dict, dict]:
+    """CPU 克隆，避免末期学崩后无法回到贪心最优解。"""
+    q_sd = {k: v.detach().cpu().clone() for k, v in agent.q.state_dict().items()}
+    qt_sd = {k: v.detach().cpu().clone() for k, v in agent.q_target.state_dict().items()}
+    return q_sd, qt_sd
+
+
+def _load_dqn_weights(agent: DQNAgent, q_sd: dict, qt_sd: dict) -> None:
+    dev = agent.device
+    agent.q.load_state_dict({k: v.to(dev) for k, v in q_sd.items()})
+    agent.q_target.load_state_dict({k: v.to(dev) for k, v in qt_sd.items()})
+
+
+def train_dqn(
+    num_episodes: int = 50,
+    max_steps_per_ep: int = 500,
+    *,
+    elephant_init_distance_m: float | None = None,
+    move_step_m: float | None = None,
+    start_options: dict | None = None,
+    start_noise_m: float = 0.1,
+    agent: DQNAgent | None = None,
+    profiler: PhaseProfiler | None = None,
+    checkpoint_path: str | None = None,
+    demo_episodes: int = 0,
+    pretrain_steps: int = 2_000,
+    eval_callback: Callable[[int, int, int, int], bool] | None = None,
+):
+    """
+    学习模式（DQN）训练过程。
+
+    - 使用 epsilon-greedy：前期大量随机探索，后期逐步转为利用学到的Q值。
+    - 使用经验回放 + 目标网络，保证训练稳定。
+    - 控制台会打印每10个episode的平均回报和最近一次loss，方便你观察“从乱走到变聪明”的过程。
+    - 传入 profiler（PhaseProfiler）时按阶段计时：act / env_step / push / train（含 train/forward 等子阶段）/
+      greedy_eval，并记录回放池内存；到了汇报间隔会调用 profiler 的 callback，训练结束再汇报一次。
+    - 传入 checkpoint_path 时每 10 局把完整训练状态（网络/优化器/回放池/随机数）存到该目录；
+      目录已存在且没有传 agent 时从它续训，接着上次保存的那一局往下跑。
+    - demo_episodes > 0 且是新建的 agent 时：先让规则基智能体在随机起点上并行示范这么多局，
+      示范转移写进回放池，并用“TD + 大间隔监督损失”预训练 pretrain_steps 次，再开始 epsilon-greedy 训练。
+    - 传入 eval_callback 时，每次纯贪心评估后调用 eval_callback(episode, 成功局数, 评估局数, 累计环境步数)，
+      返回 True 则提前结束训练（仍会恢复最佳权重）；示范预训练后的那次评估也会回调（episode 为起始局号 - 1）。
+      基准 train_to_success 用它计时到第一次贪心成功。
+    """
+    print("\n========== 启动 DQN 学习模式（训练） ==========")
+    print("说明：训练阶段不会使用规则基，也不会手动干预，完全靠试错+奖励学习。")
+    print(f"训练设置 | 起点扰动半径：±{start_noise_m:.2f}m | 每局最大步数：{max_steps_per_ep}")
+
+    # 训练时不需要渲染窗口，用 render_mode='none' 节省资源
+    env = FridgeGameEnv(render_mode="none", elephant_init_distance_m=elephant_init_distance_m, move_step_m=move_step_m)
+    obs_dim = env.observation_space.shape[0]
+    n_actions = 6
+    # 关键：如果传入了 agent，就在原模型上继续训练（经验/epsilon/网络参数都会累积）
+    start_ep = 1
+    if agent is None and checkpoint_path and os.path.isdir(checkpoint_path):
+        agent = DQNAgent.load_checkpoint(checkpoint_path)
+        start_ep = int(agent.checkpoint_extra.get("episode", 0)) + 1
+        print(f"从 checkpoint 续训：{checkpoint_path}（第 {start_ep} 局起，已更新 {agent.train_steps} 次，回放池 {len(agent.buffer)} 条）")
+    warm_started = False
+    if agent is None:
+        agent = DQNAgent(obs_dim=obs_dim, n_actions=n_actions)
+        if demo_episodes > 0:
+            warm_started = True
+            demos = generate_demonstrations(
+                demo_episodes,
+                max_episode_steps=max_steps_per_ep,
+                elephant_init_distance_m=elephant_init_distance_m,
+                move_step_m=move_step_m,
+            )
+            n_demo = load_demonstrations(agent, demos)
+            pre_loss = pretrain_from_demonstrations(agent, demos, steps=pretrain_steps)
+            print(
+                f"示范热启动：规则基示范 {demo_episodes} 局（{n_demo} 条转移，成功 {int(demos['task_complete'].sum())} 局），"
+                f"预训练 {pretrain_steps} 次，loss={pre_loss:.4f}"
+            )
+    prof = profiler if profiler is not None else NULL_PROFILER
+    agent.profiler = prof
+
+    reward_history = []
+    last_loss = None
+    env_steps = 0
+    success_history = []  # 记录每局是否真正完成（关门且大象在冰箱内）
+
+    # 如果你把起点放得很远（比如 dx=6m），固定200步有时不够“走完一局”，训练会变得很不稳定。
+    # 这里做个自适应：按“水平距离/步长”估算需要多少步，给一个上限更合理。
+    adaptive_max_steps = int(max_steps_per_ep)
+    if start_options and start_options.get("elephant_pos") is not None:
+        x0, y0 = start_options["elephant_pos"]
+        fridge_x = float(env.SCREEN_WIDTH * 0.7)
+        dx_m_est = abs((fridge_x - float(x0)) / env.PIXELS_PER_METER)
+        step_m = max(1e-6, float(env.move_step_m))
+        adaptive_max_steps = max(adaptive_max_steps, int(dx_m_est / step_m) + 120)
+
+    # DQN 末期仍会从回放池里抽到早期烂样本，可能把 Q 网「学崩」；按「纯贪心评估」保留最佳权重
+    best_greedy_ok: int | None = None
+    best_q_sd: dict | None = None
+    best_qt_sd: dict | None = None
+    best_snapshot_ep = 0
+
+    # 贪心评估：固定一批起点（1 个无扰动 + 若干个扰动），结果按权重指纹记忆化
+    eval_starts = _make_eval_starts(env, start_options, 12, start_noise_m)
+    eval_cache: dict = {}
+    stop = False
+    if warm_started:
+        # 预训练后的贪心策略先当作一个候选 checkpoint：后面的探索期更新即便把它学坏了，也能恢复回来
+        g_ok, g_n = _greedy_eval_success_rate(
+            agent, env, start_options, adaptive_max_steps, eval_starts=eval_starts, cache=eval_cache
+        )
+        print(f"         └ 预训练后纯贪心评估：{g_ok}/{g_n} 局成功。")
+        if g_ok > 0:
+            best_greedy_ok = g_ok
+            best_q_sd, best_qt_sd = _snapshot_dqn_weights(agent)
+        if eval_callback is not None and eval_callback(start_ep - 1, g_ok, g_n, 0):
+            stop = True
+
+    for ep in range(start_ep, num_episodes + 1):
+        if stop:
+            break
+        # 关键改动：训练起点做“随机扰动”（domain randomization）
+        # 原因：如果只在一个固定起点训练，DQN 很容易“记住这一个起点的最优动作序列”，
+        # 一旦你手动改了初始位置，就会出现“进不去冰箱”的现象（泛化失败）。
+        #
+        # 做法：围绕你保存的起点 (elephant_pos) 加一个小的随机偏移，让智能体学会“在一片区域内”都能完成任务。
+        # start_noise_m 越大，泛化越强，但学习难度也会变大；建议 0.3~1.0 之间。
+        ep_options = dict(start_options or {})
+        if "elephant_pos" in ep_options and ep_options["elephant_pos"] is not None and start_noise_m > 0:
+            x0, y0 = ep_options["elephant_pos"]
+            noise_px = float(start_noise_m * env.PIXELS_PER_METER)
+            # 均匀扰动：[-noise, +noise]
+            nx = float(x0) + float(np.random.uniform(-noise_px, noise_px))
+            ny = float(y0) + float(np.random.uniform(-noise_px, noise_px))
+            ep_options["elephant_pos"] = (nx, ny)
+
+        obs, info = env.reset(options=ep_options)
+        ep_reward = 0.0
+
+        success = False
+        for t in range(adaptive_max_steps):
+            # 1) epsilon-greedy 选择动作（有随机探索）
+            with prof.phase("act"):
+                action_idx = agent.act_index(obs, explore=True)
+                action_onehot = agent.onehot(action_idx)
+
+            # 2) 与环境交互，获得“试错”结果
+            with prof.phase("env_step"):
+                next_obs, reward, terminated, truncated, info = env.step(action_onehot)
+            done = bool(terminated or truncated)
+
+            # 3) 将这一步的经验存入回放池
+            # 训练稳定性：奖励截断（但不要把“关门成功”的关键大奖励截得太小）
+            # 之前用[-5,5]会把 close 的关键奖励压扁，DQN容易学到“对齐后不关门”。
+            clipped_reward = float(max(-20.0, min(20.0, float(reward))))
+            with prof.phase("push"):
+                agent.push_transition(obs, action_idx, clipped_reward, next_obs, done)
+
+            # 4) 从回放池随机采样，执行 cfg.updates_per_step 次参数更新（可能返回None，表示buffer还不够大，暂不更新）
+            with prof.phase("train"):
+                loss = agent.train_updates()
+            if loss is not None:
+                last_loss = loss
+            env_steps += 1
+            prof.count("env_steps")
+            prof.maybe_report()
+
+            obs = next_obs
+            ep_reward += float(reward)
+
+            if done:
+                success = bool(info.get("task_complete", False))
+                break
+
+        reward_history.append(ep_reward)
+        success_history.append(1 if success else 0)
+        prof.count("episodes")
+        prof.gauge("replay_bytes", agent.buffer.nbytes)
+        prof.gauge("replay_size", len(agent.buffer))
+
+        if ep % 10 == 0:
+            avg_r = sum(reward_history[-10:]) / min(10, len(reward_history))
+            succ10 = sum(success_history[-10:])
+            with prof.phase("greedy_eval"):
+                g_ok, g_n = _greedy_eval_success_rate(
+                    agent, env, start_options, adaptive_max_steps, eval_starts=eval_starts, cache=eval_cache
+                )
+            print(
+                f"[DQN训练] Episode {ep}/{num_episodes} | 最近10局平均回报：{avg_r:.2f} | 最近10局成功：{succ10}/10"
+                + (f" | 最近一次loss：{last_loss:.4f}" if last_loss is not None else " | loss暂不可用（经验不足）")
+            )
+            print(
+                f"         └ 纯贪心评估（1个与按4一致的无扰动起点 + {g_n - 1}个扰动起点）：{g_ok}/{g_n} 局成功。"
+                " 若此处明显低于上行，说明策略仍依赖探索噪声，可多训练或降低 epsilon_end。"
+            )
+            if best_greedy_ok is None:
+                if g_ok > 0:
+                    best_greedy_ok = g_ok
+                    best_q_sd, best_qt_sd = _snapshot_dqn_weights(agent)
+                    best_snapshot_ep = ep
+            elif g_ok > best_greedy_ok:
+                best_greedy_ok = g_ok
+                best_q_sd, best_qt_sd = _snapshot_dqn_weights(agent)
+                best_snapshot_ep = ep
+            elif g_ok == best_greedy_ok and g_ok > 0:
+                best_q_sd, best_qt_sd = _snapshot_dqn_weights(agent)
+                best_snapshot_ep = ep
+            if checkpoint_path:
+                agent.save_checkpoint(checkpoint_path, extra={"episode": ep})
+            if eval_callback is not None and eval_callback(ep, g_ok, g_n, env_steps):
+                break
+
+    if best_q_sd is not None and best_qt_sd is not None and best_greedy_ok and best_greedy_ok > 0:
+        _load_dqn_weights(agent, best_q_sd, best_qt_sd)
+        g_chk, g_n2 = _greedy_eval_success_rate(
+            agent, env, start_options, adaptive_max_steps, eval_starts=eval_starts, cache=eval_cache
+        )
+        where = f"约第 {best_snapshot_ep} 轮附近" if best_snapshot_ep > 0 else "示范预训练后"
+        print(
+            f"训练收尾：已恢复「纯贪心评估」最佳 checkpoint（{where}，{best_greedy_ok}/{g_n2}），"
+            "避免最后几轮更新把策略弄崩。"
+        )
+        print(f"         └ 恢复后立刻复测贪心：{g_chk}/{g_n2} 局成功。")
+
+    prof.report()
+    agent.profiler = NULL_PROFILER
+    env.close()
+    print("========== DQN 训练结束，按 4 键可在主窗口使用“学习后的自动执行”模式 ==========\n")
+    return agent
@@ -1,4 +1,5 @@
+from fridge_gym.envs.fridge_env import FridgeGameEnv, FridgeState, StepInfo
+from fridge_gym.envs.subproc_vector_env import FridgeSubprocVectorEnv
+from fridge_gym.envs.vector_env import FridgeVectorEnv
 
-from fridge_gym.envs.fridge_env import FridgeGameEnv
-
-__all__ = ["FridgeGameEnv"]
\ No newline at end of file
+__all__ = ["FridgeGameEnv", "FridgeVectorEnv", "FridgeSubprocVectorEnv", "FridgeState", "StepInfo"]
@@ -11,11 +11,21 @@ fridge_env.py
 从而更直观地理解“强化学习 = 试错 + 奖励反馈”的结构。
 """
 
+from __future__ import annotations
+
 import os
-import pygame
 import sys
+from collections.abc import Mapping
+
 import numpy as np
 
+# pygame 只在需要画面（render_mode="human"）时才用到；
+# 无头训练环境只依赖 numpy，没有安装 pygame / 没有显示器的机器也能跑。
+try:
+    import pygame
+except ModuleNotFoundError:  # pragma: no cover
+    pygame = None  # type: ignore
+
 # 兼容导入：优先使用 gymnasium；如果用户只安装了 gym，也能运行（接口仍按Gymnasium风格返回）
 try:
     import gymnasium as gym
@@ -26,9 +36,129 @@ except ModuleNotFoundError:  # pragma: no cover
 
 from fridge_gym.elements.fridge import Fridge
 from fridge_gym.elements.elephant import Elephant
+from fridge_gym.utils.asset_cache import AssetCache, file_digest
+from fridge_gym.utils.mask_utils import flood_fill_mask
 from fridge_gym.utils.render_utils import blit_sprite
 
 
+class StepInfo(Mapping):
+    """
+    fast_step 模式下 step()/reset() 返回的 info：每个环境只有一个，每步复用（与复用的观测缓冲区一样，
+    下一次 step()/reset() 后内容就变了，需要保留请 dict(info)）。字段在读取时才从环境取值：
+    elephant_inside 若 step() 里已经算过就直接用，否则读到时才判定。
+    键与 `FridgeGameEnv._get_info()` 相同，可以像 dict 一样 info["task_complete"] / info.get(...)。
+    """
+
+    __slots__ = ("_env", "_inside")
+
+    _KEYS = ("game_phase", "done", "elephant_inside", "task_complete", "fridge_open", "elephant_pos", "fridge_pos")
+
+    def __init__(self, env: "FridgeGameEnv"):
+        self._env = env
+        self._inside = None  # step() 已算出的“是否在冰箱内”；None 表示读到时再判定
+
+    @property
+    def game_phase(self):
+        return self._env.game_phase
+
+    @property
+    def done(self):
+        return self._env.done
+
+    @property
+    def task_complete(self):
+        return self._env.task_complete
+
+    @property
+    def fridge_open(self):
+        return self._env.fridge.is_open
+
+    @property
+    def elephant_inside(self):
+        if self._inside is None:
+            return self._env._is_elephant_inside_by_coords()
+        return self._inside
+
+    def __getitem__(self, key):
+        if key == "elephant_pos":
+            return (float(self._env.elephant.x), float(self._env.elephant.y))
+        if key == "fridge_pos":
+            return (float(self._env.fridge.x), float(self._env.fridge.y))
+        if key in self._KEYS:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(self._KEYS)
+
+    def __len__(self) -> int:
+        return len(self._KEYS)
+
+    def __repr__(self) -> str:
+        return f"StepInfo({dict(self)!r})"
+
+
+class FridgeState:
+    """
+    环境状态快照（`FridgeGameEnv.get_state()` / `set_state()`）：step() 读写的全部字段，只有 10 个标量。
+    搜索类规划器（MCTS / beam search）可以在同一个环境上反复“保存 → 试走 → 恢复”，
+    不需要重新构建环境（pygame 初始化、素材处理）或深拷贝整个环境。
+    """
+
+    __slots__ = (
+        "fridge_open",
+        "elephant_x",
+        "elephant_y",
+        "fridge_x",
+        "fridge_y",
+        "game_phase",
+        "opened_once",
+        "reached_fridge_once",
+        "done",
+        "task_complete",
+    )
+
+    def __init__(
+        self,
+        fridge_open: bool,
+        elephant_x: float,
+        elephant_y: float,
+        fridge_x: float,
+        fridge_y: float,
+        game_phase: int,
+        opened_once: bool,
+        reached_fridge_once: bool,
+        done: bool,
+        task_complete: bool,
+    ):
+        self.fridge_open = fridge_open
+        self.elephant_x = elephant_x
+        self.elephant_y = elephant_y
+        self.fridge_x = fridge_x
+        self.fridge_y = fridge_y
+        self.game_phase = game_phase
+        self.opened_once = opened_once
+        self.reached_fridge_once = reached_fridge_once
+        self.done = done
+        self.task_complete = task_complete
+
+    def astuple(self) -> tuple:
+        return tuple(getattr(self, k) for k in self.__slots__)
+
+    def copy(self) -> "FridgeState":
+        return FridgeState(*self.astuple())
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, FridgeState) and self.astuple() == other.astuple()
+
+    def __hash__(self) -> int:
+        return hash(self.astuple())
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{k}={getattr(self, k)!r}" for k in self.__slots__)
+        return f"FridgeState({fields})"
+
+
 class FridgeGameEnv(gym.Env):
     """
     符合Gymnasium规范的强化学习环境（支持pygame渲染）。
@@ -38,7 +168,7 @@ class FridgeGameEnv(gym.Env):
     - **动作 action**：`step(action)` 接收智能体动作
     - **奖励 reward**：`step` 里根据动作是否有效、是否推进任务给出奖励
     """
-    metadata = {"render_modes": ["human"], "render_fps": 30}
+    metadata = {"render_modes": ["human", "rgb_array"], "render_fps": 30}
     # 窗口尺寸
     DEFAULT_SCREEN_WIDTH = 1280
     DEFAULT_SCREEN_HEIGHT = 760
@@ -62,21 +192,47 @@ class FridgeGameEnv(gym.Env):
     # 你希望“步伐增大”，这里默认加大；后续想改只需要改这一行即可。
     MOVE_STEP_M = 0.2
 
-    def __init__(self, render_mode="human", *, elephant_init_distance_m: float | None = None, move_step_m: float | None = None):
+    def __init__(
+        self,
+        render_mode="human",
+        *,
+        elephant_init_distance_m: float | None = None,
+        move_step_m: float | None = None,
+        fast_step: bool = False,
+        render_size: tuple[int, int] | None = None,
+        render_copy: bool = False,
+    ):
         super().__init__()
         self.render_mode = render_mode
 
+        # fast_step：step()/reset() 把观测写进同一个复用的缓冲区（每步都会被覆盖，需要保留请 .copy()），
+        # info 返回按需取值的 StepInfo，而不是每步新建 dict + tuple。默认关闭，行为与以前完全一致。
+        self.fast_step = bool(fast_step)
+        self._obs_buf = np.zeros((5,), dtype=np.float32)
+        self._info_buf = StepInfo(self)
+
         # 允许在创建环境时覆盖“起始距离/步长”
         # 重要：训练环境和可视化环境如果参数不一致，会出现“训练能成功但执行时卡住/乱跳”的错觉。
         self.elephant_init_distance_m = float(elephant_init_distance_m) if elephant_init_distance_m is not None else float(self.ELEPHANT_INIT_DISTANCE_M)
         self.move_step_m = float(move_step_m) if move_step_m is not None else float(self.MOVE_STEP_M)
 
-        # Pygame初始化
-        pygame.init()
         self.SCREEN_WIDTH = self.DEFAULT_SCREEN_WIDTH
         self.SCREEN_HEIGHT = self.DEFAULT_SCREEN_HEIGHT
-        self.screen = pygame.display.set_mode((self.SCREEN_WIDTH, self.SCREEN_HEIGHT), pygame.RESIZABLE)
-        pygame.display.set_caption("大象进冰箱")
+
+        # rgb_array：画到离屏 Surface（不开窗口、不初始化显示），render() 返回 shape=(H, W, 3) 的 uint8 帧。
+        # 默认返回复用缓冲区上的视图（下一次 render() 会覆盖，需要保留请 .copy() 或传 render_copy=True）；
+        # render_size=(w, h) 时先平滑缩放到该尺寸再返回。
+        self.render_size = (int(render_size[0]), int(render_size[1])) if render_size is not None else None
+        self.render_copy = bool(render_copy)
+        self._offscreen = self.render_mode == "rgb_array"
+        self._frame_buf = None
+        self._small_buf = None
+        self._small_surface = None
+
+        # 无头模式：不初始化 pygame、不开窗口、不加载/抠图素材，仿真只用 numpy。
+        # 训练环境（render_mode="none"）走这条路径，构建开销只剩几个 Python 对象。
+        self.headless = self.render_mode not in self.metadata["render_modes"]
+        self.screen = None
 
         # 把“米制参数”转换成像素步长（统一用于上下左右移动）
         # 如果你想改速度，只需要改 MOVE_STEP_M 或 PIXELS_PER_METER
@@ -89,12 +245,24 @@ class FridgeGameEnv(gym.Env):
             "hint_text": (140, 175, 155),
         }
 
-        # 字体初始化
-        self._init_font()
+        # 渲染缓存：每种画面状态一张预合成的背景层（底色 + 冰箱），以及上一帧大象的位置（脏矩形）
+        self._layers = {}
+        self._elephant_small_img = None
+        self._last_layer = None
+        self._last_sprite_rect = None
+        self._last_canvas_size = None
 
-        # 资源加载 → 去矩形底/衬色 → 背景与大象素材衬色一致
-        self._load_assets()
-        self._prepare_sprites_cutout_and_background()
+        if self._offscreen:
+            self._init_offscreen_canvas()
+            self._load_processed_assets()
+        elif not self.headless:
+            self._init_pygame_display()
+
+            # 字体初始化
+            self._init_font()
+
+            # 资源加载 → 去矩形底/衬色 → 背景与大象素材衬色一致（结果有磁盘缓存）
+            self._load_processed_assets()
 
         # 初始化元素
         self._init_elements()
@@ -117,6 +285,42 @@ class FridgeGameEnv(gym.Env):
         self.inside_distance_threshold_m = 0.8
         self.inside_height_threshold_m = 0.8
 
+    def _init_pygame_display(self):
+        """Pygame初始化（仅可视化模式调用）。"""
+        if pygame is None:
+            raise ModuleNotFoundError("可视化模式需要安装 pygame：pip install pygame")
+        pygame.init()
+        self.screen = pygame.display.set_mode((self.SCREEN_WIDTH, self.SCREEN_HEIGHT), pygame.RESIZABLE)
+        pygame.display.set_caption("大象进冰箱")
+
+    def _init_offscreen_canvas(self):
+        """
+        离屏画布（仅 rgb_array 模式）：Surface 直接建在 numpy 缓冲区上（RGBX，每像素 4 字节），
+        画完帧后 buffer[..., :3] 就是 (H, W, 3) 的 RGB 视图，不需要 surfarray 锁定 Surface 再拷贝。
+        不调用 pygame.init()，也不需要显示器 / SDL 视频驱动。
+        """
+        if pygame is None:
+            raise ModuleNotFoundError("rgb_array 渲染需要安装 pygame：pip install pygame")
+        self._frame_buf, self.screen = self._buffer_surface((self.SCREEN_WIDTH, self.SCREEN_HEIGHT))
+        if self.render_size is not None:
+            self._small_buf, self._small_surface = self._buffer_surface(self.render_size)
+
+    @staticmethod
+    def _buffer_surface(size):
+        """shape=(h, w, 4) 的 uint8 缓冲区 + 共享这块内存的 32 位 Surface。"""
+        w, h = int(size[0]), int(size[1])
+        buf = np.zeros((h, w, 4), dtype=np.uint8)
+        return buf, pygame.image.frombuffer(buf, (w, h), "RGBX")
+
+    def _convert_alpha(self, surf):
+        """
+        转成带 alpha 的显示格式。离屏模式没有设置显示模式，convert_alpha() 会报错，
+        改为拷贝成 RGBA 字节序的 Surface（与离屏画布的 RGBX 通道顺序一致，同样只做一次）。
+        """
+        if not self._offscreen:
+            return surf.convert_alpha()
+        return pygame.image.frombytes(pygame.image.tobytes(surf, "RGBA"), surf.get_size(), "RGBA")
+
     @staticmethod
     def _pick_cjk_font_path():
         """
@@ -151,7 +355,13 @@ class FridgeGameEnv(gym.Env):
 
     def _init_font(self):
         """初始化字体（画面上只保留少量提示，字号偏小、清淡）"""
-        path = self._pick_cjk_font_path()
+        # match_font 可能要调用 fontconfig 好几次，解析到的路径缓存到磁盘
+        cache = AssetCache()
+        path = cache.load_font_path()
+        if path is None:
+            path = self._pick_cjk_font_path()
+            if path:
+                cache.save_font_path(path)
         if path:
             try:
                 self.font = pygame.font.Font(path, 22)
@@ -175,19 +385,83 @@ class FridgeGameEnv(gym.Env):
             self.font_small = pygame.font.Font(None, 18)
             self.font_big = pygame.font.Font(None, 36)
 
-    def _load_assets(self):
-        """加载资源"""
+    # 参与抠图/合成的素材文件名（缓存 key 会对这些文件内容做哈希）
+    ASSET_FILES = ("elephant.png", "fridge_closed.png", "fridge_open.png", "elephant_on.png", "fridge_open_elephant.png")
+    # 缓存里的精灵名 → 实例属性名
+    _CACHED_SPRITES = {
+        "elephant": "elephant_img",
+        "fridge_closed": "fridge_closed_img",
+        "fridge_open": "fridge_open_img",
+        "fridge_with_elephant": "fridge_with_elephant_img",
+    }
+
+    @staticmethod
+    def _assets_dir():
         # 1. 获取当前脚本所在目录
         current_dir = os.path.dirname(os.path.abspath(__file__))
         # 2. 找到项目根目录（根据你的实际目录结构调整：比如当前脚本在 envs/ 下，根目录就是上两级）
         project_root = os.path.dirname(os.path.dirname(current_dir))
         # 3. 拼接 assets 路径（根目录下的 assets 文件夹）
-        ASSETS_PATH = os.path.join(project_root, "assets")
+        return os.path.join(project_root, "assets")
+
+    def _load_processed_assets(self):
+        """
+        带磁盘缓存的“加载 + 抠图 + 背景色推导”。
+
+        key = 源文件 sha1 + 精灵尺寸 + 缓存版本；命中时直接把处理好的 RGBA 像素（内存映射）
+        转成 Surface，跳过解码、缩放和所有抠图步骤。
+        """
+        assets_dir = self._assets_dir()
+        cache = AssetCache()
+        key = None
+        if cache.enabled:
+            key = cache.make_key(
+                {
+                    "files": {fn: file_digest(os.path.join(assets_dir, fn)) for fn in self.ASSET_FILES},
+                    "elephant_size": self.ELEPHANT_SIZE,
+                    "fridge_size": self.FRIDGE_SIZE,
+                }
+            )
+            hit = cache.load(key)
+            if hit is not None:
+                meta, arrays = hit
+                for name, attr in self._CACHED_SPRITES.items():
+                    arr = arrays.get(name)
+                    setattr(self, attr, None if arr is None else self._surface_from_rgba(arr))
+                self._has_fridge_elephant_composite = self.fridge_with_elephant_img is not None
+                self.colors["bg"] = tuple(int(v) for v in meta["bg"])
+                return
+
+        self._load_assets()
+        self._prepare_sprites_cutout_and_background()
+
+        if key is not None:
+            arrays = {}
+            for name, attr in self._CACHED_SPRITES.items():
+                surf = getattr(self, attr)
+                if surf is not None:
+                    arrays[name] = self._rgba_from_surface(surf)
+            cache.save(key, {"bg": list(self.colors["bg"])}, arrays)
+
+    @staticmethod
+    def _rgba_from_surface(surf):
+        """Surface → shape=(h, w, 4) 的 RGBA uint8 数组（行优先，便于直接落盘/映射）。"""
+        w, h = surf.get_size()
+        return np.frombuffer(pygame.image.tobytes(surf, "RGBA"), dtype=np.uint8).reshape(h, w, 4)
+
+    def _surface_from_rgba(self, arr):
+        """RGBA 数组 → 显示格式的 Surface（frombuffer 不拷贝，convert_alpha 只做一次格式转换）。"""
+        h, w = int(arr.shape[0]), int(arr.shape[1])
+        return self._convert_alpha(pygame.image.frombuffer(arr, (w, h), "RGBA"))
+
+    def _load_assets(self):
+        """加载资源"""
+        ASSETS_PATH = self._assets_dir()
 
         # 加载大象图片
         try:
             elephant_path = os.path.join(ASSETS_PATH, "elephant.png")
-            self.elephant_img = pygame.image.load(elephant_path).convert_alpha()
+            self.elephant_img = self._convert_alpha(pygame.image.load(elephant_path))
             self.elephant_img = pygame.transform.scale(self.elephant_img, self.ELEPHANT_SIZE)
         except (FileNotFoundError, pygame.error):
             self.elephant_img = pygame.Surface(self.ELEPHANT_SIZE, pygame.SRCALPHA)
@@ -196,11 +470,11 @@ class FridgeGameEnv(gym.Env):
         # 加载冰箱图片
         try:
             fridge_closed_path = os.path.join(ASSETS_PATH, "fridge_closed.png")
-            self.fridge_closed_img = pygame.image.load(fridge_closed_path).convert_alpha()
+            self.fridge_closed_img = self._convert_alpha(pygame.image.load(fridge_closed_path))
             self.fridge_closed_img = pygame.transform.scale(self.fridge_closed_img, self.FRIDGE_SIZE)
 
             fridge_open_path = os.path.join(ASSETS_PATH, "fridge_open.png")
-            self.fridge_open_img = pygame.image.load(fridge_open_path).convert_alpha()
+            self.fridge_open_img = self._convert_alpha(pygame.image.load(fridge_open_path))
             self.fridge_open_img = pygame.transform.scale(self.fridge_open_img, self.FRIDGE_SIZE)
         except (FileNotFoundError, pygame.error):
             self.fridge_closed_img = pygame.Surface(self.FRIDGE_SIZE, pygame.SRCALPHA)
@@ -215,7 +489,7 @@ class FridgeGameEnv(gym.Env):
         for name in ("elephant_on.png", "fridge_open_elephant.png"):
             try:
                 p = os.path.join(ASSETS_PATH, name)
-                self.fridge_with_elephant_img = pygame.image.load(p).convert_alpha()
+                self.fridge_with_elephant_img = self._convert_alpha(pygame.image.load(p))
                 self.fridge_with_elephant_img = pygame.transform.scale(self.fridge_with_elephant_img, self.FRIDGE_SIZE)
                 self._has_fridge_elephant_composite = True
                 break
@@ -258,73 +532,45 @@ class FridgeGameEnv(gym.Env):
 
         关键点：只抠除“与边界连通”的衬底像素（flood fill），避免把主体内部
         颜色接近衬底的区域误抠成透明洞（例如灰色大象、白色高光）。
+
+        实现：直接在 `pygame.surfarray` 的零拷贝视图上算布尔掩码，
+        连通性用 `flood_fill_mask` 做整段传播，不再逐像素 get_at/set_at。
         """
         if surf is None or matte_rgb is None:
             return
-        br, bg, bb = matte_rgb
         w, h = surf.get_size()
-
-        def near_matte(c):
-            if len(c) < 4:
-                return False
-            if int(c[3]) == 0:
-                return False
-            r, g, b = int(c[0]), int(c[1]), int(c[2])
-            return abs(r - br) <= tolerance and abs(g - bg) <= tolerance and abs(b - bb) <= tolerance
-
-        # 如果边界大多不是衬色，说明不该抠（可能已是透明PNG或背景复杂）
-        edge_samples = []
-        step = max(2, min(w, h) // 40)
-        for x in range(0, w, step):
-            edge_samples.append(surf.get_at((x, 0)))
-            edge_samples.append(surf.get_at((x, h - 1)))
-        for y in range(0, h, step):
-            edge_samples.append(surf.get_at((0, y)))
-            edge_samples.append(surf.get_at((w - 1, y)))
-        if not edge_samples:
-            return
-        matte_edge = sum(1 for c in edge_samples if near_matte(c))
-        if matte_edge / float(len(edge_samples)) < 0.55:
+        if w < 1 or h < 1:
             return
 
-        # Flood fill：从四条边界开始，把与边界连通的衬色像素全部置透明
-        from collections import deque
-
-        q = deque()
-        seen = set()
-
-        def push(px, py):
-            if px < 0 or py < 0 or px >= w or py >= h:
+        rgb = pygame.surfarray.pixels3d(surf)  # shape=(w, h, 3)，与 surf 共享内存
+        alpha = pygame.surfarray.pixels_alpha(surf)  # shape=(w, h)
+        try:
+            matte = np.asarray(matte_rgb, dtype=np.int16).reshape(1, 1, 3)
+            near_matte = (alpha != 0) & np.all(np.abs(rgb.astype(np.int16) - matte) <= int(tolerance), axis=2)
+
+            # 如果边界大多不是衬色，说明不该抠（可能已是透明PNG或背景复杂）
+            step = max(2, min(w, h) // 40)
+            edge_samples = np.concatenate(
+                [
+                    near_matte[0:w:step, 0],
+                    near_matte[0:w:step, h - 1],
+                    near_matte[0, 0:h:step],
+                    near_matte[w - 1, 0:h:step],
+                ]
+            )
+            if edge_samples.size == 0:
                 return
-            key = (px, py)
-            if key in seen:
+            if float(edge_samples.mean()) < 0.55:
                 return
-            seen.add(key)
-            q.append(key)
 
-        for x in range(w):
-            push(x, 0)
-            push(x, h - 1)
-        for y in range(h):
-            push(0, y)
-            push(w - 1, y)
-
-        surf.lock()
-        try:
-            while q:
-                x, y = q.popleft()
-                c = surf.get_at((x, y))
-                if not near_matte(c):
-                    continue
-                r, g, b, a = int(c[0]), int(c[1]), int(c[2]), int(c[3])
-                if a != 0:
-                    surf.set_at((x, y), (r, g, b, 0))
-                push(x + 1, y)
-                push(x - 1, y)
-                push(x, y + 1)
-                push(x, y - 1)
+            # Flood fill：从四条边界开始，把与边界连通的衬色像素全部置透明
+            seeds = np.zeros_like(near_matte)
+            seeds[0, :] = seeds[-1, :] = True
+            seeds[:, 0] = seeds[:, -1] = True
+            alpha[flood_fill_mask(near_matte, seeds)] = 0
         finally:
-            surf.unlock()
+            # 释放视图，解除 surface 锁定
+            del rgb, alpha
 
     @staticmethod
     def _remove_soft_shadow_near_feet(surf: pygame.Surface, *, y_start_ratio: float = 0.55):
@@ -341,23 +587,14 @@ class FridgeGameEnv(gym.Env):
             return
         y0 = int(max(0, min(h - 1, int(h * float(y_start_ratio)))))
 
-        surf.lock()
+        rgb = pygame.surfarray.pixels3d(surf)[:, y0:]
+        alpha = pygame.surfarray.pixels_alpha(surf)[:, y0:]
         try:
-            for y in range(y0, h):
-                for x in range(w):
-                    c = surf.get_at((x, y))
-                    if len(c) < 4:
-                        continue
-                    r, g, b, a = int(c[0]), int(c[1]), int(c[2]), int(c[3])
-                    if a == 0:
-                        continue
-                    # 经验阈值：阴影一般“偏暗 + 半透明”
-                    if a < 245:
-                        lum = (r + g + b) / 3.0
-                        if lum < 180:
-                            surf.set_at((x, y), (r, g, b, 0))
+            # 经验阈值：阴影一般“偏暗 + 半透明”
+            lum = rgb.sum(axis=2, dtype=np.int32) / 3.0
+            alpha[(alpha != 0) & (alpha < 245) & (lum < 180)] = 0
         finally:
-            surf.unlock()
+            del rgb, alpha
 
     @staticmethod
     def _remove_bg_tinted_shadow_by_floodfill(
@@ -381,66 +618,30 @@ class FridgeGameEnv(gym.Env):
         if w <= 2 or h <= 2:
             return
         y0 = int(max(0, min(h - 1, int(h * float(y_start_ratio)))))
-        br, bg, bb = int(bg_rgb[0]), int(bg_rgb[1]), int(bg_rgb[2])
-        bg_lum = (br + bg + bb) / 3.0
+        bg = np.asarray(bg_rgb[:3], dtype=np.int16).reshape(1, 1, 3)
+        bg_lum = float(bg.sum()) / 3.0
 
-        def is_near_bg(c) -> bool:
-            if len(c) < 4:
-                return False
-            if int(c[3]) == 0:
-                return False
-            r, g, b = int(c[0]), int(c[1]), int(c[2])
-            if abs(r - br) > near_bg_tol or abs(g - bg) > near_bg_tol or abs(b - bb) > near_bg_tol:
-                return False
-            lum = (r + g + b) / 3.0
-            return lum <= (bg_lum - float(must_be_darker_by))
-
-        from collections import deque
-
-        q = deque()
-        seen = set()
-
-        def push(x, y):
-            if x < 0 or y < y0 or x >= w or y >= h:
-                return
-            key = (x, y)
-            if key in seen:
-                return
-            seen.add(key)
-            q.append(key)
-
-        # 从“透明边界”启动：底部区域中，紧邻透明背景的阴影会被扫到
-        surf.lock()
+        rgb = pygame.surfarray.pixels3d(surf)[:, y0:]
+        alpha = pygame.surfarray.pixels_alpha(surf)[:, y0:]
         try:
-            for x in range(w):
-                if int(surf.get_at((x, h - 1))[3]) == 0:
-                    push(x, h - 1)
-            for y in range(y0, h):
-                if int(surf.get_at((0, y))[3]) == 0:
-                    push(0, y)
-                if int(surf.get_at((w - 1, y))[3]) == 0:
-                    push(w - 1, y)
-
-            while q:
-                x, y = q.popleft()
-                c = surf.get_at((x, y))
-                a = int(c[3]) if len(c) >= 4 else 255
-                if a == 0:
-                    # 透明区：继续扩展，寻找相邻的“接近背景的阴影像素”
-                    push(x + 1, y)
-                    push(x - 1, y)
-                    push(x, y + 1)
-                    push(x, y - 1)
-                    continue
-                if is_near_bg(c):
-                    r, g, b = int(c[0]), int(c[1]), int(c[2])
-                    surf.set_at((x, y), (r, g, b, 0))
-                    push(x + 1, y)
-                    push(x - 1, y)
-                    push(x, y + 1)
-                    push(x, y - 1)
+            transparent = alpha == 0
+            rgb_i = rgb.astype(np.int16)
+            near_bg = (
+                (~transparent)
+                & np.all(np.abs(rgb_i - bg) <= int(near_bg_tol), axis=2)
+                & (rgb_i.sum(axis=2) / 3.0 <= (bg_lum - float(must_be_darker_by)))
+            )
+
+            # 从“透明边界”启动：底部区域中，紧邻透明背景的阴影会被扫到；
+            # 透明像素本身可以穿行，但只有“接近背景的阴影像素”会被改成透明
+            seeds = np.zeros_like(transparent)
+            seeds[:, -1] = True
+            seeds[0, :] = seeds[-1, :] = True
+            seeds &= transparent
+            reached = flood_fill_mask(transparent | near_bg, seeds)
+            alpha[reached & near_bg] = 0
         finally:
-            surf.unlock()
+            del rgb, alpha
 
     def _prepare_sprites_cutout_and_background(self):
         """每张图用自己的四角衬色做抠图；屏幕背景与大象衬色一致。"""
@@ -552,6 +753,60 @@ class FridgeGameEnv(gym.Env):
         )
         self.action_space = spaces.MultiBinary(6)
 
+    def get_state(self) -> FridgeState:
+        """保存当前状态（O(1)，与渲染/pygame 无关）。"""
+        return FridgeState(
+            bool(self.fridge.is_open),
+            self.elephant.x,
+            self.elephant.y,
+            self.fridge.x,
+            self.fridge.y,
+            self.game_phase,
+            self._opened_once,
+            self._reached_fridge_once,
+            self.done,
+            self.task_complete,
+        )
+
+    def set_state(self, state: FridgeState) -> None:
+        """恢复 get_state() 保存的状态；之后的 step() 与保存时继续走完全一致。"""
+        self.fridge.is_open = state.fridge_open
+        self.elephant.update_pos(state.elephant_x, state.elephant_y)
+        self.fridge.update_pos(state.fridge_x, state.fridge_y)
+        self.game_phase = state.game_phase
+        self._opened_once = state.opened_once
+        self._reached_fridge_once = state.reached_fridge_once
+        self.done = state.done
+        self.task_complete = state.task_complete
+        self._info_buf._inside = None
+
+    def set_obs_buffer(self, out: np.ndarray) -> None:
+        """fast_step 模式下改用调用方提供的观测缓冲区（shape=(5,)、float32，例如回放池/批次数组里的一行）。"""
+        if out.shape != (5,) or out.dtype != np.float32:
+            raise ValueError(f"观测缓冲区必须是 shape=(5,) 的 float32 数组，实际为 shape={out.shape} dtype={out.dtype}")
+        self._obs_buf = out
+
+    def _observe(self):
+        """step()/reset() 返回的观测：fast_step 时写进复用缓冲区，否则新建数组。"""
+        if not self.fast_step:
+            return self._get_obs()
+        ppm = self.PIXELS_PER_METER
+        out = self._obs_buf
+        out[0] = 1.0 if self.fridge.is_open else 0.0
+        out[1] = float(self.elephant.x / ppm)
+        out[2] = float(self.elephant.y / ppm)
+        out[3] = float(self.fridge.x / ppm)
+        out[4] = float(self.fridge.y / ppm)
+        return out
+
+    def _step_info(self, inside: bool | None = None):
+        """step()/reset() 返回的 info；inside 已经算过时直接传入，避免重复判定。"""
+        if not self.fast_step:
+            return self._get_info(inside)
+        info = self._info_buf
+        info._inside = inside
+        return info
+
     def _get_obs(self):
         """获取状态向量。"""
         return np.array(
@@ -565,12 +820,12 @@ class FridgeGameEnv(gym.Env):
             dtype=np.float32,
         )
 
-    def _get_info(self):
+    def _get_info(self, inside: bool | None = None):
         """返回额外信息"""
         return {
             "game_phase": self.game_phase,
             "done": self.done,
-            "elephant_inside": self._is_elephant_inside_by_coords(),
+            "elephant_inside": self._is_elephant_inside_by_coords() if inside is None else inside,
             "task_complete": self.task_complete,
             "fridge_open": self.fridge.is_open,
             "elephant_pos": (float(self.elephant.x), float(self.elephant.y)),
@@ -665,14 +920,14 @@ class FridgeGameEnv(gym.Env):
         idx = self._action_index_from_input(action)
         if idx is None:
             # 非法动作输入：强负奖励
-            return self._get_obs(), -5.0, self.done, False, self._get_info()
+            return self._observe(), -5.0, self.done, False, self._step_info()
 
         if self.done:
-            return self._get_obs(), 0.0, True, False, self._get_info()
+            return self._observe(), 0.0, True, False, self._step_info()
 
-        # 记录动作前的距离，用于“进度奖励”
+        # 记录动作前的距离，用于“进度奖励”（“是否在冰箱内”用同一组 dx/dy 判定，与 _is_elephant_inside_by_coords 一致）
         prev_dx_m, prev_dy_m = self._dx_dy_m()
-        inside_before = self._is_elephant_inside_by_coords()
+        inside_before = prev_dx_m <= self.inside_distance_threshold_m and prev_dy_m <= self.inside_height_threshold_m
 
         # 每一步都给一个小的时间惩罚，鼓励尽快完成任务而不是原地晃
         reward -= 0.02
@@ -741,8 +996,8 @@ class FridgeGameEnv(gym.Env):
                 reward -= 0.5
 
         # 进度奖励：鼓励同时缩小水平/垂直距离
-        inside_after = self._is_elephant_inside_by_coords()
         curr_dx_m, curr_dy_m = self._dx_dy_m()
+        inside_after = curr_dx_m <= self.inside_distance_threshold_m and curr_dy_m <= self.inside_height_threshold_m
         dx_progress = float(prev_dx_m - curr_dx_m)
         dy_progress = float(prev_dy_m - curr_dy_m)
         reward += 0.8 * dx_progress + 0.8 * dy_progress
@@ -754,7 +1009,7 @@ class FridgeGameEnv(gym.Env):
             if self.game_phase == 1:
                 self.game_phase = 2
 
-        return self._get_obs(), float(reward), terminated, truncated, self._get_info()
+        return self._observe(), float(reward), terminated, truncated, self._step_info(inside_after)
 
     def reset(self, seed=None, options=None):
         """重置环境"""
@@ -811,69 +1066,130 @@ class FridgeGameEnv(gym.Env):
         self._reached_fridge_once = False
         self._opened_once = False
         self._prev_l1_dist_m = self._l1_dist_m()
-        return self._get_obs(), self._get_info()
+        return self._observe(), self._step_info()
 
-    def _draw_elephant_inside_fridge_visual(self):
+    def _draw_elephant_inside_fridge_visual(self, target):
         """
-        无合成图时的兜底：在冰箱区域内叠一张缩小大象。
+        无合成图时的兜底：在冰箱区域内叠一张缩小大象（缩小后的图只算一次）。
         若存在 assets/elephant_on.png，则优先用整张合成图，不走此路径。
         """
         scale = 0.55
         w = max(32, int(self.ELEPHANT_SIZE[0] * scale))
         h = max(32, int(self.ELEPHANT_SIZE[1] * scale))
-        small = pygame.transform.smoothscale(self.elephant_img, (w, h))
+        if self._elephant_small_img is None:
+            self._elephant_small_img = pygame.transform.smoothscale(self.elephant_img, (w, h))
         fx = self.fridge.x - self.FRIDGE_SIZE[0] // 2
         fy = self.fridge.y - self.FRIDGE_SIZE[1] // 2
         ex = int(fx + (self.FRIDGE_SIZE[0] - w) // 2)
         ey = int(fy + self.FRIDGE_SIZE[1] // 2 - h // 2 + 8)
-        blit_sprite(self.screen, small, (ex, ey))
+        blit_sprite(target, self._elephant_small_img, (ex, ey))
 
-    def render(self):
-        """渲染界面（核心：无加粗字体+纯文字结束提示）"""
-        if self.render_mode != "human":
-            return
-
-        self.screen.fill(self.colors["bg"])
+    def _visual_state(self, inside_now: bool) -> str:
+        """画面状态：决定背景层画哪张冰箱、大象是否单独绘制。"""
+        # 流程：初始门关 → 移动对齐 → 关门完成
+        if self.task_complete:
+            return "complete"
+        if inside_now and self.fridge.is_open:
+            return "inside"
+        return "open" if self.fridge.is_open else "closed"
 
+    def _background_layer(self, state: str):
+        """
+        预合成的背景层：底色 + 该状态下的冰箱（“inside”时连同箱内大象）。
+        按 (状态, 冰箱位置) 缓存；冰箱换了位置（reset 随机起点）旧的层就不再需要，直接清空。
+        """
+        key = (state, self.fridge.x, self.fridge.y)
+        layer = self._layers.get(key)
+        if layer is not None:
+            return layer
+        if any(k[1:] != key[1:] for k in self._layers):
+            self._layers.clear()
+
+        # 与画布同一像素格式（等价于 .convert()，离屏模式没有显示模式也能用）
+        layer = pygame.Surface((self.SCREEN_WIDTH, self.SCREEN_HEIGHT), 0, self.screen)
+        layer.fill(self.colors["bg"])
         fx = self.fridge.x - self.FRIDGE_SIZE[0] // 2
         fy = self.fridge.y - self.FRIDGE_SIZE[1] // 2
-
-        # 流程：初始门关 → 移动对齐 → 关门完成
-        inside_now = self._is_elephant_inside_by_coords()
-        if self.task_complete:
-            blit_sprite(self.screen, self.fridge_closed_img, (fx, fy))
-        elif inside_now and self.fridge.is_open:
+        if state == "complete":
+            blit_sprite(layer, self.fridge_closed_img, (fx, fy))
+        elif state == "inside":
             # 优先使用「冰箱+箱内大象」合成图（如 elephant_on.png）
             if self._has_fridge_elephant_composite and self.fridge_with_elephant_img is not None:
-                blit_sprite(self.screen, self.fridge_with_elephant_img, (fx, fy))
+                blit_sprite(layer, self.fridge_with_elephant_img, (fx, fy))
             else:
-                blit_sprite(self.screen, self.fridge_open_img, (fx, fy))
-                self._draw_elephant_inside_fridge_visual()
+                blit_sprite(layer, self.fridge_open_img, (fx, fy))
+                self._draw_elephant_inside_fridge_visual(layer)
         else:
-            blit_sprite(
-                self.screen,
-                self.fridge_open_img if self.fridge.is_open else self.fridge_closed_img,
-                (fx, fy),
-            )
-            blit_sprite(
-                self.screen,
+            blit_sprite(layer, self.fridge_open_img if state == "open" else self.fridge_closed_img, (fx, fy))
+        self._layers[key] = layer
+        return layer
+
+    def invalidate_render_cache(self) -> None:
+        """丢弃预合成的背景层，下一帧整屏重画（换了素材/配色，或窗口内容被外部覆盖后调用）。"""
+        self._layers.clear()
+        self._last_layer = None
+
+    def _draw_frame(self, canvas):
+        """
+        把当前状态画到 canvas 上，返回需要刷新的区域：整屏重画时返回 None，否则返回脏矩形列表。
+
+        画面状态、冰箱位置和画布大小都没变时，只用背景层盖掉上一帧大象的区域再画新位置的大象；
+        否则整张背景层贴一遍。画面上不堆文字提示（完整按键与流程见 README）。
+        """
+        inside_now = self._is_elephant_inside_by_coords()
+        state = self._visual_state(inside_now)
+        layer = self._background_layer(state)
+        size = canvas.get_size()
+        full = layer is not self._last_layer or size != self._last_canvas_size
+
+        dirty = None
+        if full:
+            canvas.blit(layer, (0, 0))
+        elif self._last_sprite_rect is not None:
+            canvas.blit(layer, self._last_sprite_rect, self._last_sprite_rect)
+            dirty = [self._last_sprite_rect]
+        else:
+            dirty = []
+
+        sprite_rect = None
+        if state in ("open", "closed"):
+            sprite_rect = blit_sprite(
+                canvas,
                 self.elephant_img,
                 (self.elephant.x - self.ELEPHANT_SIZE[0] // 2, self.elephant.y - self.ELEPHANT_SIZE[1] // 2),
             )
+            if dirty is not None:
+                dirty.append(sprite_rect)
 
-        # 画面上不堆操作说明，完整按键与流程见 README
-        corner = self.font_small.render("", True, self.colors["tip_text"])
-        self.screen.blit(corner, (16, 14))
-
-        if inside_now and not self.task_complete:
-            hint = self.font_small.render("", True, self.colors["hint_text"])
-            self.screen.blit(hint, ((self.SCREEN_WIDTH - hint.get_width()) // 2, self.SCREEN_HEIGHT - 36))
+        self._last_layer = layer
+        self._last_sprite_rect = sprite_rect
+        self._last_canvas_size = size
+        return dirty
 
-        if self.task_complete:
-            t2 = self.font_small.render("", True, self.colors["tip_text"])
-            self.screen.blit(t2, ((self.SCREEN_WIDTH - t2.get_width()) // 2, self.SCREEN_HEIGHT // 2 - 6))
+    def render(self):
+        """
+        渲染界面：预合成背景层 + 大象精灵，只刷新变化的区域。
+        human 模式画到窗口；rgb_array 模式返回 shape=(H, W, 3) 的 uint8 帧（见 __init__ 的 render_size / render_copy）。
+        """
+        if self._offscreen:
+            return self._render_rgb_array()
+        if self.headless:
+            return
 
-        pygame.display.flip()
+        dirty = self._draw_frame(self.screen)
+        if dirty is None:
+            pygame.display.flip()
+        elif dirty:
+            pygame.display.update(dirty)
+
+    def _render_rgb_array(self):
+        self._draw_frame(self.screen)
+        buf = self._frame_buf
+        if self.render_size is not None:
+            pygame.transform.smoothscale(self.screen, self.render_size, self._small_surface)
+            buf = self._small_buf
+        frame = buf[:, :, :3]
+        return frame.copy() if self.render_copy else frame
 
     def close(self):
         """关闭环境
@@ -884,4 +1200,8 @@ class FridgeGameEnv(gym.Env):
         - 只有真正的人机交互窗口（render_mode == "human"）才调用 pygame.quit()。
         """
         if self.render_mode == "human":
-            pygame.quit()
\ No newline at end of file
+            pygame.quit()
+        elif self._offscreen:
+            # 离屏模式从未初始化显示，只释放画布和缓存的图层
+            self.invalidate_render_cache()
+            self.screen = self._small_surface = None
\ No newline at end of file
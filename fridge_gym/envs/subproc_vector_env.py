@@ -0,0 +1,253 @@
+"""
+subproc_vector_env.py
+=================
+`FridgeSubprocVectorEnv`：多进程版向量环境，每个子进程各自持有一个完整的 `FridgeGameEnv`
+（可以是带 pygame 渲染的完整环境），用来把所有 CPU 核都用起来。
+
+和常见的“每步把 obs/reward/info pickle 一遍再经管道传回来”不同：
+- 所有结果（obs、reward、terminated/truncated、结束前最后一帧观测、少量 info 字段）
+  都直接写进父子进程共享的一块内存；
+- 管道里只走命令（"step"/"reset"/"close"）和一个很小的应答。
+
+自动重置语义与 `FridgeVectorEnv` 相同：结束的环境返回新起点的 obs，
+结束那一步的真实观测放在 info["final_observation"]，info["_final_observation"] 标记哪些环境刚结束。
+"""
+
+from __future__ import annotations
+
+import multiprocessing as mp
+import traceback
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+# 共享内存布局：(字段名, dtype, 每个环境占几个元素)；按 dtype 大小从大到小排，保证对齐
+_SHARED_FIELDS = (
+    ("reward", np.float64, 1),
+    ("action", np.int64, 1),
+    ("obs", np.float32, 5),
+    ("final_obs", np.float32, 5),
+    ("terminated", np.bool_, 1),
+    ("truncated", np.bool_, 1),
+    ("final", np.bool_, 1),
+    ("task_complete", np.bool_, 1),
+    ("elephant_inside", np.bool_, 1),
+    ("game_phase", np.int8, 1),
+)
+
+
+def _shared_nbytes(num_envs: int) -> int:
+    return sum(np.dtype(dt).itemsize * width * num_envs for _, dt, width in _SHARED_FIELDS)
+
+
+def _shared_views(buf, num_envs: int) -> Dict[str, np.ndarray]:
+    """把一块共享字节缓冲区切成若干 numpy 视图（父进程和子进程用同一份布局）。"""
+    views = {}
+    offset = 0
+    for name, dt, width in _SHARED_FIELDS:
+        count = num_envs * width
+        arr = np.frombuffer(buf, dtype=dt, count=count, offset=offset)
+        views[name] = arr.reshape(num_envs, width) if width > 1 else arr
+        offset += np.dtype(dt).itemsize * count
+    return views
+
+
+def _worker(index: int, num_envs: int, shared, conn, env_kwargs: Dict[str, Any], max_episode_steps: Optional[int]):
+    """子进程主循环：持有一个环境，按命令读写共享内存中属于自己的那一行。"""
+    # 子进程里才导入环境：spawn 方式启动时父进程的 pygame 状态不会被继承
+    from fridge_gym.envs.fridge_env import FridgeGameEnv
+
+    env = None
+    try:
+        env = FridgeGameEnv(**env_kwargs)
+        views = _shared_views(shared, num_envs)
+        options = None
+        elapsed = 0
+
+        def write_info(info):
+            views["task_complete"][index] = bool(info.get("task_complete", False))
+            views["elephant_inside"][index] = bool(info.get("elephant_inside", False))
+            views["game_phase"][index] = int(info.get("game_phase", 0))
+
+        conn.send(True)
+        while True:
+            cmd, arg = conn.recv()
+            if cmd == "step":
+                obs, reward, terminated, truncated, info = env.step(int(views["action"][index]))
+                elapsed += 1
+                if max_episode_steps is not None and not terminated and elapsed >= max_episode_steps:
+                    truncated = True
+                views["reward"][index] = float(reward)
+                views["terminated"][index] = bool(terminated)
+                views["truncated"][index] = bool(truncated)
+                write_info(info)
+                finished = bool(terminated or truncated)
+                views["final"][index] = finished
+                if finished:
+                    views["final_obs"][index] = obs
+                    obs, _info = env.reset(options=options)
+                    elapsed = 0
+                views["obs"][index] = obs
+                conn.send(None)
+            elif cmd == "reset":
+                seed, options = arg
+                obs, info = env.reset(seed=seed, options=options)
+                elapsed = 0
+                views["obs"][index] = obs
+                views["final"][index] = False
+                write_info(info)
+                conn.send(None)
+            elif cmd == "render":
+                conn.send(env.render())
+            elif cmd == "close":
+                conn.send(None)
+                break
+            else:
+                raise ValueError(f"未知命令：{cmd!r}")
+    except (KeyboardInterrupt, EOFError):
+        pass
+    except Exception:  # noqa: BLE001 - 把子进程异常原样带回父进程
+        try:
+            conn.send(("error", traceback.format_exc()))
+        except (BrokenPipeError, OSError):
+            pass
+    finally:
+        if env is not None:
+            env.close()
+        conn.close()
+
+
+class FridgeSubprocVectorEnv:
+    """
+    N 个子进程，每个持有一个 `FridgeGameEnv(**env_kwargs)`。
+
+    - `env_kwargs`：传给 `FridgeGameEnv` 的参数（如 render_mode / move_step_m），必须可 pickle；
+    - `max_episode_steps`：可选的截断步数；
+    - `context`：multiprocessing 启动方式，默认 "spawn"（pygame 不适合在 fork 出的子进程里复用）。
+    """
+
+    def __init__(
+        self,
+        num_envs: int,
+        env_kwargs: Optional[Dict[str, Any]] = None,
+        *,
+        max_episode_steps: int | None = None,
+        context: str = "spawn",
+    ):
+        self.num_envs = int(num_envs)
+        env_kwargs = dict(env_kwargs or {"render_mode": "none"})
+        ctx = mp.get_context(context)
+
+        self._shared = ctx.RawArray("b", _shared_nbytes(self.num_envs))
+        self._views = _shared_views(self._shared, self.num_envs)
+
+        self._conns = []
+        self._procs = []
+        for i in range(self.num_envs):
+            parent_conn, child_conn = ctx.Pipe()
+            proc = ctx.Process(
+                target=_worker,
+                args=(i, self.num_envs, self._shared, child_conn, env_kwargs, max_episode_steps),
+                daemon=True,
+            )
+            proc.start()
+            child_conn.close()
+            self._conns.append(parent_conn)
+            self._procs.append(proc)
+        self.closed = False
+        self._gather()
+
+    def _gather(self):
+        """等所有子进程应答并返回应答列表；任一子进程出错就把它的 traceback 抛到父进程。"""
+        msgs = []
+        for i, conn in enumerate(self._conns):
+            msg = conn.recv()
+            if isinstance(msg, tuple) and len(msg) == 2 and msg[0] == "error":
+                raise RuntimeError(f"子进程 {i} 出错：\n{msg[1]}")
+            msgs.append(msg)
+        return msgs
+
+    def _info(self) -> Dict[str, np.ndarray]:
+        v = self._views
+        return {
+            "game_phase": v["game_phase"].copy(),
+            "elephant_inside": v["elephant_inside"].copy(),
+            "task_complete": v["task_complete"].copy(),
+        }
+
+    def reset(
+        self,
+        seed: Optional[Union[int, Sequence[Optional[int]]]] = None,
+        options: Optional[Union[Dict[str, Any], List[Optional[Dict[str, Any]]]]] = None,
+    ):
+        """
+        重置全部环境。
+        - seed：一个整数（第 i 个环境用 seed+i）或每个环境一个；
+        - options：所有环境共用一个 dict，或每个环境一个 dict；后续自动重置沿用同一份 options。
+        """
+        if seed is None or isinstance(seed, (int, np.integer)):
+            seeds = [None if seed is None else int(seed) + i for i in range(self.num_envs)]
+        else:
+            seeds = list(seed)
+        per_env = options if isinstance(options, (list, tuple)) else [options] * self.num_envs
+        for conn, s, o in zip(self._conns, seeds, per_env):
+            conn.send(("reset", (s, o)))
+        self._gather()
+        return self._views["obs"].copy(), self._info()
+
+    def step(self, actions):
+        """actions：shape=(N,) 的动作索引，或 shape=(N,6) 的 one-hot。"""
+        arr = np.asarray(actions)
+        if arr.ndim == 2:
+            # one-hot 非法（不是恰好一个1）时给一个越界索引，让子进程环境按“非法动作”处理
+            idx = np.where(arr.astype(np.int32).sum(axis=1) == 1, np.argmax(arr, axis=1), -1)
+        else:
+            idx = arr.reshape(self.num_envs)
+        self._views["action"][:] = idx
+        for conn in self._conns:
+            conn.send(("step", None))
+        self._gather()
+
+        v = self._views
+        info = self._info()
+        finished = v["final"].copy()
+        if finished.any():
+            info["final_observation"] = v["final_obs"].copy()
+            info["_final_observation"] = finished
+        return v["obs"].copy(), v["reward"].copy(), v["terminated"].copy(), v["truncated"].copy(), info
+
+    def render(self):
+        """
+        让每个子进程渲染自己的环境（render_mode="human" 时各自一个窗口）。
+        render_mode="rgb_array" 时返回 shape=(N, H, W, 3) 的帧。
+        """
+        for conn in self._conns:
+            conn.send(("render", None))
+        frames = self._gather()
+        if frames and frames[0] is not None:
+            return np.stack(frames)
+        return None
+
+    def close(self):
+        if self.closed:
+            return
+        for conn in self._conns:
+            try:
+                conn.send(("close", None))
+            except (BrokenPipeError, OSError):
+                pass
+        for conn in self._conns:
+            try:
+                conn.recv()
+            except (EOFError, OSError):
+                pass
+            conn.close()
+        for proc in self._procs:
+            proc.join(timeout=5)
+        self.closed = True
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:  # noqa: BLE001
+            pass
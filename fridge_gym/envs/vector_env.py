@@ -0,0 +1,309 @@
+"""
+vector_env.py
+=================
+`FridgeVectorEnv`：把 N 个 `FridgeGameEnv` 的状态放进几组 numpy 数组（struct-of-arrays），
+一次 `step(actions)` 用少量向量化运算同时推进全部 N 个环境。
+
+和逐个调用 `FridgeGameEnv.step` 相比，这里没有任何 Python 级的逐环境循环，
+适合一次跑成百上千个环境收集经验。
+
+约定：
+- 规则（移动、边界、“在冰箱内”判定、奖励整形、开关门）与 `FridgeGameEnv.step` 完全一致，
+  同样的起点和动作序列下，观测 (N,5) 与奖励逐位相同。
+- 自动重置：某个环境本步 terminated/truncated 后，返回的 obs 已经是重置后的新起点；
+  结束时那一步的真实观测放在 info["final_observation"]，info["_final_observation"] 标记哪些环境刚结束
+  （与 gymnasium 0.29 的向量环境约定一致）。
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+try:
+    from gymnasium import spaces
+except ModuleNotFoundError:  # pragma: no cover
+    from gym import spaces  # type: ignore
+
+from fridge_gym.envs.fridge_env import FridgeGameEnv
+
+
+class FridgeVectorEnv:
+    """
+    N 个并行的“大象进冰箱”环境（纯 numpy，无渲染）。
+
+    动作：shape=(N,) 的动作索引（0=open,1=close,2=up,3=down,4=left,5=right），
+    也接受 shape=(N,6) 的 one-hot；越界/非法动作与单环境一样给 -5 且不改变状态。
+    """
+
+    def __init__(
+        self,
+        num_envs: int,
+        *,
+        elephant_init_distance_m: float | None = None,
+        move_step_m: float | None = None,
+        max_episode_steps: int | None = None,
+        seed: int | None = None,
+    ):
+        self.num_envs = int(num_envs)
+        self.max_episode_steps = None if max_episode_steps is None else int(max_episode_steps)
+
+        # 用一个无头单环境当“参数模板”，保证两边的常数/阈值只有一个来源
+        tpl = FridgeGameEnv(
+            render_mode="none", elephant_init_distance_m=elephant_init_distance_m, move_step_m=move_step_m
+        )
+        self.SCREEN_WIDTH = tpl.SCREEN_WIDTH
+        self.SCREEN_HEIGHT = tpl.SCREEN_HEIGHT
+        self.PIXELS_PER_METER = tpl.PIXELS_PER_METER
+        self.ELEPHANT_SIZE = tpl.ELEPHANT_SIZE
+        self.FRIDGE_SIZE = tpl.FRIDGE_SIZE
+        self.elephant_init_distance_m = tpl.elephant_init_distance_m
+        self.move_step_m = tpl.move_step_m
+        self.move_step_px = tpl.move_step_px
+        self.inside_distance_threshold_m = tpl.inside_distance_threshold_m
+        self.inside_height_threshold_m = tpl.inside_height_threshold_m
+
+        self.single_observation_space = tpl.observation_space
+        self.single_action_space = spaces.Discrete(6)
+        self.observation_space = spaces.Box(
+            low=np.tile(tpl.observation_space.low, (self.num_envs, 1)),
+            high=np.tile(tpl.observation_space.high, (self.num_envs, 1)),
+            dtype=np.float32,
+        )
+        self.action_space = spaces.MultiDiscrete(np.full((self.num_envs,), 6))
+
+        n = self.num_envs
+        # struct-of-arrays：每个字段一条长度为 N 的数组
+        self.door_open = np.zeros(n, dtype=bool)
+        self.elephant_x = np.zeros(n, dtype=np.float64)
+        self.elephant_y = np.zeros(n, dtype=np.float64)
+        self.fridge_x = np.zeros(n, dtype=np.float64)
+        self.fridge_y = np.zeros(n, dtype=np.float64)
+        self.game_phase = np.zeros(n, dtype=np.int8)
+        self.done = np.zeros(n, dtype=bool)
+        self.task_complete = np.zeros(n, dtype=bool)
+        self._opened_once = np.zeros(n, dtype=bool)
+        self._reached_fridge_once = np.zeros(n, dtype=bool)
+        self.elapsed_steps = np.zeros(n, dtype=np.int64)
+
+        self._reset_options: Dict[str, Any] = {}
+        self.np_random = np.random.default_rng(seed)
+
+    # -----------------------------
+    # 观测 / 判定
+    # -----------------------------
+    def _get_obs(self) -> np.ndarray:
+        obs = np.empty((self.num_envs, 5), dtype=np.float32)
+        obs[:, 0] = self.door_open
+        obs[:, 1] = self.elephant_x / self.PIXELS_PER_METER
+        obs[:, 2] = self.elephant_y / self.PIXELS_PER_METER
+        obs[:, 3] = self.fridge_x / self.PIXELS_PER_METER
+        obs[:, 4] = self.fridge_y / self.PIXELS_PER_METER
+        return obs
+
+    def _dx_dy_m(self) -> Tuple[np.ndarray, np.ndarray]:
+        dx_m = np.abs((self.fridge_x - self.elephant_x) / self.PIXELS_PER_METER)
+        dy_m = np.abs((self.fridge_y - self.elephant_y) / self.PIXELS_PER_METER)
+        return dx_m, dy_m
+
+    def _is_elephant_inside_by_coords(self) -> np.ndarray:
+        dx_m, dy_m = self._dx_dy_m()
+        return (dx_m <= self.inside_distance_threshold_m) & (dy_m <= self.inside_height_threshold_m)
+
+    def _get_info(self) -> Dict[str, np.ndarray]:
+        return {
+            "game_phase": self.game_phase.copy(),
+            "elephant_inside": self._is_elephant_inside_by_coords(),
+            "task_complete": self.task_complete.copy(),
+            "fridge_open": self.door_open.copy(),
+        }
+
+    def _action_indices(self, actions) -> np.ndarray:
+        """动作统一转成 int64 索引；非法动作记为 -1。"""
+        arr = np.asarray(actions)
+        if arr.ndim == 2:
+            if arr.shape != (self.num_envs, 6):
+                raise ValueError(f"one-hot 动作的形状应为 ({self.num_envs}, 6)，实际为 {arr.shape}")
+            onehot = arr.astype(np.int32)
+            idx = np.argmax(onehot, axis=1).astype(np.int64)
+            idx[onehot.sum(axis=1) != 1] = -1
+            return idx
+        idx = arr.astype(np.int64).reshape(self.num_envs)
+        return np.where((idx >= 0) & (idx <= 5), idx, -1)
+
+    # -----------------------------
+    # reset
+    # -----------------------------
+    def _option(self, key, mask):
+        """取 reset 选项：既可以是所有环境共用的一个值，也可以是每个环境一行的数组。"""
+        value = self._reset_options.get(key)
+        if value is None:
+            return None
+        arr = np.asarray(value, dtype=np.float64)
+        if arr.ndim >= 1 and arr.shape[0] == self.num_envs and arr.ndim == (2 if key.endswith("_pos") else 1):
+            return arr[mask]
+        return np.broadcast_to(arr, (int(mask.sum()),) + arr.shape)
+
+    def _reset_idx(self, mask: np.ndarray) -> None:
+        """只重置 mask 选中的环境（与 `FridgeGameEnv.reset` 的选项语义一致）。"""
+        k = int(mask.sum())
+        if k == 0:
+            return
+        w, h = float(self.SCREEN_WIDTH), float(self.SCREEN_HEIGHT)
+        half_fw = self.FRIDGE_SIZE[0] // 2
+        half_fh = self.FRIDGE_SIZE[1] // 2
+        half_ew = self.ELEPHANT_SIZE[0] // 2
+        half_eh = self.ELEPHANT_SIZE[1] // 2
+        randomize = bool(self._reset_options.get("randomize_positions", False))
+
+        door = self._option("fridge_open", mask)
+        self.door_open[mask] = False if door is None else door.astype(bool)
+
+        fpos = self._option("fridge_pos", mask)
+        if fpos is not None:
+            fx = np.clip(fpos[:, 0], half_fw + 1, w - half_fw - 1)
+            fy = np.clip(fpos[:, 1], half_fh + 1, h - half_fh - 1)
+        elif randomize:
+            fx = self.np_random.uniform(half_fw + 1, w - half_fw - 1, size=k)
+            fy = self.np_random.uniform(half_fh + 1, h - half_fh - 1, size=k)
+        else:
+            fx = np.full(k, float(self.SCREEN_WIDTH * 0.7))
+            fy = np.full(k, float(self.SCREEN_HEIGHT * 0.7))
+        self.fridge_x[mask] = fx
+        self.fridge_y[mask] = fy
+
+        epos = self._option("elephant_pos", mask)
+        if epos is not None:
+            ex = np.clip(epos[:, 0], half_ew + 1, w - half_ew - 1)
+            ey = np.clip(epos[:, 1], half_eh + 1, h - half_eh - 1)
+        elif randomize:
+            ex = self.np_random.uniform(half_ew + 1, w - half_ew - 1, size=k)
+            ey = self.np_random.uniform(half_eh + 1, h - half_eh - 1, size=k)
+        else:
+            ex = np.maximum(half_ew + 1, fx - self.elephant_init_distance_m * self.PIXELS_PER_METER)
+            ey = np.full(k, self.SCREEN_HEIGHT * 0.7)
+        self.elephant_x[mask] = ex
+        self.elephant_y[mask] = ey
+
+        self.game_phase[mask] = 0
+        self.done[mask] = False
+        self.task_complete[mask] = False
+        self._reached_fridge_once[mask] = False
+        self._opened_once[mask] = False
+        self.elapsed_steps[mask] = 0
+
+    def reset(self, seed: Optional[int] = None, options: Optional[Dict[str, Any]] = None):
+        """
+        重置全部环境。options 与 `FridgeGameEnv.reset` 相同；
+        其中 elephant_pos / fridge_pos 还可以传 shape=(N,2) 的数组，给每个环境不同的起点。
+        这里的 options 会被记住，后续自动重置沿用同一套选项。
+        """
+        if seed is not None:
+            self.np_random = np.random.default_rng(seed)
+        self._reset_options = dict(options or {})
+        self._reset_idx(np.ones(self.num_envs, dtype=bool))
+        return self._get_obs(), self._get_info()
+
+    # -----------------------------
+    # step
+    # -----------------------------
+    def step(self, actions):
+        """
+        同时推进 N 个环境一步。
+        返回：obs(N,5), reward(N,), terminated(N,), truncated(N,), info(dict of arrays)
+
+        奖励的累加顺序与 `FridgeGameEnv.step` 逐项一致（浮点结果完全相同）。
+        """
+        idx = self._action_indices(actions)
+        valid = idx >= 0
+        active = valid & ~self.done
+
+        prev_dx_m, prev_dy_m = self._dx_dy_m()
+        inside_before = (prev_dx_m <= self.inside_distance_threshold_m) & (prev_dy_m <= self.inside_height_threshold_m)
+        door = self.door_open
+
+        reward = np.zeros(self.num_envs, dtype=np.float64)
+        # 每一步的时间惩罚 + “门关着却不开门”“已在冰箱内却不关门”的惩罚
+        reward -= 0.02
+        reward -= np.where(~door & (idx != 0), 0.5, 0.0)
+        reward -= np.where(door & inside_before & (idx != 1), 1.0, 0.0)
+
+        # 0=open
+        is_open_a = active & (idx == 0)
+        do_open = is_open_a & ~door
+        first_open = do_open & ~self._opened_once
+        # 1=close
+        is_close_a = active & (idx == 1)
+        do_close = is_close_a & door
+        success = do_close & inside_before
+        # 2..5=move：先算候选位置，再按边界决定是否生效
+        step_px = self.move_step_px
+        half_ew = self.ELEPHANT_SIZE[0] // 2
+        half_eh = self.ELEPHANT_SIZE[1] // 2
+        new_x = self.elephant_x + np.where(idx == 5, step_px, 0.0) - np.where(idx == 4, step_px, 0.0)
+        new_y = self.elephant_y + np.where(idx == 3, step_px, 0.0) - np.where(idx == 2, step_px, 0.0)
+        move_y = active & ((idx == 2) | (idx == 3))
+        move_x = active & ((idx == 4) | (idx == 5))
+        y_ok = np.where(idx == 2, (new_y - half_eh) > 0, (new_y + half_eh) < self.SCREEN_HEIGHT)
+        x_ok = ((new_x - half_ew) > 0) & ((new_x + half_ew) < self.SCREEN_WIDTH)
+        moved_y = move_y & y_ok
+        moved_x = move_x & x_ok
+
+        action_reward = np.select(
+            [
+                first_open,
+                do_open,
+                is_open_a,
+                success,
+                do_close,
+                is_close_a,
+                (move_y & ~y_ok) | (move_x & ~x_ok),
+            ],
+            [2.0, -0.2, -1.0, 40.0, -3.0, -1.0, -0.5],
+            default=0.0,
+        )
+        reward += action_reward
+
+        # 状态更新
+        self._opened_once |= first_open
+        self.game_phase[do_open & (self.game_phase == 0)] = 1
+        self.door_open = (door | do_open) & ~do_close
+        self.task_complete |= success
+        self.done |= success
+        self.game_phase[success] = 2
+        self.elephant_x = np.where(moved_x, new_x, self.elephant_x)
+        self.elephant_y = np.where(moved_y, new_y, self.elephant_y)
+
+        # 进度奖励：鼓励同时缩小水平/垂直距离
+        curr_dx_m, curr_dy_m = self._dx_dy_m()
+        inside_after = (curr_dx_m <= self.inside_distance_threshold_m) & (curr_dy_m <= self.inside_height_threshold_m)
+        progress = 0.8 * (prev_dx_m - curr_dx_m) + 0.8 * (prev_dy_m - curr_dy_m)
+        reward = np.where(active, reward + progress, reward)
+
+        # 首次进入冰箱区域时给予阶段奖励（需门已开）
+        reach = active & self.door_open & ~self._reached_fridge_once & inside_after
+        self._reached_fridge_once |= reach
+        reward = np.where(reach, reward + 10.0, reward)
+        self.game_phase[reach & (self.game_phase == 1)] = 2
+
+        # 与单环境一致：非法动作 -5（状态不变）；已结束的环境 0 奖励
+        reward = np.where(~valid, -5.0, np.where(self.done & ~active, 0.0, reward))
+        terminated = self.done.copy()
+        truncated = np.zeros(self.num_envs, dtype=bool)
+        self.elapsed_steps += 1
+        if self.max_episode_steps is not None:
+            truncated = ~terminated & (self.elapsed_steps >= self.max_episode_steps)
+
+        obs = self._get_obs()
+        info = self._get_info()
+        finished = terminated | truncated
+        if finished.any():
+            info["final_observation"] = obs.copy()
+            info["_final_observation"] = finished
+            self._reset_idx(finished)
+            obs[finished] = self._get_obs()[finished]
+        return obs, reward, terminated, truncated, info
+
+    def close(self):
+        """纯 numpy 环境，没有需要释放的资源。"""
@@ -0,0 +1,3 @@
+from fridge_gym.planning.oracle import FridgeMDPSolution, elephant_grid, solve_fridge_mdp
+
+__all__ = ["FridgeMDPSolution", "elephant_grid", "solve_fridge_mdp"]
@@ -0,0 +1,248 @@
+"""
+oracle.py
+=================
+“最优策略神谕”：把 `FridgeGameEnv` 看成一个有限、确定性的 MDP，精确求出最优策略。
+
+为什么可以精确求解？
+- 冰箱位置固定（由起点决定）；
+- 大象每次只能沿上下左右移动 move_step_px，所以从起点能到达的位置落在一个规则网格上；
+- 奖励只依赖 (门开/关, 大象网格位置, 是否首次开过门, 是否首次进过冰箱区域)。
+
+做法：
+1. 枚举网格上所有状态（含两个“首次”标记），共 8 × nx × ny 个；
+2. 把全部状态塞进一个 `FridgeVectorEnv`，每个动作只调用一次 `step`，得到转移表 next[s,a] 和奖励表 R[s,a]
+   （奖励就是环境自己算出来的，和逐步 rollout 完全一致）；
+3. 在转移表上做向量化的价值迭代（最优回报）和最短步数迭代（最少几步完成任务）。
+
+用途：给 RuleBasedAgent / DQNAgent 算“遗憾（regret）= 最优回报 - 实际回报”，不用跑成千上万次带噪 rollout。
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+from fridge_gym.envs.fridge_env import FridgeGameEnv
+from fridge_gym.envs.vector_env import FridgeVectorEnv
+
+
+@dataclass
+class FridgeMDPSolution:
+    """
+    求解结果。状态编号 s = (((door * 2 + opened_once) * 2 + reached_once) * nx + ix) * ny + iy，
+    最后一个编号 (= n_states) 是“任务完成”的吸收态。
+    """
+
+    xs: np.ndarray  # 网格上大象可能的 x 像素坐标，shape=(nx,)
+    ys: np.ndarray  # 网格上大象可能的 y 像素坐标，shape=(ny,)
+    fridge_pos: Tuple[float, float]
+    pixels_per_meter: float
+    start_state: int
+    next_state: np.ndarray  # shape=(n_states, 6)
+    rewards: np.ndarray  # shape=(n_states, 6)
+    reachable: np.ndarray  # shape=(n_states,) 从起点可达
+    values: np.ndarray  # 最优回报 V*(s)，shape=(n_states + 1,)
+    q_values: np.ndarray  # Q*(s,a)，shape=(n_states, 6)
+    policy: np.ndarray  # 最优动作，shape=(n_states,) int8
+    steps_to_goal: np.ndarray  # 最少步数，shape=(n_states + 1,)；到不了为 -1
+    gamma: float
+
+    @property
+    def n_states(self) -> int:
+        return int(self.next_state.shape[0])
+
+    @property
+    def terminal_state(self) -> int:
+        return self.n_states
+
+    @property
+    def optimal_return(self) -> float:
+        """从起点出发的最优（折扣）回报。"""
+        return float(self.values[self.start_state])
+
+    @property
+    def shortest_steps(self) -> int:
+        """从起点出发完成任务所需的最少步数（-1 表示不可能完成）。"""
+        return int(self.steps_to_goal[self.start_state])
+
+    def decode(self, s: int) -> Dict[str, Any]:
+        """状态编号 → 可读字段。"""
+        nx, ny = len(self.xs), len(self.ys)
+        iy = s % ny
+        ix = (s // ny) % nx
+        flags = s // (nx * ny)
+        return {
+            "door_open": bool(flags // 4),
+            "opened_once": bool((flags // 2) % 2),
+            "reached_once": bool(flags % 2),
+            "elephant_pos": (float(self.xs[ix]), float(self.ys[iy])),
+        }
+
+    def obs_of(self, s: int) -> np.ndarray:
+        """状态编号 → 与 FridgeGameEnv._get_obs 相同格式的观测。"""
+        d = self.decode(s)
+        ex, ey = d["elephant_pos"]
+        fx, fy = self.fridge_pos
+        ppm = self.pixels_per_meter
+        return np.array([1.0 if d["door_open"] else 0.0, ex / ppm, ey / ppm, fx / ppm, fy / ppm], dtype=np.float32)
+
+    def evaluate(self, action_fn: Callable[[np.ndarray], int], max_steps: int = 500) -> Dict[str, Any]:
+        """
+        在转移表上“回放”一个确定性策略（obs → 动作索引），不需要真实环境。
+        返回：{"return", "steps", "success", "regret"}；regret 以起点的最优回报为基准。
+        """
+        s = self.start_state
+        total = 0.0
+        discount = 1.0
+        for t in range(int(max_steps)):
+            a = int(action_fn(self.obs_of(s)))
+            total += discount * float(self.rewards[s, a])
+            discount *= self.gamma
+            s = int(self.next_state[s, a])
+            if s == self.terminal_state:
+                return {"return": total, "steps": t + 1, "success": True, "regret": self.optimal_return - total}
+        return {"return": total, "steps": int(max_steps), "success": False, "regret": self.optimal_return - total}
+
+
+def _grid_axis(start: float, step: float, ok_minus: Callable[[float], bool], ok_plus: Callable[[float], bool]) -> np.ndarray:
+    """从起点出发沿一个轴能走到的全部坐标（与环境里逐步累加的浮点运算一致）。"""
+    coords = [start]
+    c = start
+    while ok_minus(c - step):
+        c = c - step
+        coords.insert(0, c)
+    c = start
+    while ok_plus(c + step):
+        c = c + step
+        coords.append(c)
+    return np.asarray(coords, dtype=np.float64)
+
+
+def elephant_grid(env: FridgeGameEnv) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    以环境当前大象位置为起点，返回 RL 动作能走到的全部 (xs, ys) 像素坐标（边界规则与 step 一致）。
+    """
+    step = float(env.move_step_px)
+    half_ew = env.ELEPHANT_SIZE[0] // 2
+    half_eh = env.ELEPHANT_SIZE[1] // 2
+    x_ok = lambda x: (x - half_ew) > 0 and (x + half_ew) < env.SCREEN_WIDTH  # noqa: E731
+    xs = _grid_axis(float(env.elephant.x), step, x_ok, x_ok)
+    ys = _grid_axis(
+        float(env.elephant.y),
+        step,
+        lambda y: (y - half_eh) > 0,
+        lambda y: (y + half_eh) < env.SCREEN_HEIGHT,
+    )
+    return xs, ys
+
+
+def solve_fridge_mdp(
+    start_options: Optional[Dict[str, Any]] = None,
+    *,
+    elephant_init_distance_m: float | None = None,
+    move_step_m: float | None = None,
+    gamma: float = 1.0,
+    max_iters: int = 100_000,
+    tol: float = 1e-9,
+) -> FridgeMDPSolution:
+    """
+    对给定起点（与 `FridgeGameEnv.reset(options=...)` 相同的 options）精确求解最优策略。
+
+    gamma=1.0 表示不折扣的“真实回报”（环境里所有循环的总奖励都是负的，价值迭代会收敛）；
+    需要和 DQN 的目标对齐时可传 gamma=0.99。
+
+    注意：网格坐标由起点逐步加减 move_step_px 得到，与环境中的浮点累加一致；
+    只有当坐标恰好落在阈值的浮点舍入范围内时，网格模型才可能与真实 rollout 有细微差别。
+    """
+    env = FridgeGameEnv(render_mode="none", elephant_init_distance_m=elephant_init_distance_m, move_step_m=move_step_m)
+    env.reset(options=start_options)
+    step = float(env.move_step_px)
+    xs, ys = elephant_grid(env)
+    nx, ny = len(xs), len(ys)
+    n = 8 * nx * ny
+
+    s_idx = np.arange(n)
+    iy = s_idx % ny
+    ix = (s_idx // ny) % nx
+    flags = s_idx // (nx * ny)
+    door = flags // 4 == 1
+    opened_once = (flags // 2) % 2 == 1
+    reached_once = flags % 2 == 1
+
+    venv = FridgeVectorEnv(n, elephant_init_distance_m=elephant_init_distance_m, move_step_m=move_step_m)
+    next_state = np.empty((n, 6), dtype=np.int64)
+    rewards = np.empty((n, 6), dtype=np.float64)
+    for a in range(6):
+        venv.door_open = door.copy()
+        venv.elephant_x = xs[ix].copy()
+        venv.elephant_y = ys[iy].copy()
+        venv.fridge_x[:] = float(env.fridge.x)
+        venv.fridge_y[:] = float(env.fridge.y)
+        venv._opened_once[:] = opened_once
+        venv._reached_fridge_once[:] = reached_once
+        venv.done[:] = False
+        venv.task_complete[:] = False
+        venv.game_phase[:] = 0
+        venv.elapsed_steps[:] = 0
+        # step 之后 terminated 的环境会被自动重置，但它们本来就要映射到吸收态，不影响结果
+        _obs, r, terminated, _trunc, _info = venv.step(np.full(n, a, dtype=np.int64))
+        nix = np.clip(np.searchsorted(xs, venv.elephant_x - step / 2), 0, nx - 1)
+        niy = np.clip(np.searchsorted(ys, venv.elephant_y - step / 2), 0, ny - 1)
+        nflags = (venv.door_open.astype(np.int64) * 2 + venv._opened_once) * 2 + venv._reached_fridge_once
+        nxt = (nflags * nx + nix) * ny + niy
+        next_state[:, a] = np.where(terminated, n, nxt)
+        rewards[:, a] = r
+
+    start_flags = (int(bool(env.fridge.is_open)) * 2 + 0) * 2 + 0
+    start_state = int((start_flags * nx + int(np.argmin(np.abs(xs - env.elephant.x)))) * ny + int(np.argmin(np.abs(ys - env.elephant.y))))
+
+    # 从起点可达的状态（按层 BFS，整层一起扩展）
+    reachable = np.zeros(n + 1, dtype=bool)
+    reachable[start_state] = True
+    frontier = np.array([start_state])
+    while frontier.size:
+        nxt = np.unique(next_state[frontier].ravel())
+        nxt = nxt[~reachable[nxt]]
+        reachable[nxt] = True
+        frontier = nxt[nxt < n]
+
+    # 价值迭代：V(s) = max_a R(s,a) + gamma * V(next(s,a))，吸收态 V=0
+    values = np.zeros(n + 1, dtype=np.float64)
+    for _ in range(int(max_iters)):
+        q = rewards + float(gamma) * values[next_state]
+        new_v = q.max(axis=1)
+        delta = float(np.max(np.abs(new_v - values[:n])))
+        values[:n] = new_v
+        if delta < tol:
+            break
+    q = rewards + float(gamma) * values[next_state]
+    policy = q.argmax(axis=1).astype(np.int8)
+
+    # 最短步数：D(s) = 1 + min_a D(next(s,a))，吸收态 D=0
+    inf = np.iinfo(np.int64).max // 2
+    dist = np.full(n + 1, inf, dtype=np.int64)
+    dist[n] = 0
+    while True:
+        new_d = np.minimum(dist[:n], 1 + dist[next_state].min(axis=1))
+        if np.array_equal(new_d, dist[:n]):
+            break
+        dist[:n] = new_d
+    steps_to_goal = np.where(dist >= inf, -1, dist)
+
+    return FridgeMDPSolution(
+        xs=xs,
+        ys=ys,
+        fridge_pos=(float(env.fridge.x), float(env.fridge.y)),
+        pixels_per_meter=float(env.PIXELS_PER_METER),
+        start_state=start_state,
+        next_state=next_state,
+        rewards=rewards,
+        reachable=reachable[:n],
+        values=values,
+        q_values=q,
+        policy=policy,
+        steps_to_goal=steps_to_goal,
+        gamma=float(gamma),
+    )
@@ -1,4 +1,4 @@
-
+from fridge_gym.utils.mask_utils import flood_fill_mask
 from fridge_gym.utils.render_utils import blit_sprite, draw_with_shadow
 
-__all__ = ["blit_sprite", "draw_with_shadow"]
\ No newline at end of file
+__all__ = ["blit_sprite", "draw_with_shadow", "flood_fill_mask"]
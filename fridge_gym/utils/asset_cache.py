@@ -0,0 +1,142 @@
+"""
+asset_cache.py
+=================
+素材预处理结果的磁盘缓存。
+
+可视化环境每次构建都要：解码 png → 缩放 → 抠图/去阴影 → 推导背景色 → 查找中文字体。
+这些结果只取决于“源文件内容 + 目标尺寸 + 处理代码版本”，所以可以算一次、存到磁盘，
+之后的进程直接把处理好的 RGBA 像素以内存映射（np.load(mmap_mode="r")）的方式读回来。
+
+- 缓存目录：环境变量 FRIDGE_GYM_CACHE_DIR；未设置时用 ~/.cache/fridge_gym；
+  设置为空字符串则关闭缓存。
+- 失效：key 里包含源文件的 sha1，换图/改尺寸/升级 CACHE_VERSION 都会自动落到新条目。
+- 任何读写失败都只会退回“现场处理”，不会影响环境本身。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+# 抠图/缓存格式有改动时递增，旧缓存自动作废
+CACHE_VERSION = 1
+
+
+def default_cache_dir() -> Optional[str]:
+    """返回缓存根目录；返回 None 表示禁用缓存。"""
+    env = os.environ.get("FRIDGE_GYM_CACHE_DIR")
+    if env is not None:
+        return env or None
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "fridge_gym")
+
+
+def file_digest(path: str) -> str:
+    """源文件内容的 sha1；文件不存在时返回 "missing"（缺图也是一种确定的输入）。"""
+    h = hashlib.sha1()
+    try:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+    except OSError:
+        return "missing"
+    return h.hexdigest()
+
+
+class AssetCache:
+    """
+    一个条目 = 一个子目录：meta.json（背景色等小字段）+ 每张精灵一个 .npy（shape=(h, w, 4) 的 RGBA uint8）。
+    """
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = root if root is not None else default_cache_dir()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.root)
+
+    @staticmethod
+    def make_key(parts: Dict[str, Any]) -> str:
+        payload = json.dumps({"version": CACHE_VERSION, **parts}, sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    def load(self, key: str) -> Optional[Tuple[Dict[str, Any], Dict[str, np.ndarray]]]:
+        """命中时返回 (meta, {name: 只读内存映射数组})；未命中返回 None。"""
+        if not self.enabled:
+            return None
+        entry = os.path.join(self.root, "assets", key)
+        try:
+            with open(os.path.join(entry, "meta.json"), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            arrays = {
+                name: np.load(os.path.join(entry, f"{name}.npy"), mmap_mode="r")
+                for name in meta.get("sprites", [])
+            }
+        except (OSError, ValueError):
+            return None
+        return meta, arrays
+
+    def save(self, key: str, meta: Dict[str, Any], arrays: Dict[str, np.ndarray]) -> None:
+        """先写临时目录再原子改名，多个进程同时冷启动也不会读到写了一半的条目。"""
+        if not self.enabled:
+            return
+        parent = os.path.join(self.root, "assets")
+        entry = os.path.join(parent, key)
+        if os.path.isdir(entry):
+            return
+        tmp = None
+        try:
+            os.makedirs(parent, exist_ok=True)
+            tmp = tempfile.mkdtemp(prefix=f".{key}.", dir=parent)
+            for name, arr in arrays.items():
+                np.save(os.path.join(tmp, f"{name}.npy"), np.ascontiguousarray(arr, dtype=np.uint8))
+            with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+                json.dump({**meta, "sprites": list(arrays)}, f)
+            os.replace(tmp, entry)
+            tmp = None
+        except OSError:
+            pass
+        finally:
+            if tmp is not None:
+                shutil.rmtree(tmp, ignore_errors=True)
+
+    def _font_record_path(self) -> str:
+        return os.path.join(self.root, f"font_{sys.platform}.json")
+
+    def load_font_path(self) -> Optional[str]:
+        """读取上次解析到的中文字体路径；没有记录或字体文件已不存在时返回 None。"""
+        if not self.enabled:
+            return None
+        try:
+            with open(self._font_record_path(), "r", encoding="utf-8") as f:
+                path = json.load(f).get("font_path")
+        except (OSError, ValueError):
+            return None
+        if not path or not os.path.isfile(path):
+            return None
+        return path
+
+    def save_font_path(self, path: str) -> None:
+        """只记录找到的字体：没找到时下次仍会重新查找（可能之后装了字体）。"""
+        if not self.enabled or not path:
+            return
+        tmp = None
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(prefix=".font.", dir=self.root)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"font_path": os.fspath(path)}, f)
+            os.replace(tmp, self._font_record_path())
+            tmp = None
+        except OSError:
+            pass
+        finally:
+            if tmp is not None and os.path.exists(tmp):
+                os.remove(tmp)
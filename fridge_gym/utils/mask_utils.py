@@ -0,0 +1,43 @@
+"""
+mask_utils.py
+=================
+抠图用的掩码工具：向量化的洪水填充（从图像边缘把连通的衬底区域找出来）。
+"""
+
+import numpy as np
+
+
+def _grow_along_rows(reached, mask):
+    """
+    沿行方向一次性传播：同一行里一段连续的 mask 像素（run）只要有一个已到达，整段都到达。
+    用 cumsum 给每个 run 编号，再用布尔查表回填，全程没有 Python 级逐像素循环。
+    """
+    h, w = mask.shape
+    starts = mask.copy()
+    starts[:, 1:] &= ~mask[:, :-1]
+    run_id = np.cumsum(starts.ravel()).reshape(h, w)
+    hit = np.zeros(int(run_id[-1, -1]) + 1, dtype=bool)
+    hit[run_id[reached]] = True
+    return mask & hit[run_id]
+
+
+def flood_fill_mask(mask: np.ndarray, seeds: np.ndarray) -> np.ndarray:
+    """
+    返回 mask 中与 seeds 4-连通的像素（等价于从 seeds 出发、只在 mask 内扩展的 flood fill）。
+
+    做法：交替按行、按列做“整段 run 传播”，直到不再变化。
+    迭代次数只取决于连通路径的拐弯次数，而不是路径长度，抠图场景通常几轮就收敛。
+    """
+    mask = np.asarray(mask, dtype=bool)
+    reached = mask & np.asarray(seeds, dtype=bool)
+    count = int(reached.sum())
+    if count == 0:
+        return reached
+    mask_t = np.ascontiguousarray(mask.T)
+    while True:
+        reached = _grow_along_rows(reached, mask)
+        reached = np.ascontiguousarray(_grow_along_rows(np.ascontiguousarray(reached.T), mask_t).T)
+        new_count = int(reached.sum())
+        if new_count == count:
+            return reached
+        count = new_count
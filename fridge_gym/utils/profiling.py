@@ -0,0 +1,178 @@
+"""
+profiling.py
+=================
+训练循环的轻量级分阶段计时（按需开启）。
+
+用法：
+    prof = PhaseProfiler(callback=print_summary, report_every_s=10.0)
+    with prof.phase("env_step"):
+        env.step(a)
+    prof.count("env_steps")
+    prof.gauge("replay_bytes", agent.buffer.nbytes)
+    prof.maybe_report()          # 到了间隔就调用 callback(summary)
+
+- 计时用单调时钟 time.perf_counter_ns；每个阶段的最近 window 次耗时存在预分配的环形数组里，
+  summary() 给出 count / total / mean / p50 / p99 / 占墙钟时间比例。
+- 阶段可以嵌套（如 "train" 内部的 "train/forward"），嵌套阶段的占比会和外层重叠。
+- 不开启时用 NULL_PROFILER，所有方法都是空操作。
+"""
+
+from __future__ import annotations
+
+import time
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+
+
+class _Phase:
+    """单个阶段的计时器：本身就是上下文管理器，重复使用不分配新对象。"""
+
+    __slots__ = ("name", "samples", "count", "total_ns", "_t0")
+
+    def __init__(self, name: str, window: int):
+        self.name = name
+        self.samples = np.zeros((int(window),), dtype=np.int64)
+        self.count = 0
+        self.total_ns = 0
+        self._t0 = 0
+
+    def __enter__(self):
+        self._t0 = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        dt = time.perf_counter_ns() - self._t0
+        self.samples[self.count % self.samples.shape[0]] = dt
+        self.count += 1
+        self.total_ns += dt
+        return False
+
+
+class PhaseProfiler:
+    """分阶段计时 + 计数器 + 瞬时量（gauge），周期性地通过 callback 汇报。"""
+
+    enabled = True
+
+    def __init__(
+        self,
+        *,
+        window: int = 4096,
+        callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+        report_every_s: float = 10.0,
+    ):
+        self.window = int(window)
+        self.callback = callback
+        self.report_every_s = float(report_every_s)
+        self._phases: Dict[str, _Phase] = {}
+        self.counters: Dict[str, int] = {}
+        self.gauges: Dict[str, float] = {}
+        self._start_ns = time.perf_counter_ns()
+        self._last_report_ns = self._start_ns
+
+    def phase(self, name: str) -> _Phase:
+        p = self._phases.get(name)
+        if p is None:
+            p = self._phases[name] = _Phase(name, self.window)
+        return p
+
+    def count(self, name: str, n: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + int(n)
+
+    def gauge(self, name: str, value: float) -> None:
+        self.gauges[name] = float(value)
+
+    def reset(self) -> None:
+        self._phases.clear()
+        self.counters.clear()
+        self.gauges.clear()
+        self._start_ns = self._last_report_ns = time.perf_counter_ns()
+
+    def summary(self) -> Dict[str, Any]:
+        """各阶段统计（微秒）与墙钟占比；p50/p99 基于最近 window 次样本。"""
+        wall_ns = max(1, time.perf_counter_ns() - self._start_ns)
+        phases = {}
+        for name, p in self._phases.items():
+            if p.count == 0:
+                continue
+            recent = p.samples[: min(p.count, p.samples.shape[0])]
+            p50, p99 = np.percentile(recent, [50, 99])
+            phases[name] = {
+                "count": p.count,
+                "total_s": p.total_ns / 1e9,
+                "mean_us": p.total_ns / p.count / 1e3,
+                "p50_us": float(p50) / 1e3,
+                "p99_us": float(p99) / 1e3,
+                "share": p.total_ns / wall_ns,
+            }
+        return {
+            "wall_s": wall_ns / 1e9,
+            "phases": phases,
+            "counters": dict(self.counters),
+            "gauges": dict(self.gauges),
+        }
+
+    def maybe_report(self) -> None:
+        """距离上次汇报超过 report_every_s 时调用 callback(summary())。"""
+        if self.callback is None:
+            return
+        now = time.perf_counter_ns()
+        if (now - self._last_report_ns) / 1e9 >= self.report_every_s:
+            self._last_report_ns = now
+            self.callback(self.summary())
+
+    def report(self) -> None:
+        """立即汇报一次（训练结束时调用）。"""
+        if self.callback is not None:
+            self._last_report_ns = time.perf_counter_ns()
+            self.callback(self.summary())
+
+
+class _NullPhase:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+class _NullProfiler:
+    """关闭分析时的替身：接口相同、全部空操作。"""
+
+    enabled = False
+    _phase = _NullPhase()
+
+    def phase(self, name: str) -> _NullPhase:
+        return self._phase
+
+    def count(self, name: str, n: int = 1) -> None:
+        pass
+
+    def gauge(self, name: str, value: float) -> None:
+        pass
+
+    def maybe_report(self) -> None:
+        pass
+
+    def report(self) -> None:
+        pass
+
+
+NULL_PROFILER = _NullProfiler()
+
+
+def format_summary(summary: Dict[str, Any]) -> str:
+    """把 summary() 排成便于打印的多行文本（按总耗时降序）。"""
+    lines = [f"[profile] wall={summary['wall_s']:.2f}s"]
+    for name, p in sorted(summary["phases"].items(), key=lambda kv: -kv[1]["total_s"]):
+        lines.append(
+            f"  {name:<20} n={p['count']:<8d} p50={p['p50_us']:9.1f}us p99={p['p99_us']:9.1f}us "
+            f"total={p['total_s']:8.3f}s share={100.0 * p['share']:5.1f}%"
+        )
+    for name, v in summary["counters"].items():
+        lines.append(f"  {name:<20} {v}")
+    for name, v in summary["gauges"].items():
+        lines.append(f"  {name:<20} {v:.6g}")
+    return "\n".join(lines)
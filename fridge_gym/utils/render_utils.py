@@ -1,10 +1,7 @@
 
-import pygame
-
-
 def blit_sprite(screen, surface, pos):
-    """无阴影平铺，像矢量/扁平物体叠在背景上，避免「卡片贴图」感。"""
-    screen.blit(surface, pos)
+    """无阴影平铺，像矢量/扁平物体叠在背景上，避免「卡片贴图」感。返回被覆盖的矩形（用于脏矩形刷新）。"""
+    return screen.blit(surface, pos)
 
 
 def draw_with_shadow(
@@ -23,6 +20,9 @@ def draw_with_shadow(
     if not shadow:
         screen.blit(surface, pos)
         return
+    # 延迟导入：无头环境会 import 本模块，但不应因此依赖 pygame
+    import pygame
+
     if soft:
         shadow_offset = (2, 2)
         shadow_color = (90, 95, 105, 55)
@@ -0,0 +1,291 @@
+"""
+trajectory.py
+=================
+离线数据集：按列、分块、压缩地记录整局轨迹，再按固定批大小流式读回。
+
+目录布局：
+    dataset/
+      meta.json            列定义、每个分块的行数、总行数/局数
+      chunk_000000.npz     np.savez_compressed，每列一个数组（行数 = chunk_rows，最后一块可能更少）
+      chunk_000001.npz
+      ...
+
+每行是一条转移：obs / action / reward / next_obs / terminated / truncated / episode（局编号）/ step（局内步数），
+外加可选的 info 字段（默认 task_complete、game_phase）。一局可以跨分块，按 episode 列拼回即可。
+
+写入：`TrajectoryWriter` 里每列是预分配的定长数组，攒满 chunk_rows 行压缩落盘一次；
+`RecordEpisodes` 是 gym.Wrapper，包住 FridgeGameEnv 就能自动记录。
+读取：`TrajectoryReader.iter_batches(batch_size)` 一次只解压一个分块（且只解压用到的列），内存占用与数据集大小无关。
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from typing import Any, Dict, Iterator, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    import gymnasium as gym
+except ModuleNotFoundError:  # pragma: no cover
+    import gym  # type: ignore
+
+FORMAT_VERSION = 1
+
+# 基础列：(列名, dtype, 每行形状)；obs 维度在构造时确定
+_BASE_COLUMNS = (
+    ("obs", np.float32, "obs"),
+    ("action", np.int8, ()),
+    ("reward", np.float32, ()),
+    ("next_obs", np.float32, "obs"),
+    ("terminated", np.bool_, ()),
+    ("truncated", np.bool_, ()),
+    ("episode", np.int64, ()),
+    ("step", np.int32, ()),
+)
+
+# 可记录的 info 字段及其 dtype（FridgeGameEnv._get_info 里的标量字段）
+INFO_COLUMNS = {
+    "task_complete": np.bool_,
+    "game_phase": np.int8,
+    "elephant_inside": np.bool_,
+    "fridge_open": np.bool_,
+}
+
+
+class TrajectoryWriter:
+    """
+    按列缓冲转移、分块压缩写盘。用完必须 close()（或用 with），最后不满一块的数据才会落盘。
+
+    - chunk_rows：每个分块的行数（越大压缩越好，读时单块占的内存也越大）；
+    - info_keys：额外记录哪些 info 字段（见 INFO_COLUMNS）。
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        obs_dim: int = 5,
+        chunk_rows: int = 65_536,
+        info_keys: Sequence[str] = ("task_complete", "game_phase"),
+    ):
+        unknown = [k for k in info_keys if k not in INFO_COLUMNS]
+        if unknown:
+            raise ValueError(f"不支持记录的 info 字段：{unknown}（可选：{sorted(INFO_COLUMNS)}）")
+        self.path = os.fspath(path)
+        self.obs_dim = int(obs_dim)
+        self.chunk_rows = int(chunk_rows)
+        self.info_keys = tuple(info_keys)
+        os.makedirs(self.path, exist_ok=True)
+
+        self.columns: Dict[str, Tuple[np.dtype, Tuple[int, ...]]] = {}
+        for name, dt, shape in _BASE_COLUMNS:
+            self.columns[name] = (np.dtype(dt), (self.obs_dim,) if shape == "obs" else shape)
+        for key in self.info_keys:
+            self.columns[key] = (np.dtype(INFO_COLUMNS[key]), ())
+        self._buf = {name: np.zeros((self.chunk_rows,) + shape, dtype=dt) for name, (dt, shape) in self.columns.items()}
+        self._n = 0
+        self._chunks: list = []
+        self.total_rows = 0
+        self.num_episodes = 0
+        self.closed = False
+
+    def new_episode(self) -> int:
+        """分配一个新的局编号。"""
+        ep = self.num_episodes
+        self.num_episodes += 1
+        return ep
+
+    def add(self, obs, action: int, reward: float, next_obs, terminated: bool, truncated: bool, episode: int, step: int, info=None) -> None:
+        """追加一条转移（写进预分配的列缓冲区，不产生逐行对象）。"""
+        i = self._n
+        b = self._buf
+        b["obs"][i] = obs
+        b["action"][i] = action
+        b["reward"][i] = reward
+        b["next_obs"][i] = next_obs
+        b["terminated"][i] = terminated
+        b["truncated"][i] = truncated
+        b["episode"][i] = episode
+        b["step"][i] = step
+        if info is not None:
+            for key in self.info_keys:
+                b[key][i] = info.get(key, 0)
+        self._n = i + 1
+        if self._n == self.chunk_rows:
+            self._flush_chunk()
+
+    def add_batch(self, columns: Dict[str, np.ndarray]) -> None:
+        """
+        一次追加 N 行：columns 是 {列名: shape=(N, ...) 的数组}，缺少的 info 列补 0。
+        columns 自带的 episode 是这一批内部的局编号（从 0 起，例如 generate_demonstrations 的结果），
+        写入时整体加上已分配的局数，与 new_episode() / RecordEpisodes 以及之前各批的编号不会冲突。
+        """
+        n = int(np.asarray(columns["obs"]).shape[0])
+        if n and "episode" in columns:
+            ep = np.asarray(columns["episode"], dtype=np.int64)
+            columns = dict(columns, episode=ep + self.num_episodes)
+            self.num_episodes += int(ep.max()) + 1
+        start = 0
+        while start < n:
+            take = min(n - start, self.chunk_rows - self._n)
+            for name, buf in self._buf.items():
+                if name in columns:
+                    buf[self._n : self._n + take] = np.asarray(columns[name])[start : start + take]
+                else:
+                    buf[self._n : self._n + take] = 0
+            self._n += take
+            start += take
+            if self._n == self.chunk_rows:
+                self._flush_chunk()
+
+    def _flush_chunk(self) -> None:
+        n = self._n
+        if n == 0:
+            return
+        name = f"chunk_{len(self._chunks):06d}.npz"
+        tmp = os.path.join(self.path, f".{name}.tmp")
+        with open(tmp, "wb") as f:
+            np.savez_compressed(f, **{col: buf[:n] for col, buf in self._buf.items()})
+        os.replace(tmp, os.path.join(self.path, name))
+        self._chunks.append({"file": name, "rows": n})
+        self.total_rows += n
+        self._n = 0
+        self._write_meta()
+
+    def _write_meta(self) -> None:
+        meta = {
+            "version": FORMAT_VERSION,
+            "obs_dim": self.obs_dim,
+            "columns": {name: [dt.str, list(shape)] for name, (dt, shape) in self.columns.items()},
+            "chunks": self._chunks,
+            "total_rows": self.total_rows,
+            "num_episodes": self.num_episodes,
+        }
+        tmp = os.path.join(self.path, ".meta.json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp, os.path.join(self.path, "meta.json"))
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self._flush_chunk()
+        self._write_meta()
+        self.closed = True
+
+    def __enter__(self) -> "TrajectoryWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+class RecordEpisodes(gym.Wrapper):
+    """
+    记录整局轨迹的包装器：reset() 开始新的一局，每次 step() 追加一行。
+    动作可以是索引或 one-hot（与 FridgeGameEnv.step 相同），记录时统一存成索引。
+    """
+
+    def __init__(self, env, writer: TrajectoryWriter):
+        super().__init__(env)
+        self.writer = writer
+        self._episode = -1
+        self._step = 0
+        self._obs = np.zeros((writer.obs_dim,), dtype=np.float32)
+
+    def reset(self, **kwargs):
+        obs, info = self.env.reset(**kwargs)
+        self._episode = self.writer.new_episode()
+        self._step = 0
+        self._obs[:] = obs
+        return obs, info
+
+    def step(self, action):
+        obs, reward, terminated, truncated, info = self.env.step(action)
+        idx = self.env.unwrapped._action_index_from_input(action)
+        self.writer.add(
+            self._obs,
+            -1 if idx is None else idx,
+            reward,
+            obs,
+            terminated,
+            truncated,
+            self._episode,
+            self._step,
+            info,
+        )
+        self._step += 1
+        self._obs[:] = obs
+        return obs, reward, terminated, truncated, info
+
+
+class TrajectoryReader:
+    """流式读取 TrajectoryWriter 写的数据集。"""
+
+    def __init__(self, path: str):
+        self.path = os.fspath(path)
+        with open(os.path.join(self.path, "meta.json"), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        if self.meta.get("version") != FORMAT_VERSION:
+            raise ValueError(f"不支持的数据集版本：{self.meta.get('version')!r}")
+        self.columns = list(self.meta["columns"])
+
+    def __len__(self) -> int:
+        return int(self.meta["total_rows"])
+
+    @property
+    def num_episodes(self) -> int:
+        return int(self.meta["num_episodes"])
+
+    def iter_chunks(self, columns: Optional[Sequence[str]] = None, *, rng: Optional[np.random.Generator] = None) -> Iterator[Dict[str, np.ndarray]]:
+        """逐块产出 {列名: 数组}；只解压 columns 指定的列。传入 rng 时打乱分块顺序。"""
+        cols = list(columns) if columns is not None else self.columns
+        order = np.arange(len(self.meta["chunks"]))
+        if rng is not None:
+            rng.shuffle(order)
+        for i in order:
+            chunk = self.meta["chunks"][int(i)]
+            with np.load(os.path.join(self.path, chunk["file"])) as data:
+                yield {name: data[name] for name in cols}
+
+    def iter_batches(
+        self,
+        batch_size: int,
+        columns: Optional[Sequence[str]] = None,
+        *,
+        shuffle: bool = False,
+        seed: Optional[int] = None,
+        drop_last: bool = False,
+    ) -> Iterator[Dict[str, np.ndarray]]:
+        """
+        产出固定大小的批次（最后一批可能不足，drop_last=True 时丢弃）。
+        shuffle=True 时打乱分块顺序并在块内打乱行（块级打乱：不需要把整个数据集读进内存）。
+        """
+        b = int(batch_size)
+        rng = np.random.default_rng(seed) if shuffle else None
+        carry: Optional[Dict[str, np.ndarray]] = None
+        for chunk in self.iter_chunks(columns, rng=rng):
+            if rng is not None:
+                perm = rng.permutation(len(next(iter(chunk.values()))))
+                chunk = {k: v[perm] for k, v in chunk.items()}
+            if carry is not None:
+                chunk = {k: np.concatenate([carry[k], v]) for k, v in chunk.items()}
+                carry = None
+            n = len(next(iter(chunk.values())))
+            full = n - n % b
+            for start in range(0, full, b):
+                yield {k: v[start : start + b] for k, v in chunk.items()}
+            if full < n:
+                carry = {k: v[full:] for k, v in chunk.items()}
+        if carry is not None and not drop_last:
+            yield carry
+
+    def load_all(self, columns: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        """小数据集一次性读入（调试用）。"""
+        parts = list(self.iter_chunks(columns))
+        cols = list(columns) if columns is not None else self.columns
+        if not parts:
+            return {name: np.zeros((0,), dtype=np.dtype(self.meta["columns"][name][0])) for name in cols}
+        return {name: np.concatenate([p[name] for p in parts]) for name in cols}